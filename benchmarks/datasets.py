@@ -0,0 +1,79 @@
+import pandas as pd
+import numpy as np
+
+
+def categorical_dataset(n_rows: int, n_features: int, cardinality: int, n_classes: int = 3,
+                        noise: float = 0.1, seed: int = 0, target_label: str = 'label') -> pd.DataFrame:
+    """Generates integer coded categorical data. The label depends on an interaction of the first
+    features, so deeper trees keep finding informative splits, and a portion of the labels is random.
+
+    Args:
+        n_rows (int): The number of samples
+        n_features (int): The number of features
+        cardinality (int): The number of categories of each feature
+        n_classes (int, optional): The number of classes. Defaults to 3.
+        noise (float, optional): The portion of random labels. Defaults to 0.1.
+        seed (int, optional): The random seed. Defaults to 0.
+        target_label (str, optional): The label of the target data column. Defaults to 'label'.
+
+    Returns:
+        pd.DataFrame: The samples with the target column first
+    """
+    rng = np.random.default_rng(seed)
+    features = rng.integers(0, cardinality, (n_rows, n_features))
+
+    labels = features[:, 0].copy()
+    for i in range(1, min(n_features, 4)):
+        labels += features[:, i] * (features[:, i - 1] > cardinality // 2)
+    labels %= n_classes
+
+    random_labels = rng.random(n_rows) < noise
+    labels[random_labels] = rng.integers(0, n_classes, np.count_nonzero(random_labels))
+
+    samples = pd.DataFrame(features, columns=[f"f{i}" for i in range(n_features)])
+    samples.insert(0, target_label, labels)
+
+    return samples
+
+
+def numeric_dataset(n_rows: int, n_features: int, n_classes: int = 3, noise: float = 0.1,
+                    seed: int = 0, target_label: str = 'label') -> pd.DataFrame:
+    """Generates float features, the label is the bucket of a weighted sum of the first features.
+
+    Args:
+        n_rows (int): The number of samples
+        n_features (int): The number of features
+        n_classes (int, optional): The number of classes. Defaults to 3.
+        noise (float, optional): The portion of random labels. Defaults to 0.1.
+        seed (int, optional): The random seed. Defaults to 0.
+        target_label (str, optional): The label of the target data column. Defaults to 'label'.
+
+    Returns:
+        pd.DataFrame: The samples with the target column first
+    """
+    rng = np.random.default_rng(seed)
+    features = rng.normal(size=(n_rows, n_features))
+
+    weights = np.zeros(n_features)
+    weights[:min(n_features, 4)] = [1.0, -0.5, 0.25, 0.125][:min(n_features, 4)]
+    score = features @ weights
+    labels = np.searchsorted(np.quantile(score, np.linspace(0, 1, n_classes + 1)[1:-1]), score)
+
+    random_labels = rng.random(n_rows) < noise
+    labels[random_labels] = rng.integers(0, n_classes, np.count_nonzero(random_labels))
+
+    samples = pd.DataFrame(features, columns=[f"f{i}" for i in range(n_features)])
+    samples.insert(0, target_label, labels)
+
+    return samples
+
+
+def write_raw_dataset(samples: pd.DataFrame, path: str) -> None:
+    """Writes the samples in the format of the original dataset files read by DataLoader,
+    comma separated strings without a header.
+
+    Args:
+        samples (pd.DataFrame): Data samples with the target column first
+        path (str): The path to the file
+    """
+    samples.to_csv(path, header=False, index=False)
@@ -0,0 +1,327 @@
+"""Benchmarks of training, prediction, information gain and data loading.
+
+Run from the repository root:
+
+    $ python -m benchmarks.run_benchmarks --sweep quick --baseline benchmarks/baseline.json
+
+Each parameter of the sweep is varied on its own around the base configuration. Every case runs in a fresh
+process so its peak RSS isn't hidden by earlier cases. The results are written as JSON, and with a baseline
+the cases that got slower or use more memory than the tolerance allows are reported and the exit code is 1.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Tuple
+from benchmarks.datasets import categorical_dataset, numeric_dataset, write_raw_dataset
+from data.dataloader import DataLoader
+from models.decision_tree import DecisionTree
+from utils.information_gain import InformationGain
+import multiprocessing
+import numpy as np
+import pandas as pd
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCHMARKS = ('train', 'train_legacy', 'predict', 'information_gain', 'information_gains', 'load')
+
+# the base configuration and the values swept for each parameter
+SWEEPS = {
+    'quick': ({'rows': 5000, 'features': 8, 'cardinality': 4, 'max_length': 4},
+              {'rows': [1000, 5000, 20000], 'features': [4, 8, 16], 'cardinality': [4, 16], 'max_length': [4, 8]}),
+    'full': ({'rows': 50000, 'features': 16, 'cardinality': 8, 'max_length': 6},
+             {'rows': [10000, 50000, 200000, 1000000], 'features': [4, 16, 64], 'cardinality': [2, 8, 32, 128],
+              'max_length': [2, 6, 10, 14]}),
+}
+
+# the legacy trainer splits DataFrames in every node, it is only measured on small datasets
+LEGACY_MAX_ROWS = 20000
+
+# slowdowns of fewer seconds are timer noise and aren't reported as regressions
+MIN_TIME_DELTA = 0.002
+
+# the parameters that each benchmark depends on
+RELEVANT_PARAMS = {
+    'train': ('rows', 'features', 'cardinality', 'max_length'),
+    'train_legacy': ('rows', 'features', 'cardinality', 'max_length'),
+    'predict': ('rows', 'features', 'cardinality', 'max_length'),
+    'information_gain': ('rows', 'features', 'cardinality'),
+    'information_gains': ('rows', 'features', 'cardinality'),
+    'load': ('rows', 'features', 'cardinality'),
+}
+
+
+def make_cases(sweep: str, benchmarks: List, kinds: List) -> List:
+    """Lists the benchmark cases of a sweep without duplicates.
+
+    Args:
+        sweep (str): The name of the sweep in SWEEPS
+        benchmarks (list): The names of the benchmarks
+        kinds (list): The kinds of the datasets, 'categorical' and/or 'numeric'
+
+    Returns:
+        list: The parameters of each case
+    """
+    base, values = SWEEPS[sweep]
+    configs = [dict(base)]
+    for param, param_values in values.items():
+        configs.extend(dict(base, **{param: value}) for value in param_values)
+
+    cases = []
+    for benchmark in benchmarks:
+        for kind in kinds:
+            # numeric features have no cardinality and the loader reads categorical files
+            if kind == 'numeric' and benchmark in ('information_gain', 'information_gains', 'load'):
+                continue
+            for config in configs:
+                if benchmark == 'train_legacy' and config['rows'] > LEGACY_MAX_ROWS:
+                    continue
+                params = {param: config[param] for param in RELEVANT_PARAMS[benchmark]}
+                if kind == 'numeric':
+                    params.pop('cardinality')
+                case = dict(benchmark=benchmark, kind=kind, **params)
+                if case not in cases:
+                    cases.append(case)
+
+    return cases
+
+
+def case_key(case: Dict) -> str:
+    """
+    Args:
+        case (dict): The parameters of the case
+
+    Returns:
+        str: The name of the case, used to match results with the baseline
+    """
+    params = ','.join(f"{name}={value}" for name, value in case.items() if name not in ('benchmark', 'kind'))
+    return f"{case['benchmark']}[{case['kind']},{params}]"
+
+
+def make_dataset(case: Dict, seed: int) -> pd.DataFrame:
+    """
+    Args:
+        case (dict): The parameters of the case
+        seed (int): The random seed
+
+    Returns:
+        pd.DataFrame: The synthetic samples of the case
+    """
+    if case['kind'] == 'numeric':
+        return numeric_dataset(case['rows'], case['features'], seed=seed)
+
+    return categorical_dataset(case['rows'], case['features'], case['cardinality'], seed=seed)
+
+
+def setup_case(case: Dict, workdir: str) -> Tuple[Callable, int]:
+    """Prepares the data of a case outside of the measurement.
+
+    Args:
+        case (dict): The parameters of the case
+        workdir (str): A directory for the files of the case
+
+    Returns:
+        Tuple: The measured function and the number of rows it processes
+    """
+    samples = make_dataset(case, seed=0)
+    benchmark = case['benchmark']
+
+    if benchmark in ('train', 'train_legacy'):
+        def run():
+            tree = DecisionTree(max_length=case['max_length'], array_backed=benchmark == 'train')
+            tree.train(samples)
+        return run, len(samples)
+
+    if benchmark == 'predict':
+        tree = DecisionTree(max_length=case['max_length'])
+        tree.train(samples)
+        test_samples = make_dataset(case, seed=1)
+        tree.predict(test_samples.head(10))
+        return lambda: tree.predict(test_samples), len(test_samples)
+
+    if benchmark == 'information_gain':
+        ig = InformationGain('label')
+        feature_names = list(samples.columns.drop('label'))
+        return lambda: [ig.information_gain(samples, name) for name in feature_names], len(samples)
+
+    if benchmark == 'information_gains':
+        # the vectorized scorer of the trainers, the columns are coded once before training
+        ig = InformationGain('label')
+        feature_names = list(samples.columns.drop('label'))
+        labels, n_classes = ig._encode(samples['label'].to_numpy())
+        encoded = [ig._encode(samples[name].to_numpy()) for name in feature_names]
+        return lambda: ig.information_gains_from_codes(encoded, labels, n_classes), len(samples)
+
+    if benchmark == 'load':
+        train_path = os.path.join(workdir, 'train.data')
+        test_path = os.path.join(workdir, 'test.data')
+        write_raw_dataset(samples, train_path)
+        write_raw_dataset(make_dataset(case, seed=1), test_path)
+        feature_names = list(samples.columns.drop('label'))
+        return (lambda: DataLoader(train_path, test_path, list(feature_names)).load_from_file(True),
+                2 * len(samples))
+
+    raise(ValueError(f"Unknown benchmark {benchmark}"))
+
+
+def peak_rss() -> int:
+    """
+    Returns:
+        int: The peak resident set size of this process in bytes
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes and macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_case(case: Dict, repeats: int = 3, memory: bool = True) -> Dict:
+    """Measures one case. The wall time is the best of the repeats, the traced memory is measured
+    in a separate run because tracing slows the code down.
+
+    Args:
+        case (dict): The parameters of the case
+        repeats (int, optional): The number of timed runs. Defaults to 3.
+        memory (bool, optional): Measure the peak of the memory allocated with tracemalloc. Defaults to True.
+
+    Returns:
+        dict: The parameters and the measurements of the case
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        run, n_rows = setup_case(case, workdir)
+        rss_before = peak_rss()
+
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+
+        result = dict(case, key=case_key(case), wall_time=min(times), mean_time=float(np.mean(times)),
+                      rows_per_sec=n_rows / min(times), peak_rss=peak_rss(), setup_rss=rss_before)
+
+        if memory:
+            tracemalloc.start()
+            run()
+            result['peak_tracemalloc'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    return result
+
+
+def run_cases(cases: List, repeats: int = 3, memory: bool = True, isolate: bool = True) -> List:
+    """Runs the cases one by one, each in a fresh process when isolate is True.
+
+    Args:
+        cases (list): The parameters of each case
+        repeats (int, optional): The number of timed runs of each case. Defaults to 3.
+        memory (bool, optional): Measure the traced memory. Defaults to True.
+        isolate (bool, optional): Run each case in a new process. Defaults to True.
+
+    Returns:
+        list: The results of the cases
+    """
+    results = []
+    for i, case in enumerate(cases, start=1):
+        if isolate:
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                result = pool.submit(run_case, case, repeats, memory).result()
+        else:
+            result = run_case(case, repeats, memory)
+
+        print(f"[{i}/{len(cases)}] {result['key']}: {result['wall_time']:.4f}s, "
+              f"{result['rows_per_sec']:,.0f} rows/s", flush=True)
+        results.append(result)
+
+    return results
+
+
+def environment() -> Dict:
+    """
+    Returns:
+        dict: The versions and the machine the results were measured on
+    """
+    return {'timestamp': datetime.datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+            'numpy': np.__version__, 'pandas': pd.__version__, 'platform': platform.platform(),
+            'processor': platform.processor(), 'cpu_count': os.cpu_count()}
+
+
+def compare(results: List, baseline: List, tolerance: float = 0.2) -> List:
+    """Compares the results with the baseline results of the same cases.
+
+    Args:
+        results (list): The new results
+        baseline (list): The baseline results
+        tolerance (float, optional): The allowed relative increase of the wall time and traced memory. Defaults to 0.2.
+
+    Returns:
+        list: The comparison of each case found in both, with a regression flag
+    """
+    baseline = {result['key']: result for result in baseline}
+
+    comparisons = []
+    for result in results:
+        if result['key'] not in baseline:
+            continue
+        base = baseline[result['key']]
+        comparison = {'key': result['key'], 'time_ratio': result['wall_time'] / base['wall_time']}
+        if 'peak_tracemalloc' in result and 'peak_tracemalloc' in base:
+            comparison['memory_ratio'] = result['peak_tracemalloc'] / max(base['peak_tracemalloc'], 1)
+        slower = (comparison['time_ratio'] > 1 + tolerance and
+                  result['wall_time'] - base['wall_time'] >= MIN_TIME_DELTA)
+        comparison['regression'] = slower or comparison.get('memory_ratio', 0) > 1 + tolerance
+        comparisons.append(comparison)
+
+    return comparisons
+
+
+def main(argv: List = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sweep', choices=sorted(SWEEPS), default='quick')
+    parser.add_argument('--benchmarks', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument('--kinds', nargs='+', choices=('categorical', 'numeric'), default=['categorical', 'numeric'])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', default='benchmarks/results.json')
+    parser.add_argument('--baseline', help='compare with the results in this file')
+    parser.add_argument('--save-baseline', action='store_true', help='also write the results to --baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--no-memory', action='store_true', help="don't measure the traced memory")
+    parser.add_argument('--in-process', action='store_true', help='run all the cases in this process')
+    args = parser.parse_args(argv)
+
+    cases = make_cases(args.sweep, args.benchmarks, args.kinds)
+    results = run_cases(cases, args.repeats, not args.no_memory, not args.in_process)
+    report = {'environment': environment(), 'sweep': args.sweep, 'results': results}
+
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=1)
+    print(f"Results written to {args.output}")
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(report, file, indent=1)
+        print(f"Baseline written to {args.baseline}")
+
+    elif args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        comparisons = compare(results, baseline['results'], args.tolerance)
+
+        for comparison in comparisons:
+            flag = 'REGRESSION' if comparison['regression'] else 'ok'
+            memory_ratio = comparison.get('memory_ratio')
+            print(f"{comparison['key']}: time x{comparison['time_ratio']:.2f}" +
+                  (f", memory x{memory_ratio:.2f}" if memory_ratio is not None else "") + f" {flag}")
+
+        if any(comparison['regression'] for comparison in comparisons):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
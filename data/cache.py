@@ -0,0 +1,133 @@
+from typing import Dict, List, Tuple
+import pandas as pd
+import numpy as np
+import hashlib
+import json
+import os
+
+CACHE_VERSION = 2
+
+
+class DatasetCache:
+    """DatasetCache stores encoded datasets in a binary directory format that is memory-mapped on later runs.
+
+    Every column of every split is stored as an .npy file, and meta.json keeps the column names,
+    the category vocabularies, the values that marked missing features and the fingerprints (mtime, size, sha256)
+    of the source files. The cache is invalid when any source file or the missing values have changed.
+    """
+
+    def __init__(self, cache_dir: str = './cache') -> None:
+        """
+        Args:
+            cache_dir (str, optional): The directory of the cache. Defaults to './cache'.
+        """
+        self.cache_dir = cache_dir
+        self.meta_path = os.path.join(cache_dir, 'meta.json')
+
+    def fingerprint(self, file_path: str, file_hash: bool = True) -> Dict:
+        """
+        Args:
+            file_path (str): The path to the source file
+            file_hash (bool, optional): Whether to compute the sha256 of the file. Defaults to True.
+
+        Returns:
+            dict: The mtime, size and sha256 of the file
+        """
+        stat = os.stat(file_path)
+        fingerprint = {'path': os.path.abspath(file_path), 'mtime': stat.st_mtime_ns, 'size': stat.st_size}
+
+        if file_hash:
+            sha256 = hashlib.sha256()
+            with open(file_path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    sha256.update(block)
+            fingerprint['sha256'] = sha256.hexdigest()
+
+        return fingerprint
+
+    def _read_meta(self) -> Dict:
+        with open(self.meta_path) as f:
+            return json.load(f)
+
+    def _write_meta(self, meta: Dict) -> None:
+        with open(self.meta_path, 'w') as f:
+            json.dump(meta, f)
+
+    def is_valid(self, source_paths: List, columns: List, missing_values: List = ()) -> bool:
+        """Checks that the cache was made from the same source files, columns and missing values.
+        Files with a different mtime or size are hashed, so only touched files keep the cache valid.
+
+        Args:
+            source_paths (list): The paths to the source files
+            columns (list): The names of the columns
+            missing_values (list, optional): The values that mark missing features. Defaults to ().
+
+        Returns:
+            bool: Whether the cache can be used
+        """
+        if not os.path.exists(self.meta_path):
+            return False
+
+        meta = self._read_meta()
+        if meta['version'] != CACHE_VERSION or meta['columns'] != list(columns) or \
+                meta.get('missing_values') != list(missing_values) or len(meta['sources']) != len(source_paths):
+            return False
+
+        updated = False
+        for cached, source_path in zip(meta['sources'], source_paths):
+            current = self.fingerprint(source_path, file_hash=False)
+            if cached['path'] != current['path']:
+                return False
+            if cached['mtime'] != current['mtime'] or cached['size'] != current['size']:
+                current = self.fingerprint(source_path)
+                if cached['sha256'] != current['sha256']:
+                    return False
+                cached.update(current)
+                updated = True
+
+        if updated:
+            self._write_meta(meta)
+
+        return True
+
+    def save(self, splits: Dict, vocabularies: Dict, source_paths: List, missing_values: List = ()) -> None:
+        """Writes the encoded splits to the cache.
+
+        Args:
+            splits (dict): The encoded DataFrame of each split (e.g. train and test)
+            vocabularies (dict): The category vocabulary of each column
+            source_paths (list): The paths to the source files
+            missing_values (list, optional): The values that marked missing features. Defaults to ().
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        columns = list(next(iter(splits.values())).columns)
+
+        for split, df in splits.items():
+            for i, column in enumerate(columns):
+                np.save(os.path.join(self.cache_dir, f'{split}_{i}.npy'), df[column].to_numpy())
+
+        meta = {'version': CACHE_VERSION,
+                'columns': columns,
+                'splits': list(splits),
+                'vocabularies': {column: np.asarray(values).tolist() for column, values in vocabularies.items()},
+                'missing_values': list(missing_values),
+                'sources': [self.fingerprint(source_path) for source_path in source_paths]}
+        self._write_meta(meta)
+
+    def load(self) -> Tuple:
+        """Memory-maps the cached splits.
+
+        Returns:
+            Tuple: A dict of the DataFrame of each split and a dict of the vocabulary of each column
+        """
+        meta = self._read_meta()
+
+        splits = {}
+        for split in meta['splits']:
+            splits[split] = pd.DataFrame({column: np.load(os.path.join(self.cache_dir, f'{split}_{i}.npy'),
+                                                          mmap_mode='r')
+                                          for i, column in enumerate(meta['columns'])}, copy=False)
+
+        vocabularies = {column: np.array(values) for column, values in meta['vocabularies'].items()}
+
+        return splits, vocabularies
@@ -1,4 +1,7 @@
 import pandas as pd
+import numpy as np
+
+from data.cache import DatasetCache
 
 
 class DataLoader:
@@ -6,14 +9,26 @@ class DataLoader:
                  train_path: str,
                  test_path: str,
                  feature_names: list,
+                 missing_values: tuple = ('?',),
                  ) -> None:
+        """
+        Args:
+            train_path (str): The path to the train dataset file
+            test_path (str): The path to the test dataset file
+            feature_names (list): The names of the feature columns
+            missing_values (tuple, optional): The values that mark missing features, they aren't categories
+                and are encoded as the reserved code MISSING, so the trees are trained with missing_code=MISSING.
+                Defaults to ('?',).
+        """
         self.train_path = train_path
         self.test_path = test_path
         self.feature_names = feature_names
         self.feature_names.insert(0, 'label')
+        self.missing_values = missing_values
+        self.vocabularies = {}
 
     def _convert2df(self, file_path: str, columns: list) -> pd.DataFrame:
-        """Converts the dataset to a pandas.DataFrame.
+        """Converts the dataset to a pandas.DataFrame with a single bulk read. All the values are kept as strings.
 
         Args:
             file_path (str): The path to the dataset file
@@ -22,16 +37,37 @@ class DataLoader:
         Returns:
             pd.DataFrame: Dataset in DataFrame format
         """
-        df = pd.DataFrame(columns=columns)
+        return pd.read_csv(file_path, header=None, names=columns, dtype=str, na_filter=False)
+
+    def _known_values(self, column: str, values: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            column (str): The name of the column
+            values (np.ndarray): Values of the column
+
+        Returns:
+            np.ndarray: The values that don't mark missing features
+        """
+        if column == 'label' or not self.missing_values:
+            return values
+
+        return values[~np.isin(values, list(self.missing_values))]
 
-        with open(file_path) as f:
-            for i, line in enumerate(f):
-                line = line.strip().split(',')
-                df.loc[i] = line
-        return df
+    def _fit_vocabularies(self, dfs: list) -> None:
+        """Builds one sorted category vocabulary per column shared by all the given DataFrames,
+        so the same category gets the same code in train and test data.
+
+        Args:
+            dfs (list): The DataFrames with categorical data
+        """
+        for column in self.feature_names:
+            values = pd.unique(np.concatenate([df[column].to_numpy() for df in dfs]))
+            self.vocabularies[column] = np.sort(self._known_values(column, values))
 
     def _tonumerical(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Converts categorical data features and labels to numerical data.
+        """Converts categorical data features and labels to numerical data. Each column is encoded
+        by the position of its values in the shared vocabulary, using the smallest integer type that fits the
+        vocabulary. Columns without a vocabulary get one from the values of df. Missing values are encoded as MISSING.
 
         Args:
             df (pd.DataFrame): The input DataFrame with categorical data
@@ -39,25 +75,48 @@ class DataLoader:
         Returns:
             pd.DataFrame: The output DataFrame with numerical data
         """
-        # making a copy of the input DataFrame
-        df_copy = df.copy()
-        # number of columns of df
-        n_col = df.shape[1]
-        # number of rows of df
-        n_rows = len(df)
-
-        # converting categorical data to numerical (could it be faster?)
-        for i in range(n_col):
-            # separating unique values
-            unique_values = list(set(df_copy.iloc[:, i]))
-            unique_values.sort()
-            uniques_dict = dict(
-                zip(unique_values, list(range(len(unique_values)))))
-
-            for j in range(n_rows):
-                df_copy.iloc[j][i] = uniques_dict[df_copy.iloc[j][i]]
-
-        return df_copy
+        for column in df.columns:
+            if column not in self.vocabularies:
+                self.vocabularies[column] = np.sort(self._known_values(column, pd.unique(df[column].to_numpy())))
+
+        return pd.DataFrame({column: pd.Categorical(df[column], categories=self.vocabularies[column]).codes
+                             for column in df.columns})
+
+    def fit_vocabularies_from_files(self, file_paths: list, chunksize: int = 100000) -> None:
+        """Builds the shared vocabularies by reading the original files in chunks.
+
+        Args:
+            file_paths (list): The paths to the dataset files
+            chunksize (int, optional): The number of lines in each chunk. Defaults to 100000.
+        """
+        values = {column: set() for column in self.feature_names}
+
+        for file_path in file_paths:
+            for chunk in pd.read_csv(file_path, header=None, names=self.feature_names, dtype=str,
+                                     na_filter=False, chunksize=chunksize):
+                for column in self.feature_names:
+                    values[column].update(pd.unique(chunk[column].to_numpy()))
+
+        self.vocabularies = {column: np.sort(self._known_values(column, np.array(list(column_values))))
+                             for column, column_values in values.items()}
+
+    def iter_chunks(self, file_path: str, chunksize: int = 100000):
+        """Reads an original dataset file in chunks and encodes each chunk with the shared vocabularies.
+        The vocabularies are built from the train and test files first if they aren't known yet.
+
+        Args:
+            file_path (str): The path to the dataset file
+            chunksize (int, optional): The number of lines in each chunk. Defaults to 100000.
+
+        Yields:
+            pd.DataFrame: The encoded chunks
+        """
+        if not self.vocabularies:
+            self.fit_vocabularies_from_files([self.train_path, self.test_path], chunksize)
+
+        for chunk in pd.read_csv(file_path, header=None, names=self.feature_names, dtype=str,
+                                 na_filter=False, chunksize=chunksize):
+            yield self._tonumerical(chunk)
 
     def create_csv(self, train_csv_path: str = 'data/train.csv', test_csv_path: str = 'data/test.csv') -> None:
         """Creates csv file of  the train and test dataset as DataFrame.
@@ -70,7 +129,8 @@ class DataLoader:
         # converting test dataset to DataFrame
         test_df = self._convert2df(self.test_path, self.feature_names)
 
-        # converting categorical data to numerical
+        # converting categorical data to numerical with shared vocabularies
+        self._fit_vocabularies([train_df, test_df])
         train_df = self._tonumerical(train_df)
         test_df = self._tonumerical(test_df)
 
@@ -92,7 +152,8 @@ class DataLoader:
         # converting test dataset to DataFrame
         test_df = self._convert2df(self.test_path, self.feature_names)
 
-        # converting categorical data to numerical
+        # converting categorical data to numerical with shared vocabularies
+        self._fit_vocabularies([train_df, test_df])
         train_df = self._tonumerical(train_df)
         test_df = self._tonumerical(test_df)
 
@@ -117,4 +178,30 @@ class DataLoader:
             test_df = pd.read_csv(test_csv_path)
             return train_df, test_df
         
-        return train_df
\ No newline at end of file
+        return train_df
+
+    def load_from_cache(self, load_test: bool = True, cache_dir: str = './cache') -> pd.DataFrame:
+        """Loads the data from the binary cache of the original files. The cache is created, or recreated
+        when the original files or the missing values have changed, with load_from_file and it is memory-mapped
+        on later runs.
+
+        Args:
+            load_test (bool, optional): determines to whether load test data. Defaults to True.
+            cache_dir (str, optional): The directory of the cache. Defaults to './cache'.
+
+        Returns:
+            pd.DataFrame: Train [and Test] data
+        """
+        cache = DatasetCache(cache_dir)
+        source_paths = [self.train_path, self.test_path]
+
+        if not cache.is_valid(source_paths, self.feature_names, self.missing_values):
+            train_df, test_df = self.load_from_file(True)
+            cache.save({'train': train_df, 'test': test_df}, self.vocabularies, source_paths, self.missing_values)
+
+        splits, self.vocabularies = cache.load()
+
+        if load_test:
+            return splits['train'], splits['test']
+
+        return splits['train']
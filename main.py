@@ -1,9 +1,7 @@
 from data.dataloader import DataLoader
-from models.decision_tree import DecisionTree
+from models.evaluation import Evaluator
+from utils.encoder import MISSING
 from utils.ui import UI
-from utils.metrics import accuracy
-from sklearn.model_selection import train_test_split, KFold
-import numpy as np
 
 
 if __name__ == "__main__":
@@ -18,6 +16,8 @@ if __name__ == "__main__":
             ui.load_test, ui.train_path, ui.test_path)
     elif ui.load_option == 2:
         data = dataloader.load_from_file(ui.load_test)
+    elif ui.load_option == 4:
+        data = dataloader.load_from_cache(ui.load_test)
     else:
         dataloader.create_csv("./train.csv", "./test.csv")
         data = dataloader.load_from_csv(
@@ -26,107 +26,53 @@ if __name__ == "__main__":
     if ui.load_test:
         train_data, test_data = data
     else:
-        train_data = data
+        train_data, test_data = data, None
 
-    # Initialize the Decision Tree
-    tree = DecisionTree(max_length=ui.max_length, target_label=ui.target_label)
+    # Folds and repeats are trained in parallel by the evaluator,
+    # the DataLoader encodes the missing values as MISSING
+    evaluator = Evaluator(max_length=ui.max_length, target_label=ui.target_label, n_jobs=ui.n_jobs,
+                          tree_params={'missing_code': MISSING})
 
     if ui.kfold:
-        train_accs = []
-        val_accs = []
-        test_accs = []
-        kf = KFold(ui.n_folds, shuffle=True)
-        fold = 1
+        results = evaluator.kfold(train_data, ui.n_folds, test_data)
 
-        for train_index, val_index in kf.split(train_data):
-            train_samples, val_samples = train_data.loc[train_index], train_data.loc[val_index]
-
-            # training
-            tree.train(train_samples, 0.01)
-
-            # train accuracy
-            pred, true = tree.predict(train_data)
-            currnent_train_acc = accuracy(pred, true)
-            train_accs.append(currnent_train_acc)
-            print(f"Train Accuracy in fold #{fold}: {currnent_train_acc:.3f}")
-
-            # validation
-            pred, true = tree.predict(val_samples)
-
-            # validation accuracy
-            currnent_test_acc = accuracy(pred, true)
-            val_accs.append(currnent_test_acc)
+        for fold, result in enumerate(results, start=1):
             print(
-                f"Validatoin Accuracy in fold #{fold}: {currnent_test_acc:.3f}")
-
-            fold += 1
-
-        # test accuracy
-        pred, true = tree.predict(test_data)
-        test_acc = accuracy(pred, true)
-
-        train_acc = np.mean(train_accs)
-        val_acc = np.mean(val_accs)
-
-        print(f"Train average accuracy wiht {ui.n_folds}-fold CV: {train_acc}")
-        print(
-            f"Validation average accuracy wiht {ui.n_folds}-fold CV: {val_acc}")
-        print(f"Test average accuracy wiht {ui.n_folds}-fold CV: {test_acc}")
-
-    elif ui.data_split:
-
-        train_accs = []
-        test_accs = []
-        for i in range(ui.train_repeat):
-            train_samples, val_samples = train_test_split(
-                train_data, train_size=ui.train_split_prc, shuffle=True)
-            # training
-            tree.train(train_samples, 0.01)
-
-            # train accuracy
-            pred, true = tree.predict(train_data)
-            currnent_train_acc = accuracy(pred, true)
-            train_accs.append(currnent_train_acc)
-            print(f"Train Accuracy in trial #{i+1}: {currnent_train_acc:.3f}")
-
-            # test accuracy
-            test_pred, test_true = tree.predict(test_data)
-            currnent_test_acc = accuracy(test_pred, test_true)
-            test_accs.append(currnent_test_acc)
-            print(f"Test Accuracy in trial #{i+1}: {currnent_test_acc:.3f}")
+                f"Train Accuracy in fold #{fold}: {result['train_accuracy']:.3f}")
+            print(
+                f"Validatoin Accuracy in fold #{fold}: {result['validation_accuracy']:.3f}")
 
-        train_acc = np.mean(train_accs)
-        test_acc = np.mean(test_accs)
+        summary = evaluator.summary(results)
 
         print(
-            f"Train average accuracy with {ui.train_repeat} repeats: {train_acc:.3f}")
+            f"Train average accuracy wiht {ui.n_folds}-fold CV: {summary['train_accuracy']}")
         print(
-            f"Test average accuracy with {ui.train_repeat} repeats: {test_acc:.3f}")
+            f"Validation average accuracy wiht {ui.n_folds}-fold CV: {summary['validation_accuracy']}")
+        if test_data is not None:
+            print(
+                f"Test average accuracy wiht {ui.n_folds}-fold CV: {summary['test_accuracy']}")
 
     else:
-        train_accs = []
-        test_accs = []
-        for i in range(ui.train_repeat):
-            train_samples = train_data
-            # training
-            tree.train(train_samples, 0.01)
+        if ui.data_split:
+            results = evaluator.repeated_split(
+                train_data, ui.train_split_prc, ui.train_repeat, test_data)
+        else:
+            results = evaluator.repeat(train_data, ui.train_repeat, test_data)
 
-            # train accuracy
-            pred, true = tree.predict(train_data)
-            currnent_train_acc = accuracy(pred, true)
-            train_accs.append(currnent_train_acc)
-            print(f"Train Accuracy in trial #{i+1}: {currnent_train_acc:.3f}")
-
-            # test accuracy
-            test_pred, test_true = tree.predict(test_data)
-            currnent_test_acc = accuracy(test_pred, test_true)
-            test_accs.append(currnent_test_acc)
-            print(f"Test Accuracy in trial #{i+1}: {currnent_test_acc:.3f}")
+        for i, result in enumerate(results):
+            print(
+                f"Train Accuracy in trial #{i+1}: {result['train_accuracy']:.3f}")
+            if test_data is not None:
+                print(
+                    f"Test Accuracy in trial #{i+1}: {result['test_accuracy']:.3f}")
 
-        train_acc = np.mean(train_accs)
-        test_acc = np.mean(test_accs)
+        summary = evaluator.summary(results)
 
         print(
-            f"Train average accuracy with {ui.train_repeat} repeats: {train_acc:.3f}")
-        print(
-            f"Test average accuracy with {ui.train_repeat} repeats: {test_acc:.3f}")
+            f"Train average accuracy with {ui.train_repeat} repeats: {summary['train_accuracy']:.3f}")
+        if test_data is not None:
+            print(
+                f"Test average accuracy with {ui.train_repeat} repeats: {summary['test_accuracy']:.3f}")
+
+    print(
+        f"Average time per tree: training {summary['train_time']:.3f}s, prediction {summary['predict_time']:.3f}s")
@@ -0,0 +1,132 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+from models.flat_tree import FlatTree
+import pandas as pd
+import numpy as np
+import os
+
+# the number of rows routed by a thread at a time, the arrays of a shard stay in the cache
+SHARD_SIZE = 65536
+
+
+class BatchPredictor:
+    """BatchPredictor scores large batches of samples with a compiled tree on a pool of threads.
+
+    The rows are cut into shards and each thread encodes and routes its own shards through the same FlatTree.
+    The work on a shard is a few NumPy operations on whole arrays per level of the tree, searchsorted and the
+    gathers from the node arrays, which release the GIL, so the shards run on all the cores without copying
+    the tree or the samples into other processes. Encoding categorical columns with Python objects still
+    holds the GIL, integer coded and numeric columns don't.
+    """
+
+    def __init__(self, flat_tree: FlatTree, roots: np.ndarray = None, n_threads: int = None,
+                 shard_size: int = SHARD_SIZE) -> None:
+        """
+        Args:
+            flat_tree (FlatTree): The compiled tree
+            roots (np.ndarray, optional): The roots of stacked trees. Defaults to None.
+            n_threads (int, optional): The number of threads, -1 uses all the cores. Defaults to None which is 1.
+            shard_size (int, optional): The number of rows of each shard. Defaults to SHARD_SIZE.
+        """
+        self.flat_tree = flat_tree
+        self.roots = roots
+        self.n_threads = os.cpu_count() if n_threads == -1 else (n_threads or 1)
+        self.shard_size = shard_size
+        self.pool = None
+
+    def __enter__(self) -> "BatchPredictor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stops the threads of the pool."""
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def shards(self, n_samples: int) -> List:
+        """
+        Args:
+            n_samples (int): The number of samples
+
+        Returns:
+            list: The [start, end) row ranges of the shards
+        """
+        # small batches are still cut so that every thread gets a shard
+        shard_size = max(1, min(self.shard_size, -(-n_samples // self.n_threads)))
+
+        return [(start, min(start + shard_size, n_samples)) for start in range(0, n_samples, shard_size)]
+
+    def map(self, function: Callable, samples: pd.DataFrame) -> List:
+        """Calls the function on each shard of the samples, on the threads of the pool.
+
+        Args:
+            function (Callable): Maps a shard of the samples to its result
+            samples (pd.DataFrame): Data samples
+
+        Returns:
+            list: The result of each shard in the order of the rows
+        """
+        shards = [samples.iloc[start:end] for start, end in self.shards(len(samples))]
+        if self.n_threads == 1 or len(shards) == 1:
+            return [function(shard) for shard in shards]
+
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(self.n_threads)
+
+        return list(self.pool.map(function, shards))
+
+    def apply_shard(self, samples: pd.DataFrame) -> np.ndarray:
+        """
+        Args:
+            samples (pd.DataFrame): A shard of the samples
+
+        Returns:
+            np.ndarray: The index of the final node of each sample, see FlatTree.apply
+        """
+        return self.flat_tree.apply(self.flat_tree.encode(samples), self.roots)
+
+    def apply(self, samples: pd.DataFrame) -> np.ndarray:
+        """Routes the samples through the tree, in parallel shards.
+
+        Args:
+            samples (pd.DataFrame): Data samples
+
+        Returns:
+            np.ndarray: The index of the final node of each sample, with the shape (n_trees, n_samples)
+                for stacked trees
+        """
+        if len(samples) == 0:
+            return self.apply_shard(samples)
+
+        return np.concatenate(self.map(self.apply_shard, samples), axis=-1)
+
+    def predict(self, samples: pd.DataFrame) -> np.ndarray:
+        """Predicts the labels of the samples in their original order, like FlatTree.predict.
+
+        Args:
+            samples (pd.DataFrame): Data samples
+
+        Returns:
+            np.ndarray: The predicted labels
+        """
+        if self.roots is not None:
+            raise(TypeError("The labels of stacked trees are predicted by their votes"))
+
+        return self.flat_tree.decode(self.flat_tree.label[self.apply(samples)])
+
+    def predict_proba(self, samples: pd.DataFrame) -> np.ndarray:
+        """Predicts the class probabilities of the samples in their original order, like FlatTree.predict_proba.
+        The probabilities of stacked trees are averaged.
+
+        Args:
+            samples (pd.DataFrame): Data samples
+
+        Returns:
+            np.ndarray: The probabilities with the shape (n_samples, n_classes)
+        """
+        probabilities = self.flat_tree.probabilities()[self.apply(samples)]
+
+        return probabilities if self.roots is None else probabilities.mean(axis=0)
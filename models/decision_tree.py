@@ -1,8 +1,19 @@
-from typing import Any, Tuple
-from utils.node import Node
+from typing import Any, Callable, Iterable, Iterator, Mapping, Tuple
+from utils.node import Node, n_candidate_features, shared_counts
+from utils.node_stats import NodeStats
 import pandas as pd
 import numpy as np
 
+from models.batch_predictor import BatchPredictor
+from models.flat_tree import FlatTree
+from models.pruner import Pruner
+from models.incremental_builder import IncrementalTreeBuilder
+from models.stream_builder import StreamTreeBuilder
+from models.tree_builder import TreeBuilder
+from utils.binning import Binner
+from utils.encoder import MISSING, Encoder, missing_mask
+from utils.information_gain import InformationGain
+from utils.profiler import NULL_PROFILER, Profiler
 from utils.stack import Stack
 
 
@@ -10,16 +21,71 @@ class DecisionTree():
     """This class the tree data structure using hierarchical sturucture of the tree and 
     parent and child nodes."""
 
-    def __init__(self, starter_node: Node = None, max_length: int = None, target_label: str = 'label') -> None:
+    def __init__(self, starter_node: Node = None, max_length: int = None, target_label: str = 'label',
+                 array_backed: bool = True, n_jobs: int = None, numeric_features: list = None,
+                 max_bins: int = 255, max_features: Any = None, random_state: int = None,
+                 criterion: Any = None, min_samples_split: int = 2, min_samples_leaf: int = 1,
+                 min_information_gain: float = None, max_leaf_nodes: int = None, max_categories: int = None,
+                 warm_start: bool = False, n_threads: int = None, missing_code: int = None,
+                 profiler: Profiler = None) -> None:
         """
         Args:
             starter_node (Node, optional): The root node of the tree. Defaults to None.
             max_length (int, optional): Maximum allowed length of tree. Defaults to None.
             target_label (str, optional): The label of the target data column. Defaults to 'label'.
+            array_backed (bool, optional): Train on an encoded integer matrix instead of
+                splitting DataFrames in each node, needed for features with missing values. Defaults to True.
+            n_jobs (int, optional): The number of processes used for array backed training,
+                -1 uses all the cores. Defaults to None.
+            numeric_features (list, optional): Features that are binned and split with thresholds
+                in array backed training. Defaults to the float columns of the samples.
+            max_bins (int, optional): The maximum number of bins of numeric features. Defaults to 255.
+            max_features (Any, optional): The number of randomly chosen candidate features of each split:
+                an int, a float portion of the features, 'sqrt' or 'log2'. Defaults to None which uses all the features.
+            random_state (int, optional): The seed of the feature sampling. Defaults to None.
+            criterion (Any, optional): The criterion scoring the splits: 'entropy', 'gini', 'gain_ratio',
+                'chi_square' or a Criterion. Defaults to None which is entropy.
+            min_samples_split (int, optional): The minimum number of samples of a node that is split. Defaults to 2.
+            min_samples_leaf (int, optional): The minimum number of samples of each child of a split. Defaults to 1.
+            min_information_gain (float, optional): The minimum gain of a split. Defaults to None.
+            max_leaf_nodes (int, optional): The maximum number of leaves, the tree is grown best-first
+                by the highest gain. Defaults to None.
+            max_categories (int, optional): The maximum number of children of a categorical split. Defaults to None.
+            The pre-pruning limits are only supported by array backed and stream training.
+            warm_start (bool, optional): Keep the statistics of array backed training so the tree can be
+                refreshed with new samples by update. Defaults to False.
+            n_threads (int, optional): The number of threads that predict shards of large batches,
+                -1 uses all the cores. Defaults to None which predicts in the calling thread.
+            missing_code (int, optional): The code of missing values in integer columns that are already encoded,
+                MISSING for the samples of the DataLoader. Defaults to None: only NaN and None are missing and
+                integers, -1 included, are categories.
+            profiler (Profiler, optional): Records the phase timers and counters of training. Defaults to None.
         """
         self.target_label = target_label
         self.starter_node = starter_node
+        self.feature_names = None
+        # the sorted classes of the training samples, the columns of the class counts and probabilities
+        self.classes = None
         self.max_length = max_length
+        self.array_backed = array_backed
+        self.n_jobs = n_jobs
+        self.numeric_features = numeric_features
+        self.max_bins = max_bins
+        self.max_features = max_features
+        self.random_state = random_state
+        self.criterion = criterion
+        self.min_samples_split = min_samples_split
+        self.min_samples_leaf = min_samples_leaf
+        self.min_information_gain = min_information_gain
+        self.max_leaf_nodes = max_leaf_nodes
+        self.max_categories = max_categories
+        self.warm_start = warm_start
+        self.n_threads = n_threads
+        self.missing_code = missing_code
+        self.profiler = profiler
+        self.flat_tree = None
+        # the builder that keeps the statistics of a warm started tree
+        self.incremental = None
 
     def add_nodes(self, node: Node, samples: pd.DataFrame = None, added_nodes: Node = None) -> None:
         """This method is used to add child nodes to another node in the tree.
@@ -31,6 +97,10 @@ class DecisionTree():
             samples (pd.DataFrame, optional): Data samples. Defaults to None.
             added_nodes (Node, optional): added nodes. Defaults to None.
         """
+        self.flat_tree = None
+        self.incremental = None
+        node.child_map = None
+
         if samples:
             node.create_nodes(samples)
 
@@ -47,11 +117,80 @@ class DecisionTree():
             src_node (Node): The source node (parent node)
             deleted_nodes (Node): Nodes to be deleted
         """
+        self.flat_tree = None
+        self.incremental = None
+        src_node.child_map = None
+
         for deleted_node in deleted_nodes:
             src_node.child_nodes.remove(deleted_node)
     
     def reset_tree(self):
         self.starter_node = None
+        self.flat_tree = None
+        self.incremental = None
+
+    def pre_pruning(self) -> dict:
+        """
+        Returns:
+            dict: The pre-pruning limits of the tree builders
+        """
+        return {'min_samples_split': self.min_samples_split, 'min_samples_leaf': self.min_samples_leaf,
+                'min_information_gain': self.min_information_gain, 'max_leaf_nodes': self.max_leaf_nodes,
+                'max_categories': self.max_categories}
+
+    def root(self) -> Node:
+        """
+        Returns:
+            Node: The root node, rebuilt from the compiled tree for loaded trees
+        """
+        if not self.starter_node:
+            self.starter_node = self.compile().to_node(self.target_label)
+
+        return self.starter_node
+
+    def compile(self) -> FlatTree:
+        """Compiles the trained nodes into the flat array representation used for prediction.
+        The compiled tree is cached until the tree is trained again.
+
+        Returns:
+            FlatTree: The compiled tree
+        """
+        if self.flat_tree is None:
+            if not self.starter_node:
+                raise(TypeError("The decision tree hasn't been trained"))
+            self.flat_tree = FlatTree.compile(self.starter_node, classes=self.classes, missing_code=self.missing_code)
+
+        return self.flat_tree
+
+    def save(self, path: str) -> None:
+        """Saves the compiled tree to a binary model file.
+
+        Args:
+            path (str): The path to the model file
+        """
+        self.compile().save(path, {'target_label': self.target_label, 'max_length': self.max_length,
+                                   'feature_names': self.feature_names})
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "DecisionTree":
+        """Loads a tree saved by DecisionTree.save. The nodes are rebuilt only when they are needed.
+
+        Args:
+            path (str): The path to the model file
+            mmap (bool, optional): Memory-map the model read-only. Defaults to True.
+
+        Returns:
+            DecisionTree: The loaded tree
+        """
+        flat_tree, meta = FlatTree.load(path, mmap)
+
+        tree = cls(max_length=meta['max_length'], target_label=meta['target_label'],
+                   missing_code=flat_tree.missing_code)
+        tree.feature_names = meta['feature_names']
+        tree.classes = flat_tree.classes
+        tree.flat_tree = flat_tree
+
+        return tree
 
     def train(self, samples: pd.DataFrame, epsilon: float = 0.01) -> None:
         """Trains the tree by initializing a root node and iterating over
@@ -64,61 +203,310 @@ class DecisionTree():
         # initialize the decision tree
         if self.starter_node:
             self.reset_tree()
-            
-        self.starter_node = Node(1, self.target_label)
+
+        self.feature_names = list(samples.columns.drop(self.target_label))
+        profiler = self.profiler or NULL_PROFILER
+
+        with profiler.phase('train'):
+            if self.array_backed:
+                self.train_arrays(samples, epsilon)
+            else:
+                self.train_nodes(samples, epsilon, profiler)
+
+        profiler.finish()
+
+    def train_nodes(self, samples: pd.DataFrame, epsilon: float = 0.01, profiler: Profiler = NULL_PROFILER) -> None:
+        """Trains the tree by splitting the DataFrame of the samples in each node.
+
+        Args:
+            samples (pd.DataFrame): Data samples
+            epsilon (float, optional): The minimum valus of the entropy for data in the node. Defaults to 0.01.
+            profiler (Profiler, optional): Records the phase timers and counters. Defaults to NULL_PROFILER.
+        """
+        if self.pre_pruning() != DecisionTree().pre_pruning():
+            raise(ValueError("The pre-pruning limits need array backed training"))
+        if self.warm_start:
+            raise(ValueError("warm_start needs array backed training"))
+        # the nodes split on the sorted values of a feature, NaN and None can't be sorted with the other values
+        missing = [name for name in samples.columns.drop(self.target_label)
+                   if missing_mask(samples[name].to_numpy()).any()]
+        if missing:
+            raise(ValueError(f"The features {missing} have missing values, they need array backed training "
+                             "(array_backed=True)"))
+
+        ig = None if self.criterion is None else InformationGain(self.target_label, self.criterion)
+        self.starter_node = Node(1, self.target_label, ig)
 
         # train sample and node pairs
         train_stack = Stack()
         train_stack.push((self.starter_node, samples))
+        rng = np.random.default_rng(self.random_state)
+        classes = np.unique(samples[self.target_label].to_numpy())
+        self.classes = classes
+        tree_counts = {}
 
         while(train_stack.size() > 0):
             stack_node, stack_samples = train_stack.pop()
-            loss = stack_node.calculate_loss(stack_samples)
+            # the statistics of the node samples live until the node is trained
+            stats = NodeStats(stack_samples, stack_node.ig)
+            node_classes, counts = stats.class_counts()
+            class_counts = np.zeros(len(classes), dtype=np.int64)
+            class_counts[np.searchsorted(classes, node_classes)] = counts
+            stack_node.class_counts = shared_counts(class_counts, tree_counts)
+
+            with profiler.phase('entropy'):
+                loss = stack_node.calculate_loss(stack_samples, stats)
             if loss >= epsilon and stack_node.n_stage < self.max_length:
-                stack_node.set_condition(stack_samples)
+                with profiler.phase('scoring'):
+                    stack_node.set_condition(stack_samples, self.max_features, rng, stats)
+                profiler.count('splits_scored', n_candidate_features(self.max_features, len(self.feature_names)))
 
-            node_pred = stack_node.train_node(stack_samples)
+            node_pred = stack_node.train_node(stack_samples, profiler, stats)
+            profiler.node(stack_node.n_stage, len(stack_samples), feature=stack_node.main_feature)
+            stats.clear()
 
             if node_pred:
+                profiler.count('nodes_expanded')
                 for node_data_pair in node_pred:
                     train_stack.push(node_data_pair)
 
+    def prune_reduced_error(self, samples: pd.DataFrame) -> int:
+        """Reduced-error pruning: turns every subtree that doesn't classify the validation samples better than
+        its root alone into a leaf.
+
+        Args:
+            samples (pd.DataFrame): Validation samples that weren't used for training
+
+        Returns:
+            int: The number of removed nodes
+        """
+        removed = Pruner(self.root()).reduced_error(samples, self.target_label, self.missing_code)
+        self.flat_tree = None
+        # the statistics of the pruned subtrees are lost
+        self.incremental = None
+
+        return removed
+
+    def prune_cost_complexity(self, alpha: float) -> int:
+        """Cost-complexity pruning: keeps the subtree with the lowest training error rate plus alpha
+        times the number of leaves. Needs the class counts that the nodes record in training.
+
+        Args:
+            alpha (float): The cost of each leaf, see cost_complexity_path
+
+        Returns:
+            int: The number of removed nodes
+        """
+        removed = Pruner(self.root()).cost_complexity(alpha)
+        self.flat_tree = None
+        self.incremental = None
+
+        return removed
+
+    def cost_complexity_path(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The alphas where prune_cost_complexity removes the next weakest subtree
+        """
+        return Pruner(self.root()).cost_complexity_path()
+
+    def train_arrays(self, samples: pd.DataFrame, epsilon: float = 0.01) -> None:
+        """Trains the tree by encoding the samples once into an integer matrix and growing
+        the nodes over index ranges of that matrix instead of DataFrame copies.
+        Numeric features are quantized into bins and split with binary thresholds.
+
+        Args:
+            samples (pd.DataFrame): Data samples
+            epsilon (float, optional): The minimum valus of the entropy for data in the node. Defaults to 0.01.
+        """
+        profiler = self.profiler or NULL_PROFILER
+        builder_class = IncrementalTreeBuilder if self.warm_start else TreeBuilder
+        options = {'missing_code': self.missing_code} if self.warm_start else {}
+        builder = builder_class(self.max_length, epsilon, self.target_label, self.n_jobs, self.max_features,
+                                self.random_state, self.criterion, profiler=profiler, **options,
+                                **self.pre_pruning())
+        with profiler.phase('encode'):
+            arrays = self.encode_arrays(samples)
+        self.starter_node = builder.build(*arrays)
+        self.classes = builder.classes
+        self.incremental = builder if self.warm_start else None
+
+    def update(self, new_samples: pd.DataFrame, epsilon: float = 0.01) -> None:
+        """Refreshes a warm started tree with new samples. The new samples are routed down the tree and added
+        to the class counts of the nodes on their path, and only the leaves that can now be split and the
+        subtrees whose best split changed are grown again, see IncrementalTreeBuilder.
+        A tree that hasn't been trained is trained on the new samples.
+
+        Args:
+            new_samples (pd.DataFrame): The new data samples with the features of the training samples
+            epsilon (float, optional): The minimum valus of the entropy for data in the node of the first training.
+                Defaults to 0.01.
+        """
+        if not self.starter_node and self.flat_tree is None:
+            self.train(new_samples, epsilon)
+            return
+        if self.incremental is None:
+            raise(TypeError("The tree doesn't have the statistics of warm_start training, "
+                            "it has to be trained with warm_start=True and not pruned"))
+
+        profiler = self.profiler or NULL_PROFILER
+        self.incremental.profiler = profiler
+        with profiler.phase('update'):
+            self.incremental.update(new_samples)
+        profiler.finish()
+
+        self.flat_tree = None
+
+    def encode_arrays(self, samples: pd.DataFrame) -> Tuple:
+        """Encodes the samples for array backed training. Categorical features are encoded by their
+        sorted categories and numeric features by their quantile bins, missing values get the code MISSING.
+
+        Args:
+            samples (pd.DataFrame): Data samples
+
+        Returns:
+            Tuple: The feature codes with the shape (n_features, n_samples) in the smallest signed integer type
+                that holds them, the class codes, the feature names,
+                the vocabularies or bin edges of the features, the classes and whether each feature is numeric
+        """
+        feature_names = samples.columns.drop(self.target_label)
+        if self.numeric_features is None:
+            numeric = [pd.api.types.is_float_dtype(samples[name]) for name in feature_names]
+        else:
+            numeric = [name in self.numeric_features for name in feature_names]
+
+        categorical_names = [name for name, is_numeric in zip(feature_names, numeric) if not is_numeric]
+        numeric_names = [name for name, is_numeric in zip(feature_names, numeric) if is_numeric]
+        encoder = Encoder(missing_code=self.missing_code).fit(samples, categorical_names)
+        binner = Binner(self.max_bins).fit(samples, numeric_names)
+
+        # the smallest signed type that holds the codes, the missing slot of the histograms and MISSING
+        n_codes = max([binner.n_bins(name) if is_numeric else encoder.n_values(name)
+                       for name, is_numeric in zip(feature_names, numeric)], default=0)
+        dtype = next(dtype for dtype in (np.int8, np.int16, np.int32) if n_codes <= np.iinfo(dtype).max)
+        codes = np.empty((len(feature_names), len(samples)), dtype=dtype)
+        vocabularies = []
+        for i, name in enumerate(feature_names):
+            if numeric[i]:
+                values = samples[name].to_numpy(dtype=np.float64)
+                codes[i] = binner.transform_column(name, values)
+                codes[i][np.isnan(values)] = MISSING
+                vocabularies.append(binner.edges[name])
+            else:
+                codes[i] = encoder.encode_column(name, samples[name].to_numpy())
+                vocabularies.append(encoder.vocabularies[name])
+        classes, labels = np.unique(samples[self.target_label].to_numpy(), return_inverse=True)
+
+        return codes, labels, feature_names, vocabularies, classes, numeric
+
+    def train_stream(self, chunk_source: Callable[[], Iterable[pd.DataFrame]], epsilon: float = 0.01,
+                     vocabularies: dict = None) -> None:
+        """Trains the tree on data that is read in chunks, with one pass over the data for each level of the tree.
+        Only the count tables of one level are kept in memory.
+
+        Args:
+            chunk_source (Callable): A function returning a new iterator over the DataFrame chunks,
+                e.g. lambda: dataloader.iter_chunks(path)
+            epsilon (float, optional): The minimum valus of the entropy for data in the node. Defaults to 0.01.
+            vocabularies (dict, optional): The sorted categories of each column including the target.
+                Defaults to an extra pass over the data to find them.
+        """
+        if self.starter_node:
+            self.reset_tree()
+
+        profiler = self.profiler or NULL_PROFILER
+        builder = StreamTreeBuilder(self.max_length, epsilon, self.target_label, criterion=self.criterion,
+                                    profiler=profiler, missing_code=self.missing_code, **self.pre_pruning())
+        with profiler.phase('train'):
+            self.starter_node = builder.build_stream(chunk_source, vocabularies)
+        self.feature_names = builder.feature_names
+        self.classes = builder.classes
+
+        profiler.finish()
+
+    def predictor(self) -> BatchPredictor:
+        """
+        Returns:
+            BatchPredictor: The predictor of the compiled tree with n_threads threads
+        """
+        return BatchPredictor(self.compile(), n_threads=self.n_threads)
+
     def predict(self, samples: pd.DataFrame) -> Tuple:
-        """Predicts the label for unknown data using the trained tree.
+        """Predicts the label for unknown data using the compiled tree. The predictions
+        are in the same order as the rows of the samples.
 
         Args:
             samples (pd.DataFrame): Data samples
 
         Returns:
-            Tuple: A tuple containing the predicted labels and ground truth
+            Tuple: A tuple containing the predicted labels and ground truth,
+                the ground truth is None if the samples don't have the target column
         """
+        with self.predictor() as predictor:
+            labels = predictor.predict(samples)
 
-        if not self.starter_node:
-            raise(TypeError("The decision tree hasn't been trained"))
+        if self.target_label not in samples.columns:
+            return labels, None
 
-        # prediction node data pair stack
-        pred_stack = Stack()
-        pred_stack.push((self.starter_node, samples))
+        return labels, samples[self.target_label].to_numpy()
 
-        labels = pd.DataFrame({'predicted_labels': []})
-        data = pd.DataFrame()
+    def predict_proba(self, samples: pd.DataFrame) -> np.ndarray:
+        """Predicts the class probabilities of the samples with one gather from the class counts of the final nodes.
 
-        while(pred_stack.size() > 0):
-            stack_node, stack_samples = pred_stack.pop()
+        Args:
+            samples (pd.DataFrame): Data samples
 
-            node_predict = stack_node.predict_node(stack_samples)
+        Returns:
+            np.ndarray: The probabilities with the shape (n_samples, n_classes), the columns are the classes
+                of compile().classes
+        """
+        with self.predictor() as predictor:
+            return predictor.predict_proba(samples)
 
-            if node_predict:
-                pred_data = zip(stack_node.child_nodes, node_predict)
-                for node_data_pair in pred_data:
-                    pred_stack.push(node_data_pair)
-            else:
-                pred_labels = pd.DataFrame(
-                    {'predicted_labels': len(stack_samples) * [stack_node.label]})
-                labels = pd.concat([labels, pred_labels], ignore_index=True)
-                data = pd.concat([data, stack_samples], ignore_index=True)
+    def predict_one(self, sample: Any) -> Any:
+        """Predicts the label of a single sample by walking the nodes with a dict lookup in each node,
+        without building a DataFrame. A sample with a value that a node hasn't seen in training
+        gets the majority label of that node, a feature that the sample doesn't have is a missing value.
+
+        Args:
+            sample (Any): A dict of feature values or a sequence of values in the training feature order
+
+        Returns:
+            Any: The predicted label
+        """
+        if not isinstance(sample, Mapping):
+            sample = dict(zip(self.feature_names, sample))
+
+        node = self.root()
+        while node.child_nodes:
+            child = node.route(sample.get(node.main_feature), self.missing_code)
+            if child is None:
+                break
+            node = child
+
+        return node.label
+
+    def predict_stream(self, chunks: Iterable, chunksize: int = 100000) -> Iterator[np.ndarray]:
+        """Predicts the labels of data that is read in chunks, so the memory doesn't grow with the size of the input.
+        The target column isn't needed.
+
+        Args:
+            chunks (Iterable): DataFrames, or arrays with the features in the training order,
+                or the path to a csv file with a header
+            chunksize (int, optional): The number of rows of each chunk read from a csv file. Defaults to 100000.
+
+        Yields:
+            np.ndarray: The predicted labels of each chunk
+        """
+        flat_tree = self.compile()
+
+        if isinstance(chunks, str):
+            chunks = pd.read_csv(chunks, chunksize=chunksize)
 
-        return labels.to_numpy(), data[self.target_label].to_numpy()
+        for chunk in chunks:
+            if not isinstance(chunk, pd.DataFrame):
+                chunk = pd.DataFrame(np.asarray(chunk), columns=self.feature_names, copy=False)
+            yield flat_tree.predict(chunk)
 
 if __name__ == "__main__":
     train_csv_path = './train.csv'
@@ -0,0 +1,262 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+from models.decision_tree import DecisionTree
+from models.fold_builder import FoldTreeBuilder
+from utils.encoder import MISSING, Encoder
+from utils.metrics import accuracy
+from utils.shared_array import SharedArray
+import pandas as pd
+import numpy as np
+import os
+import time
+
+# the shared datasets of each worker process
+_worker_data = None
+
+
+class Evaluator:
+    """Evaluator runs K-fold cross validation, repeated train/validation splits and plain repeated training,
+    with the folds and repeats trained concurrently in a process pool.
+
+    The train and test data are encoded once into numeric columns that are placed in shared memory, and each task
+    only receives its fold number or random seed, so the datasets are never copied to the workers.
+    """
+
+    def __init__(self, max_length: int, target_label: str = 'label', epsilon: float = 0.01,
+                 n_jobs: int = None, tree_params: Dict = None) -> None:
+        """
+        Args:
+            max_length (int): Maximum allowed length of the trees
+            target_label (str, optional): The label of the target data column. Defaults to 'label'.
+            epsilon (float, optional): The minimum value of the entropy for data in the node. Defaults to 0.01.
+            n_jobs (int, optional): The number of worker processes, -1 uses all the cores.
+                Defaults to None which runs the tasks in this process.
+            tree_params (dict, optional): Other parameters of the DecisionTree. Defaults to None.
+        """
+        self.max_length = max_length
+        self.target_label = target_label
+        self.epsilon = epsilon
+        self.n_jobs = os.cpu_count() if n_jobs == -1 else (n_jobs or 1)
+        self.tree_params = tree_params or {}
+
+    def kfold(self, train_data: pd.DataFrame, n_folds: int, test_data: pd.DataFrame = None,
+              random_state: int = None, shared_statistics: bool = False) -> List:
+        """Runs shuffled K-fold cross validation.
+
+        Args:
+            train_data (pd.DataFrame): Train data
+            n_folds (int): The number of folds
+            test_data (pd.DataFrame, optional): Test data evaluated by the tree of every fold. Defaults to None.
+            random_state (int, optional): The seed of the shuffle. Defaults to None.
+            shared_statistics (bool, optional): Train the trees of all the folds together in this process,
+                reusing the count tables of the nodes where the fold trees share their splits. Defaults to False.
+
+        Returns:
+            list: The metrics and timings of each fold
+        """
+        fold_ids = np.arange(len(train_data)) % n_folds
+        np.random.default_rng(random_state).shuffle(fold_ids)
+
+        if shared_statistics:
+            return self.shared_kfold(train_data, test_data, fold_ids, n_folds)
+
+        return self.run(train_data, test_data, [('fold', k) for k in range(n_folds)], fold_ids)
+
+    def shared_kfold(self, train_data: pd.DataFrame, test_data: pd.DataFrame, fold_ids: np.ndarray,
+                     n_folds: int) -> List:
+        """Trains the trees of all the folds with one FoldTreeBuilder, the train data is encoded once
+        for all the folds. The training time of each fold is its share of the total training time.
+
+        Args:
+            train_data (pd.DataFrame): Train data
+            test_data (pd.DataFrame): Test data or None
+            fold_ids (np.ndarray): The fold of each train sample
+            n_folds (int): The number of folds
+
+        Returns:
+            list: The metrics and timings of each fold
+        """
+        encoding_tree = DecisionTree(max_length=self.max_length, target_label=self.target_label, **self.tree_params)
+        builder = FoldTreeBuilder(self.max_length, self.epsilon, self.target_label,
+                                  criterion=self.tree_params.get('criterion'), **encoding_tree.pre_pruning())
+
+        start = time.perf_counter()
+        codes, labels, feature_names, vocabularies, classes, numeric = encoding_tree.encode_arrays(train_data)
+        roots = builder.build_folds(codes, labels, fold_ids, n_folds, feature_names, vocabularies, classes, numeric)
+        train_time = (time.perf_counter() - start) / n_folds
+
+        results = []
+        for fold, root in enumerate(roots):
+            tree = DecisionTree(starter_node=root, max_length=self.max_length, target_label=self.target_label,
+                                **self.tree_params)
+            tree.feature_names = list(feature_names)
+            tree.classes = classes
+            train_mask = fold_ids != fold
+            result = {'task': fold, 'train_time': train_time}
+            result.update(_evaluate(tree, train_data[train_mask], train_data[~train_mask], test_data))
+            results.append(result)
+
+        return results
+
+    def repeated_split(self, train_data: pd.DataFrame, train_size: float, n_repeats: int,
+                       test_data: pd.DataFrame = None, random_state: int = None) -> List:
+        """Trains on a random part of the train data and validates on the rest, n_repeats times.
+
+        Args:
+            train_data (pd.DataFrame): Train data
+            train_size (float): The portion of the train data used for training
+            n_repeats (int): The number of repeats
+            test_data (pd.DataFrame, optional): Test data. Defaults to None.
+            random_state (int, optional): The seed of the splits. Defaults to None.
+
+        Returns:
+            list: The metrics and timings of each repeat
+        """
+        seeds = np.random.SeedSequence(random_state).generate_state(n_repeats)
+
+        return self.run(train_data, test_data, [('split', (int(seed), train_size)) for seed in seeds])
+
+    def repeat(self, train_data: pd.DataFrame, n_repeats: int, test_data: pd.DataFrame = None) -> List:
+        """Trains on all the train data n_repeats times.
+
+        Args:
+            train_data (pd.DataFrame): Train data
+            n_repeats (int): The number of repeats
+            test_data (pd.DataFrame, optional): Test data. Defaults to None.
+
+        Returns:
+            list: The metrics and timings of each repeat
+        """
+        return self.run(train_data, test_data, n_repeats * [('all', None)])
+
+    def run(self, train_data: pd.DataFrame, test_data: pd.DataFrame, tasks: List,
+            fold_ids: np.ndarray = None) -> List:
+        """Runs the evaluation tasks either in this process or in the process pool.
+
+        Args:
+            train_data (pd.DataFrame): Train data
+            test_data (pd.DataFrame): Test data or None
+            tasks (list): Tuples of the task kind and its argument
+            fold_ids (np.ndarray, optional): The fold of each train sample. Defaults to None.
+
+        Returns:
+            list: The metrics and timings of each task
+        """
+        datasets = self.encode(train_data, test_data)
+        if fold_ids is not None:
+            datasets['folds'] = {'fold_ids': fold_ids}
+        # the encoded columns mark missing values with MISSING
+        params = (self.max_length, self.target_label, self.epsilon, {**self.tree_params, 'missing_code': MISSING})
+
+        if self.n_jobs == 1:
+            _init_worker(params, datasets)
+            return [_run_worker(i, *task) for i, task in enumerate(tasks)]
+
+        shared = {name: {column: SharedArray.create(array) for column, array in columns.items()}
+                  for name, columns in datasets.items()}
+        specs = {name: {column: array.spec for column, array in columns.items()}
+                 for name, columns in shared.items()}
+        try:
+            with ProcessPoolExecutor(self.n_jobs, initializer=_init_worker, initargs=(params, specs, True)) as pool:
+                futures = [pool.submit(_run_worker, i, *task) for i, task in enumerate(tasks)]
+                return [future.result() for future in futures]
+        finally:
+            for columns in shared.values():
+                for array in columns.values():
+                    array.close()
+
+    def encode(self, train_data: pd.DataFrame, test_data: pd.DataFrame = None) -> Dict:
+        """Converts the datasets to numeric column arrays. Non float columns are encoded
+        with vocabularies shared by train and test data and their missing values with MISSING.
+
+        Args:
+            train_data (pd.DataFrame): Train data
+            test_data (pd.DataFrame, optional): Test data. Defaults to None.
+
+        Returns:
+            dict: The column arrays of each dataset
+        """
+        frames = {'train': train_data} if test_data is None else {'train': train_data, 'test': test_data}
+        categorical = [column for column in train_data.columns
+                       if not pd.api.types.is_float_dtype(train_data[column])]
+        encoder = Encoder(missing_code=self.tree_params.get('missing_code'))
+        encoder.fit(pd.concat(list(frames.values()), ignore_index=True), categorical)
+
+        datasets = {}
+        for name, frame in frames.items():
+            datasets[name] = {column: encoder.encode_column(column, frame[column].to_numpy())
+                              if column in categorical else np.ascontiguousarray(frame[column].to_numpy())
+                              for column in frame.columns}
+
+        return datasets
+
+    def summary(self, results: List) -> Dict:
+        """
+        Args:
+            results (list): The results of the tasks
+
+        Returns:
+            dict: The mean of each metric and timing over the tasks
+        """
+        return {key: float(np.mean([result[key] for result in results]))
+                for key in results[0] if key != 'task'}
+
+
+def _init_worker(params: tuple, datasets: Dict, shared: bool = False) -> None:
+    """Sets up the datasets of the worker, attaching to shared memory in pool workers."""
+    global _worker_data
+
+    if shared:
+        attached = {name: {column: SharedArray.attach(spec) for column, spec in specs.items()}
+                    for name, specs in datasets.items()}
+        datasets = {name: {column: array.array for column, array in arrays.items()}
+                    for name, arrays in attached.items()}
+
+    frames = {name: pd.DataFrame(columns, copy=False) for name, columns in datasets.items() if name != 'folds'}
+    # the attached arrays are kept with the frames that use their memory
+    _worker_data = (params, frames, datasets.get('folds', {}).get('fold_ids'), attached if shared else None)
+
+
+def _run_worker(task_id: int, kind: str, argument) -> Dict:
+    """Trains and evaluates the tree of one fold or repeat."""
+    (max_length, target_label, epsilon, tree_params), frames, fold_ids, _ = _worker_data
+    train_data = frames['train']
+
+    if kind == 'fold':
+        train_mask = fold_ids != argument
+    elif kind == 'split':
+        seed, train_size = argument
+        train_mask = np.zeros(len(train_data), dtype=bool)
+        permutation = np.random.default_rng(seed).permutation(len(train_data))
+        train_mask[permutation[:int(round(train_size * len(train_data)))]] = True
+    else:
+        train_mask = np.ones(len(train_data), dtype=bool)
+    train_samples = train_data[train_mask]
+
+    tree = DecisionTree(max_length=max_length, target_label=target_label, **tree_params)
+
+    start = time.perf_counter()
+    tree.train(train_samples, epsilon)
+    train_time = time.perf_counter() - start
+
+    result = {'task': task_id, 'train_time': train_time}
+    result.update(_evaluate(tree, train_samples, None if train_mask.all() else train_data[~train_mask],
+                            frames.get('test')))
+
+    return result
+
+
+def _evaluate(tree: DecisionTree, train_samples: pd.DataFrame, validation_samples: pd.DataFrame,
+              test_samples: pd.DataFrame) -> Dict:
+    """Measures the accuracy of a trained tree on the given samples and the prediction time."""
+    result = {}
+
+    start = time.perf_counter()
+    result['train_accuracy'] = float(accuracy(*tree.predict(train_samples)))
+    if validation_samples is not None:
+        result['validation_accuracy'] = float(accuracy(*tree.predict(validation_samples)))
+    if test_samples is not None:
+        result['test_accuracy'] = float(accuracy(*tree.predict(test_samples)))
+    result['predict_time'] = time.perf_counter() - start
+
+    return result
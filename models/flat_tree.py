@@ -0,0 +1,462 @@
+from typing import Dict, List, Tuple
+from utils.encoder import MISSING, UNSEEN, missing_mask
+from utils.node import Node
+import pandas as pd
+import numpy as np
+import json
+import struct
+
+# file signature and version of the saved models
+MAGIC = b'DTREEBIN'
+FORMAT_VERSION = 1
+# alignment of the arrays in the saved models
+ALIGNMENT = 64
+
+
+class FlatTree:
+    """FlatTree is the compiled form of a trained tree. The nodes are stored in breadth first order
+    as parallel arrays, so batches of samples can be routed through the tree with vectorized gathers.
+
+    - feature[i]: index of the split feature of node i in feature_names or -1 for leaves
+    - child_offset[i]: start of the children of node i in child_table
+    - child_table[child_offset[i] + code]: the child of node i for the category code or -1 for unseen categories
+    - label[i]: index of the label of node i in classes
+    - default[i]: the child of node i for missing values or -1 if missing values stop at node i
+    - counts[i]: the class counts of the training samples of node i, the class probabilities of
+      its samples are a row gather of the normalized counts
+
+    Numeric features are encoded by the number of the tree thresholds of the feature that are smaller than the value,
+    so the threshold split of a node is also a lookup in the child table.
+    """
+
+    def __init__(self, feature_names: List, vocabularies: List, feature: np.ndarray, child_offset: np.ndarray,
+                 child_table: np.ndarray, label: np.ndarray, classes: np.ndarray, numeric: np.ndarray = None,
+                 default: np.ndarray = None, counts: np.ndarray = None, missing_code: int = None) -> None:
+        """
+        Args:
+            feature_names (list): The names of the features used by the tree
+            vocabularies (list): The sorted categories or thresholds of each feature used for encoding the samples
+            feature (np.ndarray): Split feature of each node
+            child_offset (np.ndarray): Offset of the children of each node in child_table
+            child_table (np.ndarray): Child node indices keyed by category code
+            label (np.ndarray): Label code of each node
+            classes (np.ndarray): The labels of the tree
+            numeric (np.ndarray, optional): Whether each feature is numeric. Defaults to None.
+            default (np.ndarray, optional): Default child of each node for missing values. Defaults to None.
+            counts (np.ndarray, optional): Class counts of each node with the shape (n_nodes, n_classes).
+                Defaults to None for trees without class counts.
+            missing_code (int, optional): The code of missing values in integer columns that are already encoded,
+                see utils.encoder.missing_mask. Defaults to None.
+        """
+        self.feature_names = feature_names
+        self.vocabularies = vocabularies
+        self.feature = feature
+        self.child_offset = child_offset
+        self.child_table = child_table
+        self.label = label
+        self.classes = classes
+        self.numeric = np.zeros(len(feature_names), dtype=bool) if numeric is None else numeric
+        self.default = np.full(len(feature), -1, dtype=np.int32) if default is None else default
+        self.counts = counts
+        self.missing_code = missing_code
+        self.proba_table = None
+
+    @staticmethod
+    def breadth_first(starter_node: Node) -> List:
+        """
+        Args:
+            starter_node (Node): The root node of the tree
+
+        Returns:
+            list: The nodes of the tree in breadth first order, which is the order of the compiled nodes
+        """
+        nodes = [starter_node]
+        for node in nodes:
+            nodes.extend(node.child_nodes)
+
+        return nodes
+
+    @classmethod
+    def compile(cls, starter_node: Node, feature_names: List = None, vocabularies: List = None,
+                numeric: List = None, classes: np.ndarray = None, missing_code: int = None) -> "FlatTree":
+        """Flattens the graph of trained nodes into parallel arrays.
+
+        By default the features, vocabularies and classes are collected from the nodes. Trees that are
+        compiled with the same given features, vocabularies and classes share their encoding and can be stacked.
+
+        Args:
+            starter_node (Node): The root node of the tree
+            feature_names (list, optional): The names of the features. Defaults to None.
+            vocabularies (list, optional): The categories or thresholds of each feature. Defaults to None.
+            numeric (list, optional): Whether each feature is numeric. Defaults to None.
+            classes (np.ndarray, optional): The sorted labels. Defaults to None.
+            missing_code (int, optional): The code of missing values in encoded integer columns. Defaults to None.
+
+        Returns:
+            FlatTree: The compiled tree
+        """
+        nodes = cls.breadth_first(starter_node)
+        node_ids = {id(node): i for i, node in enumerate(nodes)}
+
+        # vocabularies of the split features
+        if feature_names is None:
+            feature_names = []
+            feature_values = {}
+            numeric = []
+            for node in nodes:
+                if node.main_feature is not None:
+                    if node.main_feature not in feature_values:
+                        feature_names.append(node.main_feature)
+                        feature_values[node.main_feature] = set()
+                        numeric.append(node.threshold is not None)
+                    if node.threshold is not None:
+                        feature_values[node.main_feature].add(node.threshold)
+                    else:
+                        feature_values[node.main_feature].update(node.child_values)
+            vocabularies = [np.array(sorted(feature_values[name])) for name in feature_names]
+        feature_ids = {name: i for i, name in enumerate(feature_names)}
+
+        # nodes without a label or class counts fall back to the ones of their parent
+        fallback_labels = {id(starter_node): starter_node.label}
+        fallback_counts = {id(starter_node): starter_node.class_counts}
+        for node in nodes:
+            for child in node.child_nodes:
+                fallback_labels[id(child)] = child.label if child.label is not None else fallback_labels[id(node)]
+                fallback_counts[id(child)] = (child.class_counts if child.class_counts is not None
+                                              else fallback_counts[id(node)])
+        if classes is None:
+            classes = np.array(sorted({label for label in fallback_labels.values() if label is not None}))
+        else:
+            # the labels of object columns get a single NumPy type
+            classes = np.array(list(classes))
+
+        # the class counts are aligned with the classes of the trainer
+        counts = [fallback_counts[id(node)] for node in nodes]
+        if all(node_counts is not None and len(node_counts) == len(classes) for node_counts in counts):
+            counts = np.array(counts, dtype=np.int64)
+        else:
+            counts = None
+
+        feature = np.full(len(nodes), -1, dtype=np.int32)
+        child_offset = np.zeros(len(nodes), dtype=np.int64)
+        label = np.full(len(nodes), -1, dtype=np.int32)
+        default = np.full(len(nodes), -1, dtype=np.int32)
+        child_table = []
+        n_children = 0
+
+        for i, node in enumerate(nodes):
+            if fallback_labels[id(node)] is not None:
+                label[i] = np.searchsorted(classes, fallback_labels[id(node)])
+            if node.main_feature is None or not node.child_nodes:
+                continue
+
+            feature[i] = feature_ids[node.main_feature]
+            if node.default_child is not None:
+                default[i] = node_ids[id(node.child_nodes[node.default_child])]
+            vocabulary = pd.Index(vocabularies[feature[i]])
+            if node.threshold is not None:
+                # codes up to the position of the threshold go to the left child
+                children = np.full(len(vocabulary) + 1, node_ids[id(node.child_nodes[1])], dtype=np.int32)
+                children[:vocabulary.get_loc(node.threshold) + 1] = node_ids[id(node.child_nodes[0])]
+            else:
+                children = np.full(len(vocabulary), -1, dtype=np.int32)
+                children[vocabulary.get_indexer(node.child_values)] = [node_ids[id(c)] for c in node.child_nodes]
+
+            child_offset[i] = n_children
+            child_table.append(children)
+            n_children += len(children)
+
+        child_table = np.concatenate(child_table) if child_table else np.zeros(0, dtype=np.int32)
+
+        return cls(feature_names, vocabularies, feature, child_offset, child_table, label, classes, np.array(numeric),
+                   default, counts, missing_code)
+
+    @classmethod
+    def stack(cls, flat_trees: List) -> Tuple:
+        """Stacks trees compiled with the same features, vocabularies and classes into one set of arrays,
+        so the samples can be routed through all the trees at once.
+
+        Args:
+            flat_trees (list): The compiled trees
+
+        Returns:
+            Tuple: The stacked tree and the root node index of each tree
+        """
+        n_nodes = np.cumsum([0] + [len(flat_tree.feature) for flat_tree in flat_trees])
+        n_children = np.cumsum([0] + [len(flat_tree.child_table) for flat_tree in flat_trees])
+
+        child_table = np.concatenate([np.where(flat_tree.child_table >= 0, flat_tree.child_table + offset, -1)
+                                      for flat_tree, offset in zip(flat_trees, n_nodes)]).astype(np.int32)
+        child_offset = np.concatenate([flat_tree.child_offset + offset
+                                       for flat_tree, offset in zip(flat_trees, n_children)])
+
+        default = np.concatenate([np.where(flat_tree.default >= 0, flat_tree.default + offset, -1)
+                                  for flat_tree, offset in zip(flat_trees, n_nodes)]).astype(np.int32)
+
+        counts = None
+        if all(flat_tree.counts is not None for flat_tree in flat_trees):
+            counts = np.concatenate([flat_tree.counts for flat_tree in flat_trees])
+
+        first = flat_trees[0]
+        stacked = cls(first.feature_names, first.vocabularies,
+                      np.concatenate([flat_tree.feature for flat_tree in flat_trees]), child_offset, child_table,
+                      np.concatenate([flat_tree.label for flat_tree in flat_trees]), first.classes, first.numeric,
+                      default, counts, first.missing_code)
+
+        return stacked, n_nodes[:-1]
+
+    def encode(self, samples: pd.DataFrame) -> np.ndarray:
+        """Encodes the features used by the tree, missing values are encoded as MISSING, unseen categories
+        as UNSEEN and numeric values by the number of thresholds smaller than them.
+
+        Args:
+            samples (pd.DataFrame): Data samples
+
+        Returns:
+            np.ndarray: Feature codes with the shape (n_features, n_samples)
+        """
+        codes = np.empty((len(self.feature_names), len(samples)), dtype=np.int32)
+
+        for i, name in enumerate(self.feature_names):
+            if self.numeric[i]:
+                values = samples[name].to_numpy(dtype=np.float64)
+                codes[i] = np.searchsorted(self.vocabularies[i], values, side='left')
+                codes[i][np.isnan(values)] = MISSING
+            else:
+                values = samples[name].to_numpy()
+                codes[i] = pd.Index(self.vocabularies[i]).get_indexer(values)
+                codes[i][codes[i] < 0] = UNSEEN
+                codes[i][missing_mask(values, self.missing_code)] = MISSING
+
+        return codes
+
+    def apply(self, codes: np.ndarray, roots: np.ndarray = None) -> np.ndarray:
+        """Routes all the samples through the tree one level at a time.
+
+        Samples with a category that the node hasn't seen in training stop at that node, samples with
+        a missing value go to the default child of the node or stop if the node doesn't have one.
+
+        Args:
+            codes (np.ndarray): Feature codes with the shape (n_features, n_samples)
+            roots (np.ndarray, optional): The roots of stacked trees. Defaults to None.
+
+        Returns:
+            np.ndarray: The index of the final node of each sample, with the shape (n_trees, n_samples)
+                for stacked trees
+        """
+        n_samples = codes.shape[1]
+        if roots is None:
+            samples = np.arange(n_samples)
+            nodes = np.zeros(n_samples, dtype=np.int32)
+        else:
+            samples = np.tile(np.arange(n_samples), len(roots))
+            nodes = np.repeat(np.asarray(roots, dtype=np.int32), n_samples)
+        active = np.arange(len(nodes))
+
+        while active.size > 0:
+            features = self.feature[nodes[active]]
+            active = active[features >= 0]
+            features = features[features >= 0]
+
+            sample_codes = codes[features, samples[active]]
+            known = sample_codes >= 0
+            children = np.full(len(active), -1, dtype=np.int32)
+            children[known] = self.child_table[self.child_offset[nodes[active[known]]] + sample_codes[known]]
+            missing = sample_codes == MISSING
+            children[missing] = self.default[nodes[active[missing]]]
+
+            active = active[children >= 0]
+            nodes[active] = children[children >= 0]
+
+        if roots is not None:
+            return nodes.reshape(len(roots), n_samples)
+
+        return nodes
+
+    def decode(self, label_codes: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            label_codes (np.ndarray): Label codes
+
+        Returns:
+            np.ndarray: The labels, codes of unlabeled nodes are decoded as None
+        """
+        if (label_codes < 0).any():
+            return np.append(self.classes.astype(object), None)[label_codes]
+
+        return self.classes[label_codes]
+
+    def predict(self, samples: pd.DataFrame) -> np.ndarray:
+        """Predicts the labels of the samples in their original order.
+
+        Args:
+            samples (pd.DataFrame): Data samples
+
+        Returns:
+            np.ndarray: The predicted labels
+        """
+        return self.decode(self.label[self.apply(self.encode(samples))])
+
+    def probabilities(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The class probabilities of each node with the shape (n_nodes, n_classes)
+        """
+        if self.counts is None:
+            raise(TypeError("The tree doesn't have the class counts of its nodes"))
+
+        if self.proba_table is None:
+            totals = self.counts.sum(axis=1, keepdims=True)
+            self.proba_table = np.divide(self.counts, totals, out=np.zeros(self.counts.shape), where=totals > 0)
+
+        return self.proba_table
+
+    def predict_proba(self, samples: pd.DataFrame) -> np.ndarray:
+        """Predicts the class probabilities of the samples in their original order, the probabilities
+        of a sample are the class frequencies of the training samples of its final node.
+
+        Args:
+            samples (pd.DataFrame): Data samples
+
+        Returns:
+            np.ndarray: The probabilities with the shape (n_samples, n_classes), the columns are the classes
+        """
+        return self.probabilities()[self.apply(self.encode(samples))]
+
+    def to_node(self, target_label: str = 'label') -> Node:
+        """Rebuilds the graph of nodes from the compiled arrays.
+
+        Args:
+            target_label (str, optional): The label of the target data column. Defaults to 'label'.
+
+        Returns:
+            Node: The root node of the tree
+        """
+        nodes = [Node(1, target_label)]
+
+        for i in range(len(self.feature)):
+            node = nodes[i]
+            if self.label[i] >= 0:
+                node.label = self.classes[self.label[i]]
+            if self.counts is not None:
+                node.class_counts = np.array(self.counts[i])
+            if self.feature[i] < 0:
+                continue
+
+            feature = self.feature[i]
+            vocabulary = self.vocabularies[feature]
+            children = self.child_table[self.child_offset[i]:self.child_offset[i] + len(vocabulary) + self.numeric[feature]]
+            node.main_feature = self.feature_names[feature]
+            if self.default[i] >= 0:
+                # the children of the node are the next nodes
+                node.default_child = int(self.default[i]) - len(nodes)
+
+            if self.numeric[feature]:
+                n_left = int(np.count_nonzero(children == children[0]))
+                node.threshold = vocabulary[n_left - 1]
+                child_ids = [children[0], children[-1]]
+            else:
+                codes = np.flatnonzero(children >= 0)
+                node.child_values = list(vocabulary[codes])
+                child_ids = list(children[codes])
+
+            for child_id in child_ids:
+                # children are always stored after their parent in breadth first order
+                assert child_id == len(nodes)
+                child = Node(node.n_stage + 1, target_label, node.ig)
+                node.child_nodes.append(child)
+                nodes.append(child)
+
+        return nodes[0]
+
+    def arrays(self) -> Dict:
+        """
+        Returns:
+            dict: All the arrays of the compiled tree by name
+        """
+        arrays = {'feature': self.feature, 'child_offset': self.child_offset, 'child_table': self.child_table,
+                  'label': self.label, 'classes': self.classes, 'numeric': self.numeric, 'default': self.default}
+        if self.counts is not None:
+            arrays['counts'] = self.counts
+        for i, vocabulary in enumerate(self.vocabularies):
+            arrays[f'vocabulary_{i}'] = vocabulary
+
+        return arrays
+
+    def save(self, path: str, meta: Dict = None) -> None:
+        """Saves the compiled tree in a versioned binary format. The file starts with a signature,
+        the format version and a JSON header describing the arrays, followed by the raw arrays aligned
+        to 64 bytes, so the model can be memory-mapped on load.
+
+        Args:
+            path (str): The path to the model file
+            meta (dict, optional): Extra JSON serializable information stored in the header. Defaults to None.
+        """
+        arrays = {}
+        for name, array in self.arrays().items():
+            array = np.ascontiguousarray(array)
+            if array.dtype.hasobject:
+                raise(TypeError(f"The values of {name} can't be saved, they should have a single NumPy type"))
+            arrays[name] = array
+
+        header = {'feature_names': list(self.feature_names), 'n_vocabularies': len(self.vocabularies),
+                  'missing_code': self.missing_code, 'meta': meta or {}, 'arrays': {}}
+        offset = 0
+        for name, array in arrays.items():
+            header['arrays'][name] = {'dtype': array.dtype.str, 'shape': array.shape, 'offset': offset}
+            offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+        header_bytes = json.dumps(header).encode()
+        prefix_size = len(MAGIC) + 12 + len(header_bytes)
+        data_start = -(-prefix_size // ALIGNMENT) * ALIGNMENT
+
+        with open(path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<IQ', FORMAT_VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            f.write(bytes(data_start - prefix_size))
+            for name, array in arrays.items():
+                f.seek(data_start + header['arrays'][name]['offset'])
+                f.write(array.tobytes())
+            # padding of the last array
+            f.truncate(data_start + offset)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> Tuple:
+        """Loads a compiled tree saved by FlatTree.save.
+
+        Args:
+            path (str): The path to the model file
+            mmap (bool, optional): Memory-map the arrays read-only instead of reading them into memory,
+                so the processes loading the same model share one copy. Defaults to True.
+
+        Returns:
+            Tuple: The compiled tree and the extra information of the header
+        """
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise(ValueError(f"{path} isn't a saved decision tree"))
+            version, header_size = struct.unpack('<IQ', f.read(12))
+            if version != FORMAT_VERSION:
+                raise(ValueError(f"Unsupported model format version {version}"))
+            header = json.loads(f.read(header_size))
+
+        data_start = -(-(len(MAGIC) + 12 + header_size) // ALIGNMENT) * ALIGNMENT
+        if mmap:
+            buffer = np.memmap(path, dtype=np.uint8, mode='r')
+        else:
+            buffer = np.fromfile(path, dtype=np.uint8)
+
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            start = data_start + spec['offset']
+            n_bytes = dtype.itemsize * int(np.prod(spec['shape']))
+            arrays[name] = buffer[start:start + n_bytes].view(dtype).reshape(spec['shape'])
+
+        vocabularies = [arrays[f'vocabulary_{i}'] for i in range(header['n_vocabularies'])]
+        flat_tree = cls(header['feature_names'], vocabularies, arrays['feature'], arrays['child_offset'],
+                        arrays['child_table'], arrays['label'], arrays['classes'], arrays['numeric'],
+                        arrays.get('default'), arrays.get('counts'), header.get('missing_code'))
+
+        return flat_tree, header['meta']
@@ -0,0 +1,244 @@
+from typing import Dict, List, Tuple
+from models.tree_builder import TreeBuilder
+from utils.encoder import MISSING
+from utils.node import Node, shared_counts
+from utils.stack import Stack
+import numpy as np
+
+
+class FoldTreeBuilder(TreeBuilder):
+    """FoldTreeBuilder trains the trees of all the folds of a K-fold cross validation together.
+
+    The histograms of a node are counted once per fold in a single pass, and the training histogram of fold k
+    is the total histogram minus the histogram of fold k. As long as the trees of several folds choose the same
+    split, they share the partition of the permutation and the per-fold histograms of their children. As soon as
+    the folds disagree, or only one fold is left, each fold is trained separately by its own TreeBuilder on its
+    training samples of the node, starting from the split and the training histogram already found for it.
+
+    The trees are the same as training each fold on its own training samples with the same encoding.
+    """
+
+    def build_folds(self, codes: np.ndarray, labels: np.ndarray, fold_ids: np.ndarray, n_folds: int,
+                    feature_names: List, vocabularies: List, classes: np.ndarray, numeric: List = None) -> List:
+        """Trains the tree of each fold, fold k is trained on the samples that aren't in fold k.
+
+        Args:
+            codes (np.ndarray): Feature codes with the shape (n_features, n_samples)
+            labels (np.ndarray): Class codes of the samples
+            fold_ids (np.ndarray): The fold of each sample
+            n_folds (int): The number of folds
+            feature_names (list): The names of the features
+            vocabularies (list): The categories or bin edges of each feature
+            classes (np.ndarray): The sorted target classes
+            numeric (list, optional): Whether each feature is a binned numeric feature. Defaults to None.
+
+        Returns:
+            list: The root node of the tree of each fold
+        """
+        if self.max_leaf_nodes is not None:
+            raise(ValueError("max_leaf_nodes isn't supported by the shared training of the folds"))
+
+        self.attach(np.ascontiguousarray(codes), labels.astype(np.intp, copy=False), np.arange(len(labels)),
+                    feature_names, vocabularies, classes, numeric)
+        self.fold_ids = fold_ids.astype(np.intp, copy=False)
+        self.n_folds = n_folds
+
+        # the builder of each fold trains the subtrees of the fold once the folds disagree,
+        # on its own permutation of the training samples of the subtree
+        self.fold_builders = []
+        for _ in range(n_folds):
+            builder = TreeBuilder(**self.settings(), profiler=self.profiler)
+            builder.ig = self.ig
+            builder.rng = self.rng
+            builder.attach(self.codes, self.labels, np.empty_like(self.index), self.feature_names,
+                           self.vocabularies, self.classes, self.numeric, self.missing)
+            self.fold_builders.append(builder)
+
+        roots = {k: Node(1, self.target_label, self.ig) for k in range(n_folds)}
+
+        train_stack = Stack()
+        train_stack.push((roots, 0, len(self.index), None))
+
+        while(train_stack.size() > 0):
+            for node_range in self.expand_folds(*train_stack.pop()):
+                train_stack.push(node_range)
+
+        return [roots[k] for k in range(n_folds)]
+
+    def fold_histogram(self, start: int, end: int) -> np.ndarray:
+        """Counts the histogram of each fold for the samples of the range with one bincount over all the features.
+
+        Args:
+            start (int): Start of the node samples in the permutation
+            end (int): End of the node samples in the permutation
+
+        Returns:
+            np.ndarray: Histograms with the shape (n_folds, n_features, n_values, n_classes)
+        """
+        rows = self.index[start:end]
+        n_features = len(self.feature_names)
+        n_values = self.n_slots
+        n_classes = len(self.classes)
+        self.profiler.count('histograms')
+        self.profiler.count('histogram_rows', end - start)
+
+        with self.profiler.phase('histogram'):
+            codes = self.codes[:, rows]
+            if self.missing:
+                codes = np.where(codes == MISSING, n_values - 1, codes)
+            # the flat position of (fold, feature, value, class) in the histograms
+            cells = np.multiply(codes, n_classes, dtype=np.intp)
+            cells += (np.arange(n_features) * n_values * n_classes)[:, np.newaxis]
+            cells += self.fold_ids[rows] * n_features * n_values * n_classes + self.labels[rows]
+
+            return np.bincount(cells.ravel(), minlength=self.n_folds * n_features * n_values * n_classes
+                               ).reshape(self.n_folds, n_features, n_values, n_classes)
+
+    def grow_fold(self, fold: int, node: Node, start: int, end: int, histogram: np.ndarray = None,
+                  split: Tuple = None) -> None:
+        """Trains the subtree of one fold separately on its training samples of the range.
+
+        Args:
+            fold (int): The fold
+            node (Node): The node of the fold tree
+            start (int): Start of the node samples in the permutation
+            end (int): End of the node samples in the permutation
+            histogram (np.ndarray, optional): The training histogram of the fold if already known. Defaults to None.
+            split (Tuple, optional): The feature, threshold bin, gain and default child of the split of the node
+                if already found. Defaults to None.
+        """
+        rows = self.index[start:end]
+        train_rows = rows[self.fold_ids[rows] != fold]
+        train_end = start + len(train_rows)
+
+        # the range of the node is free in the permutation of the fold since the ranges of the nodes are disjoint
+        builder = self.fold_builders[fold]
+        builder.index[start:train_end] = train_rows
+        if split is None:
+            builder.grow(node, start, train_end, histogram)
+            return
+
+        feature, threshold, gain, default = split
+        feature_codes = self.codes[feature][train_rows]
+        child_codes = (feature_codes > threshold).astype(np.intp) if self.numeric[feature] else feature_codes
+        if default is not None:
+            child_codes = np.where(feature_codes == MISSING, default, child_codes)
+        for child_range in builder.split_node(node, start, train_end, feature, threshold, gain, child_codes,
+                                              histogram, default):
+            builder.grow(*child_range)
+
+    def expand_folds(self, nodes: Dict, start: int, end: int, histogram: np.ndarray = None) -> List:
+        """Decides the split of the node of each fold and splits the folds together while they all agree.
+        As soon as the folds choose different splits, each fold trains its subtree on its own, starting
+        from the split and the histogram that were already found.
+
+        Args:
+            nodes (dict): The node of each fold sharing this range
+            start (int): Start of the node samples in the permutation
+            end (int): End of the node samples in the permutation
+            histogram (np.ndarray, optional): The per-fold histograms of the range if already known. Defaults to None.
+
+        Returns:
+            list: Tuples of the child node of each fold, their sample ranges and per-fold histograms
+        """
+        total = None if histogram is None else histogram.sum(axis=0)
+        if len(nodes) == 1:
+            for fold, node in nodes.items():
+                self.grow_fold(fold, node, start, end, None if total is None else total - histogram[fold])
+            return []
+
+        rows = self.index[start:end]
+        n_classes = len(self.classes)
+        class_counts = np.bincount(self.fold_ids[rows] * n_classes + self.labels[rows],
+                                   minlength=self.n_folds * n_classes).reshape(self.n_folds, n_classes)
+        train_class_counts = class_counts.sum(axis=0) - class_counts
+
+        # the stopping rules of all the folds at once
+        n_stage = next(iter(nodes.values())).n_stage
+        with self.profiler.phase('entropy'):
+            splittable = ((train_class_counts.sum(axis=1) >= max(self.min_samples_split, 2 * self.min_samples_leaf)) &
+                          (self.ig.entropy_from_counts(train_class_counts) >= self.epsilon))
+        if self.max_length is not None and n_stage >= self.max_length:
+            splittable[:] = False
+
+        decisions = {}
+        splits = {}
+        fold_histograms = {}
+        for fold, node in nodes.items():
+            node.class_counts = shared_counts(train_class_counts[fold], self.class_counts)
+            node.label = self.classes[np.argmax(train_class_counts[fold])]
+            if not splittable[fold]:
+                continue
+
+            if histogram is None:
+                histogram = self.fold_histogram(start, end)
+                total = histogram.sum(axis=0)
+
+            fold_histogram = total - histogram[fold]
+            with self.profiler.phase('scoring'):
+                feature, threshold, gain = self.best_split(fold_histogram)
+            if feature is None:
+                continue
+            if not self.numeric[feature] and \
+                    np.count_nonzero(fold_histogram[feature, :self.n_values[feature]].sum(axis=1)) < 2:
+                continue
+            default = self.default_child(fold_histogram, feature, threshold) if self.missing else None
+            decisions.setdefault((feature, threshold, default), []).append(fold)
+            splits[fold] = (feature, threshold, gain, default)
+            fold_histograms[fold] = fold_histogram
+
+        if not decisions:
+            return []
+
+        # folds that disagree, or a fold left alone, continue on their own
+        if len(decisions) > 1 or len(splits) == 1:
+            for fold, split in splits.items():
+                self.grow_fold(fold, nodes[fold], start, end, fold_histograms[fold], split)
+            return []
+
+        (feature, threshold, default), folds = next(iter(decisions.items()))
+
+        feature_codes = self.codes[feature][rows]
+        child_codes = (feature_codes > threshold).astype(np.intp) if self.numeric[feature] else feature_codes
+        if default is not None:
+            child_codes = np.where(feature_codes == MISSING, default, child_codes)
+
+        self.index[start:end] = rows[np.argsort(child_codes, kind='stable')]
+        child_counts = np.bincount(child_codes)
+        values = np.flatnonzero(child_counts)
+        bounds = start + np.concatenate(([0], np.cumsum(child_counts[values])))
+
+        for fold in folds:
+            nodes[fold].main_feature = self.feature_names[feature]
+            if self.numeric[feature]:
+                nodes[fold].threshold = self.vocabularies[feature][threshold]
+
+        child_ranges = []
+        for i, value in enumerate(values):
+            child_nodes = {}
+            for fold in folds:
+                # categories that only occur in the held-out fold aren't children of its tree
+                if self.numeric[feature] or (total[feature, value] - histogram[fold, feature, value]).sum() > 0:
+                    child = Node(nodes[fold].n_stage + 1, self.target_label, self.ig)
+                    nodes[fold].child_nodes.append(child)
+                    if value == default:
+                        nodes[fold].default_child = len(nodes[fold].child_nodes) - 1
+                    if not self.numeric[feature]:
+                        nodes[fold].child_values.append(self.vocabularies[feature][value])
+                    child_nodes[fold] = child
+            child_ranges.append((child_nodes, bounds[i], bounds[i + 1]))
+
+        # per-fold histograms of the children, the largest child by subtraction,
+        # children at the maximum length are leaves and don't need them
+        child_histograms = len(child_ranges) * [None]
+        if self.max_length is None or n_stage + 1 < self.max_length:
+            largest = int(np.argmax(np.diff(bounds)))
+            siblings = histogram.copy()
+            for i, (_, child_start, child_end) in enumerate(child_ranges):
+                if i != largest:
+                    child_histograms[i] = self.fold_histogram(child_start, child_end)
+                    siblings -= child_histograms[i]
+            child_histograms[largest] = siblings
+
+        return [(child_nodes, child_start, child_end, child_histogram) for (child_nodes, child_start, child_end),
+                child_histogram in zip(child_ranges, child_histograms) if child_nodes]
@@ -0,0 +1,301 @@
+from typing import List
+from models.flat_tree import FlatTree
+from models.tree_builder import TreeBuilder
+from utils.encoder import MISSING, Encoder
+from utils.node import Node
+import pandas as pd
+import numpy as np
+
+# the initial number of samples the code matrix has room for
+INITIAL_CAPACITY = 1024
+
+
+class IncrementalTreeBuilder(TreeBuilder):
+    """IncrementalTreeBuilder trains a tree that can be refreshed with new samples without training it again.
+
+    The builder keeps the encoded samples, the histogram of every internal node and the samples of every leaf.
+    An update routes only the new samples down the tree and adds them to the class counts of the nodes on their
+    path, so the statistics of the tree always describe all the samples. With the updated statistics:
+
+    - a leaf that can now be split is grown from its samples,
+    - an internal node whose best split changed is grown again from the samples of its subtree, in the style
+      of a Hoeffding tree only when the new split beats the current one by more than the Hoeffding bound,
+      so small changes in the data don't rebuild the tree.
+
+    As in a Hoeffding tree, the splits of an internal node are only scored again after grace_period new samples
+    reached it, and its histogram is only updated then. Small leaves are scored again when their samples doubled.
+
+    An update costs in proportion to the new samples and the regrown subtrees. The encoding is fixed by the
+    first training: categories that weren't seen are treated as missing values and new classes aren't allowed.
+    The histograms always have the missing slot and the subtrees are grown in one process.
+    """
+
+    def __init__(self, *args, delta: float = 1e-7, grace_period: int = 200, missing_code: int = None,
+                 **kwargs) -> None:
+        """
+        Args:
+            args: The arguments of TreeBuilder
+            delta (float, optional): The probability that the Hoeffding bound doesn't hold, smaller values
+                need more evidence before a subtree is regrown. Defaults to 1e-7.
+            grace_period (int, optional): The number of new samples of a node between two scorings of its splits.
+                Defaults to 200.
+            missing_code (int, optional): The code of missing values in encoded integer columns. Defaults to None.
+            kwargs: The arguments of TreeBuilder
+        """
+        super().__init__(*args, **kwargs)
+        self.delta = delta
+        self.grace_period = grace_period
+        self.missing_code = missing_code
+        self.n_samples = 0
+        self.root = None
+        # the statistics of the nodes by node id
+        self.histograms = {}
+        self.leaf_rows = {}
+        # the new samples of the nodes since their splits were last scored
+        self.unscored = {}
+        self.pending = {}
+
+    def build(self, codes: np.ndarray, labels: np.ndarray, feature_names: List, vocabularies: List,
+              classes: np.ndarray, numeric: List = None) -> Node:
+        """Trains a tree on the encoded data and keeps the statistics of its nodes.
+
+        Args:
+            codes (np.ndarray): Feature codes with the shape (n_features, n_samples)
+            labels (np.ndarray): Class codes of the samples
+            feature_names (list): The names of the features
+            vocabularies (list): The sorted categories of each categorical feature and
+                the bin edges of each numeric feature
+            classes (np.ndarray): The sorted target classes
+            numeric (list, optional): Whether each feature is a binned numeric feature. Defaults to None.
+
+        Returns:
+            Node: The root node of the trained tree
+        """
+        if self.max_leaf_nodes is not None:
+            raise(ValueError("max_leaf_nodes isn't supported by incremental training"))
+
+        capacity = max(INITIAL_CAPACITY, len(labels))
+        self.attach(np.zeros((len(feature_names), capacity), dtype=np.int32), np.zeros(capacity, dtype=np.intp),
+                    None, feature_names, vocabularies, classes, numeric, missing=True)
+        self.feature_ids = {name: i for i, name in enumerate(self.feature_names)}
+        self.encoder = Encoder({name: vocabulary for name, vocabulary, is_numeric
+                                in zip(self.feature_names, vocabularies, self.numeric) if not is_numeric},
+                               self.missing_code)
+
+        self.root = Node(1, self.target_label, self.ig)
+        self.regrow(self.root, self.append(codes, labels))
+
+        return self.root
+
+    def append(self, codes: np.ndarray, labels: np.ndarray) -> np.ndarray:
+        """Adds encoded samples to the code matrix, which doubles its capacity when it is full.
+
+        Args:
+            codes (np.ndarray): Feature codes with the shape (n_features, n_samples)
+            labels (np.ndarray): Class codes of the samples
+
+        Returns:
+            np.ndarray: The indices of the added samples
+        """
+        n_samples = self.n_samples + len(labels)
+        if n_samples > len(self.labels):
+            capacity = max(n_samples, 2 * len(self.labels))
+            grown_codes = np.zeros((len(self.feature_names), capacity), dtype=np.int32)
+            grown_codes[:, :self.n_samples] = self.codes[:, :self.n_samples]
+            grown_labels = np.zeros(capacity, dtype=np.intp)
+            grown_labels[:self.n_samples] = self.labels[:self.n_samples]
+            self.codes, self.labels = grown_codes, grown_labels
+
+        self.codes[:, self.n_samples:n_samples] = codes
+        self.labels[self.n_samples:n_samples] = labels
+        rows = np.arange(self.n_samples, n_samples)
+        self.n_samples = n_samples
+
+        return rows
+
+    def encode(self, samples: pd.DataFrame) -> tuple:
+        """Encodes new samples with the encoding of the first training.
+
+        Args:
+            samples (pd.DataFrame): Data samples
+
+        Returns:
+            Tuple: The feature codes with the shape (n_features, n_samples) and the class codes
+        """
+        codes = np.empty((len(self.feature_names), len(samples)), dtype=np.int32)
+        for i, name in enumerate(self.feature_names):
+            if self.numeric[i]:
+                values = samples[name].to_numpy(dtype=np.float64)
+                codes[i] = np.searchsorted(self.vocabularies[i], values, side='left')
+                codes[i][np.isnan(values)] = MISSING
+            else:
+                codes[i] = self.encoder.encode_column(name, samples[name].to_numpy())
+        # categories that weren't seen in the first training can't be split on
+        codes[codes < 0] = MISSING
+
+        labels = pd.Index(self.classes).get_indexer(samples[self.target_label].to_numpy())
+        if (labels < 0).any():
+            raise(ValueError("The new samples have classes that the tree wasn't trained on, the tree should be "
+                             "trained again"))
+
+        return codes, labels
+
+    def find_split(self, node: Node, start: int, end: int, histogram: np.ndarray = None) -> tuple:
+        """Finds the split of the node like TreeBuilder.find_split and keeps the histogram of the node
+        if it is split, or the samples of the node if it is a leaf."""
+        split = super().find_split(node, start, end, histogram)
+        if split is None:
+            self.leaf_rows[id(node)] = self.index[start:end].copy()
+        else:
+            self.histograms[id(node)] = split[4]
+
+        return split
+
+    def regrow(self, node: Node, new_rows: np.ndarray) -> None:
+        """Trains the subtree of the node again from the samples of its leaves and the new samples.
+
+        Args:
+            node (Node): The root of the subtree
+            new_rows (np.ndarray): The new samples that reached the node
+        """
+        rows = [new_rows]
+        for subtree_node in FlatTree.breadth_first(node):
+            self.histograms.pop(id(subtree_node), None)
+            self.unscored.pop(id(subtree_node), None)
+            self.pending.pop(id(subtree_node), None)
+            if id(subtree_node) in self.leaf_rows:
+                rows.append(self.leaf_rows.pop(id(subtree_node)))
+
+        node.main_feature = None
+        node.threshold = None
+        node.child_nodes = []
+        node.child_values = []
+        node.child_map = None
+        node.default_child = None
+
+        self.index = np.concatenate(rows)
+        self.grow(node, 0, len(self.index))
+
+    def split_gain(self, histogram: np.ndarray, feature: int, threshold: int) -> float:
+        """
+        Args:
+            histogram (np.ndarray): The histogram of the node with the missing slot
+            feature (int): Index of the split feature
+            threshold (int): The threshold bin of numeric features
+
+        Returns:
+            float: The gain of the split on the feature, scaled like TreeBuilder.best_split
+        """
+        table = histogram[feature, :-1]
+        if self.numeric[feature]:
+            table = np.stack((table[:threshold + 1].sum(axis=0), table[threshold + 1:].sum(axis=0)))
+
+        n_known = table.sum()
+        n_samples = n_known + histogram[feature, -1].sum()
+
+        return float(self.ig.information_gains_from_counts(table[np.newaxis])[0]) * n_known / max(n_samples, 1)
+
+    def hoeffding_bound(self, n_samples: int) -> float:
+        """
+        Args:
+            n_samples (int): The number of samples of the node
+
+        Returns:
+            float: The difference of gains that is significant with probability 1 - delta
+        """
+        gain_range = np.log2(max(len(self.classes), 2))
+
+        return float(np.sqrt(gain_range ** 2 * np.log(1 / self.delta) / (2 * max(n_samples, 1))))
+
+    def current_split(self, node: Node) -> tuple:
+        """
+        Args:
+            node (Node): An internal node
+
+        Returns:
+            Tuple: The index of the split feature of the node and its threshold bin
+        """
+        feature = self.feature_ids[node.main_feature]
+        if node.threshold is None:
+            return feature, 0
+
+        return feature, int(np.searchsorted(self.vocabularies[feature], node.threshold))
+
+    def route(self, node: Node, rows: np.ndarray) -> List:
+        """Sends the new samples of an internal node to its children. Samples that the node can't route,
+        missing values without a default child or categories without a child, go to the largest child.
+
+        Args:
+            node (Node): An internal node
+            rows (np.ndarray): The new samples of the node
+
+        Returns:
+            list: The child nodes and their new samples
+        """
+        feature, threshold = self.current_split(node)
+        codes = self.codes[feature][rows]
+
+        if self.numeric[feature]:
+            positions = (codes > threshold).astype(np.intp)
+        else:
+            child_positions = np.full(self.n_values[feature], -1, dtype=np.intp)
+            child_positions[pd.Index(self.vocabularies[feature]).get_indexer(node.child_values)] = \
+                np.arange(len(node.child_nodes))
+            positions = np.where(codes >= 0, child_positions[np.maximum(codes, 0)], -1)
+
+        if node.default_child is None:
+            fallback = int(np.argmax([child.class_counts.sum() for child in node.child_nodes]))
+        else:
+            fallback = node.default_child
+        positions[(codes == MISSING) | (positions < 0)] = fallback
+
+        order = np.argsort(positions, kind='stable')
+        bounds = np.searchsorted(positions[order], np.arange(len(node.child_nodes) + 1))
+
+        return [(child, rows[order[bounds[i]:bounds[i + 1]]]) for i, child in enumerate(node.child_nodes)
+                if bounds[i + 1] > bounds[i]]
+
+    def update(self, samples: pd.DataFrame) -> None:
+        """Adds new samples to the statistics of the tree and regrows the subtrees that should change.
+
+        Args:
+            samples (pd.DataFrame): The new data samples
+        """
+        codes, labels = self.encode(samples)
+        frontier = [(self.root, self.append(codes, labels))]
+        features = np.arange(len(self.feature_names))
+
+        while frontier:
+            node, rows = frontier.pop()
+            node.class_counts = node.class_counts + np.bincount(self.labels[rows], minlength=len(self.classes))
+            node.label = self.classes[np.argmax(node.class_counts)]
+            unscored = self.unscored.get(id(node), 0) + len(rows)
+            self.unscored[id(node)] = unscored
+
+            if not node.child_nodes:
+                leaf_rows = np.concatenate((self.leaf_rows[id(node)], rows))
+                self.leaf_rows[id(node)] = leaf_rows
+                if (unscored >= min(self.grace_period, len(leaf_rows) - unscored) and
+                        self.splittable(node.n_stage, node.class_counts)):
+                    self.unscored[id(node)] = 0
+                    if self.best_split(self.rows_histogram(leaf_rows, features))[0] is not None:
+                        self.profiler.count('regrown_nodes')
+                        self.regrow(node, np.zeros(0, dtype=np.intp))
+                continue
+
+            self.pending.setdefault(id(node), []).append(rows)
+            if unscored >= self.grace_period:
+                self.unscored[id(node)] = 0
+                histogram = self.histograms[id(node)]
+                histogram += self.rows_histogram(np.concatenate(self.pending.pop(id(node))), features)
+
+                feature, threshold, gain = self.best_split(histogram)
+                split = (feature, threshold if feature is not None and self.numeric[feature] else 0)
+                if feature is not None and split != self.current_split(node):
+                    current_gain = self.split_gain(histogram, *self.current_split(node))
+                    if gain - current_gain > self.hoeffding_bound(node.class_counts.sum()):
+                        self.profiler.count('regrown_nodes')
+                        self.regrow(node, rows)
+                        continue
+
+            frontier.extend(self.route(node, rows))
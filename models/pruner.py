@@ -0,0 +1,199 @@
+from models.flat_tree import FlatTree
+from utils.node import Node
+import pandas as pd
+import numpy as np
+
+# costs closer than this are equal, so an alpha of cost_complexity_path prunes its weakest links despite rounding
+COST_TOLERANCE = 1e-12
+
+
+class Pruner:
+    """Pruner removes the subtrees of a trained tree that don't pay for their size.
+
+    The nodes are taken in breadth first order, like the compiled tree, so each level of the tree is a set of
+    node indices and the statistics of the subtrees are summed into the parents one level at a time, from the
+    deepest level up. Each pruning is a single bottom-up pass that decides for every internal node whether
+    the node as a leaf is at least as good as its best pruned subtree.
+
+    - Reduced-error pruning routes the validation samples through the compiled tree once and counts the errors
+      of every node as a leaf and of the subtree below it.
+    - Cost-complexity pruning uses the class counts the nodes recorded in training, the cost of a subtree is
+      its training error rate plus alpha for each leaf.
+    """
+
+    def __init__(self, starter_node: Node) -> None:
+        """
+        Args:
+            starter_node (Node): The root node of the tree
+        """
+        self.starter_node = starter_node
+        self.nodes = FlatTree.breadth_first(starter_node)
+
+        node_ids = {id(node): i for i, node in enumerate(self.nodes)}
+        self.parent = np.full(len(self.nodes), -1, dtype=np.intp)
+        self.depth = np.zeros(len(self.nodes), dtype=np.intp)
+        for i, node in enumerate(self.nodes):
+            for child in node.child_nodes:
+                self.parent[node_ids[id(child)]] = i
+                self.depth[node_ids[id(child)]] = self.depth[i] + 1
+        self.internal = np.array([bool(node.child_nodes) for node in self.nodes])
+
+        # the nodes of each level below the root, deepest level first
+        self.levels = [np.flatnonzero(self.depth == depth) for depth in range(int(self.depth.max()), 0, -1)]
+
+    def subtree_sums(self, values: np.ndarray, is_leaf: np.ndarray = None) -> np.ndarray:
+        """Sums the values of the leaves of the subtree of every node.
+
+        Args:
+            values (np.ndarray): A value of each node
+            is_leaf (np.ndarray, optional): Nodes treated as leaves. Defaults to the leaves of the tree.
+
+        Returns:
+            np.ndarray: The sum of the leaf values below each node
+        """
+        is_leaf = ~self.internal if is_leaf is None else is_leaf
+        sums = np.where(is_leaf, values, 0).astype(np.float64)
+
+        for level in self.levels:
+            np.add.at(sums, self.parent[level], np.where(is_leaf[self.parent[level]], 0, sums[level]))
+
+        return np.where(is_leaf, values, sums)
+
+    def prune_flags(self, leaf_cost: np.ndarray, terminal_cost: np.ndarray) -> np.ndarray:
+        """Finds the pruned subtree of the lowest cost with one bottom-up pass.
+
+        Args:
+            leaf_cost (np.ndarray): The cost of each node as a leaf
+            terminal_cost (np.ndarray): The cost of each node that doesn't depend on its children,
+                equal to the leaf cost for leaves
+
+        Returns:
+            np.ndarray: Whether each internal node becomes a leaf
+        """
+        best = terminal_cost.astype(np.float64)
+        pruned = np.zeros(len(self.nodes), dtype=bool)
+
+        for level in self.levels:
+            internal = level[self.internal[level]]
+            pruned[internal] = leaf_cost[internal] <= best[internal] + COST_TOLERANCE
+            best[internal] = np.minimum(leaf_cost[internal], best[internal])
+            np.add.at(best, self.parent[level], best[level])
+
+        if self.internal[0]:
+            pruned[0] = leaf_cost[0] <= best[0] + COST_TOLERANCE
+
+        return pruned
+
+    def prune(self, pruned: np.ndarray) -> int:
+        """Turns the flagged nodes into leaves.
+
+        Args:
+            pruned (np.ndarray): Whether each node becomes a leaf
+
+        Returns:
+            int: The number of removed nodes
+        """
+        for i in np.flatnonzero(pruned & self.internal):
+            node = self.nodes[i]
+            node.main_feature = None
+            node.threshold = None
+            node.child_nodes = []
+            node.child_values = []
+            node.child_map = None
+            node.default_child = None
+
+        return len(self.nodes) - len(FlatTree.breadth_first(self.starter_node))
+
+    def training_errors(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The number of misclassified training samples of each node as a leaf
+        """
+        if any(node.class_counts is None for node in self.nodes):
+            raise(TypeError("The nodes don't have the class counts of training, the tree has to be trained"))
+
+        return np.array([node.class_counts.sum() - node.class_counts.max() for node in self.nodes], dtype=np.float64)
+
+    def reduced_error(self, samples: pd.DataFrame, target_label: str = 'label', missing_code: int = None) -> int:
+        """Prunes every subtree that doesn't make fewer errors on the validation samples than its root as a leaf.
+
+        Args:
+            samples (pd.DataFrame): Validation samples
+            target_label (str, optional): The label of the target data column. Defaults to 'label'.
+            missing_code (int, optional): The code of missing values in encoded integer columns. Defaults to None.
+
+        Returns:
+            int: The number of removed nodes
+        """
+        flat_tree = FlatTree.compile(self.starter_node, missing_code=missing_code)
+        final_nodes = flat_tree.apply(flat_tree.encode(samples))
+
+        # unknown labels are counted in an extra class that no node predicts
+        n_classes = len(flat_tree.classes)
+        label_codes = pd.Index(flat_tree.classes).get_indexer(samples[target_label].to_numpy())
+        label_codes[label_codes < 0] = n_classes
+        terminal = np.bincount(final_nodes * (n_classes + 1) + label_codes,
+                               minlength=len(self.nodes) * (n_classes + 1)).reshape(len(self.nodes), n_classes + 1)
+
+        # the samples that reach each node
+        reached = terminal.copy()
+        for level in self.levels:
+            np.add.at(reached, self.parent[level], reached[level])
+
+        rows = np.arange(len(self.nodes))
+        node_labels = np.where(flat_tree.label >= 0, flat_tree.label, n_classes)
+        leaf_errors = reached.sum(axis=1) - reached[rows, node_labels]
+        terminal_errors = terminal.sum(axis=1) - terminal[rows, node_labels]
+
+        return self.prune(self.prune_flags(leaf_errors, terminal_errors))
+
+    def cost_complexity(self, alpha: float) -> int:
+        """Prunes the tree to the subtree with the lowest training error rate plus alpha times the number of leaves.
+
+        Args:
+            alpha (float): The cost of each leaf
+
+        Returns:
+            int: The number of removed nodes
+        """
+        if not np.isfinite(alpha):
+            raise(ValueError(f"alpha has to be a finite number, not {alpha}"))
+
+        errors = self.training_errors() / self.nodes[0].class_counts.sum()
+        leaf_cost = errors + alpha
+
+        return self.prune(self.prune_flags(leaf_cost, np.where(self.internal, 0, leaf_cost)))
+
+    def cost_complexity_path(self) -> np.ndarray:
+        """Finds the alphas where the weakest links of the tree are pruned one after the other,
+        cost_complexity(alpha) with an alpha between two of them gives the same subtree.
+
+        Returns:
+            np.ndarray: The increasing alphas of the pruning sequence starting with 0
+        """
+        errors = self.training_errors() / self.nodes[0].class_counts.sum()
+        is_leaf = ~self.internal
+        alphas = [0.0]
+
+        while not is_leaf[0]:
+            # the nodes that are still in the pruned tree
+            active = np.ones(len(self.nodes), dtype=bool)
+            for level in self.levels[::-1]:
+                active[level] = active[self.parent[level]] & ~is_leaf[self.parent[level]]
+
+            subtree_errors = self.subtree_sums(errors, is_leaf)
+            n_leaves = self.subtree_sums(np.ones(len(self.nodes)), is_leaf)
+            candidates = active & ~is_leaf
+            weakest = np.full(len(self.nodes), np.inf)
+            # chains of single children don't add leaves, they are the weakest links and are collapsed first
+            extra_leaves = n_leaves[candidates] - 1
+            weakest[candidates] = np.divide(errors[candidates] - subtree_errors[candidates], extra_leaves,
+                                            out=np.zeros(len(extra_leaves)), where=extra_leaves > 0)
+
+            alpha = max(float(weakest.min()), alphas[-1])
+            if not np.isfinite(alpha):
+                raise(ValueError("The weakest link of the tree doesn't have a finite alpha"))
+            alphas.append(alpha)
+            is_leaf = is_leaf | (weakest <= alpha + COST_TOLERANCE)
+
+        return np.unique(alphas)
@@ -0,0 +1,204 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Tuple
+from models.batch_predictor import BatchPredictor
+from models.decision_tree import DecisionTree
+from models.flat_tree import FlatTree
+from models.tree_builder import TreeBuilder
+from utils.node import Node
+from utils.shared_array import SharedArray
+import pandas as pd
+import numpy as np
+import os
+
+# the shared encoded data of each worker process
+_worker_data = None
+
+
+class RandomForest:
+    """RandomForest is a bagging ensemble of decision trees. Each tree is trained on a bootstrap sample
+    of the rows and considers a random subset of the features in each node.
+
+    The samples are encoded once and the code matrix is shared by all the trees, in shared memory when the
+    trees are trained in worker processes. A bootstrap sample is only a permutation index with repeated rows,
+    so the data is never copied for a tree.
+
+    The trees are compiled with the same encoding and stacked into one FlatTree, so prediction encodes the
+    samples once, routes them through all the trees together and takes a vectorized majority vote.
+    """
+
+    def __init__(self, n_estimators: int = 10, max_length: int = None, max_features: Any = 'sqrt',
+                 target_label: str = 'label', n_jobs: int = None, numeric_features: list = None,
+                 max_bins: int = 255, bootstrap: bool = True, random_state: int = None, criterion: Any = None,
+                 n_threads: int = None, missing_code: int = None) -> None:
+        """
+        Args:
+            n_estimators (int, optional): The number of trees. Defaults to 10.
+            max_length (int, optional): Maximum allowed length of the trees. Defaults to None.
+            max_features (Any, optional): The number of randomly chosen candidate features of each split:
+                an int, a float portion of the features, 'sqrt', 'log2' or None for all the features. Defaults to 'sqrt'.
+            target_label (str, optional): The label of the target data column. Defaults to 'label'.
+            n_jobs (int, optional): The number of worker processes, -1 uses all the cores. Defaults to None.
+            numeric_features (list, optional): Features that are binned and split with thresholds.
+                Defaults to the float columns of the samples.
+            max_bins (int, optional): The maximum number of bins of numeric features. Defaults to 255.
+            bootstrap (bool, optional): Train each tree on a bootstrap sample of the rows. Defaults to True.
+            random_state (int, optional): The seed of the bootstrap and feature sampling. Defaults to None.
+            criterion (Any, optional): The criterion scoring the splits, see DecisionTree. Defaults to None.
+            n_threads (int, optional): The number of threads that route shards of large batches,
+                -1 uses all the cores. Defaults to None.
+            missing_code (int, optional): The code of missing values in encoded integer columns, see DecisionTree.
+                Defaults to None.
+        """
+        self.n_estimators = n_estimators
+        self.max_length = max_length
+        self.max_features = max_features
+        self.target_label = target_label
+        self.n_jobs = os.cpu_count() if n_jobs == -1 else (n_jobs or 1)
+        self.numeric_features = numeric_features
+        self.max_bins = max_bins
+        self.bootstrap = bootstrap
+        self.random_state = random_state
+        self.criterion = criterion
+        self.n_threads = n_threads
+        self.missing_code = missing_code
+        self.estimators = []
+        self.feature_names = None
+        self.flat_forest = None
+        self.roots = None
+
+    def train(self, samples: pd.DataFrame, epsilon: float = 0.01) -> None:
+        """Trains the trees of the forest, in parallel when n_jobs > 1.
+
+        Args:
+            samples (pd.DataFrame): Data samples
+            epsilon (float, optional): The minimum valus of the entropy for data in the node. Defaults to 0.01.
+        """
+        template = DecisionTree(max_length=self.max_length, target_label=self.target_label,
+                                numeric_features=self.numeric_features, max_bins=self.max_bins,
+                                missing_code=self.missing_code)
+        codes, labels, feature_names, vocabularies, classes, numeric = template.encode_arrays(samples)
+        codes = np.ascontiguousarray(codes)
+        labels = labels.astype(np.intp, copy=False)
+        feature_names = list(feature_names)
+
+        params = (self.max_length, epsilon, self.target_label, self.max_features, self.criterion, self.bootstrap,
+                  feature_names, vocabularies, classes, numeric)
+        seeds = np.random.default_rng(self.random_state).integers(0, 2 ** 31, self.n_estimators)
+
+        if self.n_jobs == 1:
+            _init_worker(params, (codes, labels))
+            roots = [_fit_worker(seed) for seed in seeds]
+        else:
+            shared = [SharedArray.create(array) for array in (codes, labels)]
+            try:
+                with ProcessPoolExecutor(self.n_jobs, initializer=_init_worker,
+                                         initargs=(params, [array.spec for array in shared], True)) as pool:
+                    roots = list(pool.map(_fit_worker, seeds))
+            finally:
+                for array in shared:
+                    array.close()
+
+        self.feature_names = feature_names
+        self.estimators = []
+        for root in roots:
+            tree = DecisionTree(root, self.max_length, self.target_label, max_features=self.max_features,
+                                criterion=self.criterion, missing_code=self.missing_code)
+            tree.feature_names = feature_names
+            tree.classes = classes
+            tree.flat_tree = FlatTree.compile(root, feature_names, vocabularies, numeric, classes,
+                                              self.missing_code)
+            self.estimators.append(tree)
+
+        self.flat_forest, self.roots = FlatTree.stack([tree.flat_tree for tree in self.estimators])
+
+    def predictor(self) -> BatchPredictor:
+        """
+        Returns:
+            BatchPredictor: The predictor of the stacked trees with n_threads threads
+        """
+        return BatchPredictor(self.flat_forest, self.roots, self.n_threads)
+
+    def vote(self, samples: pd.DataFrame) -> np.ndarray:
+        """Counts the votes of the trees for each class.
+
+        Args:
+            samples (pd.DataFrame): Data samples
+
+        Returns:
+            np.ndarray: The votes with the shape (n_samples, n_classes)
+        """
+        if self.flat_forest is None:
+            raise(TypeError("The random forest hasn't been trained"))
+
+        n_classes = len(self.flat_forest.classes)
+        with self.predictor() as predictor:
+            label_codes = self.flat_forest.label[predictor.apply(samples)]
+
+        rows = np.broadcast_to(np.arange(len(samples)), label_codes.shape)
+        voted = label_codes >= 0
+        votes = np.bincount(rows[voted] * n_classes + label_codes[voted], minlength=len(samples) * n_classes)
+
+        return votes.reshape(len(samples), n_classes)
+
+    def predict_proba(self, samples: pd.DataFrame) -> np.ndarray:
+        """Averages the class probabilities of the trees.
+
+        Args:
+            samples (pd.DataFrame): Data samples
+
+        Returns:
+            np.ndarray: The probabilities with the shape (n_samples, n_classes)
+        """
+        if self.flat_forest is None:
+            raise(TypeError("The random forest hasn't been trained"))
+
+        with self.predictor() as predictor:
+            return predictor.predict_proba(samples)
+
+    def predict(self, samples: pd.DataFrame) -> Tuple:
+        """Predicts the label of each sample by the majority vote of the trees.
+
+        Args:
+            samples (pd.DataFrame): Data samples
+
+        Returns:
+            Tuple: A tuple containing the predicted labels and ground truth,
+                the ground truth is None if the samples don't have the target column
+        """
+        labels = self.flat_forest.decode(np.argmax(self.vote(samples), axis=1))
+
+        if self.target_label not in samples.columns:
+            return labels, None
+
+        return labels, samples[self.target_label].to_numpy()
+
+
+def _init_worker(params: tuple, arrays: List, shared: bool = False) -> None:
+    """Sets up the encoded data of the worker, attaching to shared memory in pool workers."""
+    global _worker_data
+
+    attached = [SharedArray.attach(spec) for spec in arrays] if shared else None
+    if shared:
+        arrays = [array.array for array in attached]
+
+    # the attached arrays are kept with the arrays that use their memory
+    _worker_data = (params, arrays, attached)
+
+
+def _fit_worker(seed: int) -> Node:
+    """Trains one tree of the forest on a bootstrap sample of the rows."""
+    (max_length, epsilon, target_label, max_features, criterion, bootstrap,
+     feature_names, vocabularies, classes, numeric), (codes, labels), _ = _worker_data
+
+    rng = np.random.default_rng(seed)
+    n_samples = len(labels)
+    index = rng.integers(0, n_samples, n_samples) if bootstrap else np.arange(n_samples)
+
+    builder = TreeBuilder(max_length, epsilon, target_label, max_features=max_features, random_state=rng,
+                          criterion=criterion)
+    builder.attach(codes, labels, index, feature_names, vocabularies, classes, numeric)
+
+    root = Node(1, target_label, builder.ig)
+    builder.grow(root, 0, n_samples)
+
+    return root
@@ -0,0 +1,164 @@
+from typing import Callable, Iterable, List, Tuple
+from models.flat_tree import FlatTree
+from models.tree_builder import TreeBuilder
+from utils.encoder import MISSING, Encoder, missing_mask
+from utils.node import Node, shared_counts
+import pandas as pd
+import numpy as np
+
+
+class StreamTreeBuilder(TreeBuilder):
+    """StreamTreeBuilder trains a tree on data that is read in chunks and doesn't have to fit in memory.
+
+    The tree is grown breadth first with one pass over the data per level. In each pass the chunks are
+    routed through the tree trained so far and the (feature value x class) histograms of the open nodes
+    are accumulated, then all the open nodes are split at once. The memory is bounded by the histograms
+    of one level and doesn't depend on the number of samples. All the features are treated as categorical.
+    Missing values are counted in the missing slot of the histograms, since the chunks aren't known in advance.
+    """
+
+    def __init__(self, *args, missing_code: int = None, **kwargs) -> None:
+        """
+        Args:
+            args: The arguments of TreeBuilder
+            missing_code (int, optional): The code of missing values in encoded integer columns. Defaults to None.
+            kwargs: The arguments of TreeBuilder
+        """
+        super().__init__(*args, **kwargs)
+        self.missing_code = missing_code
+
+    def build_stream(self, chunk_source: Callable[[], Iterable[pd.DataFrame]], vocabularies: dict = None) -> Node:
+        """Trains a tree on chunks of data samples.
+
+        Args:
+            chunk_source (Callable): A function returning a new iterator over the DataFrame chunks,
+                it is called once for each level of the tree
+            vocabularies (dict, optional): The sorted categories of each column including the target.
+                Defaults to an extra pass over the data to find them.
+
+        Returns:
+            Node: The root node of the trained tree
+        """
+        if self.max_leaf_nodes is not None:
+            raise(ValueError("max_leaf_nodes isn't supported by level-wise stream training"))
+
+        if vocabularies is None:
+            vocabularies = self.scan_vocabularies(chunk_source())
+        feature_names = [name for name in vocabularies if name != self.target_label]
+
+        self.encoder = Encoder(vocabularies, self.missing_code)
+        self.attach(None, None, None, feature_names, [vocabularies[name] for name in feature_names],
+                    np.asarray(vocabularies[self.target_label]), missing=True)
+
+        root = Node(1, self.target_label, self.ig)
+        frontier = [root]
+
+        while frontier:
+            class_counts, histograms = self.level_histograms(root, frontier, chunk_source())
+            next_frontier = []
+            for node, node_class_counts, histogram in zip(frontier, class_counts, histograms):
+                next_frontier.extend(self.expand_histogram(node, node_class_counts, histogram))
+            frontier = next_frontier
+
+        return root
+
+    def scan_vocabularies(self, chunks: Iterable[pd.DataFrame]) -> dict:
+        """Finds the sorted categories of each column with one pass over the chunks, missing values aren't categories.
+
+        Args:
+            chunks (Iterable): The DataFrame chunks
+
+        Returns:
+            dict: The vocabulary of each column
+        """
+        values = {}
+        for chunk in chunks:
+            for column in chunk.columns:
+                uniques = pd.unique(chunk[column].to_numpy())
+                values.setdefault(column, set()).update(uniques[~missing_mask(uniques, self.missing_code)])
+
+        return {column: np.array(sorted(column_values)) for column, column_values in values.items()}
+
+    def level_histograms(self, root: Node, frontier: List, chunks: Iterable[pd.DataFrame]) -> Tuple:
+        """Accumulates the class counts and histograms of the open nodes with one pass over the chunks.
+
+        Args:
+            root (Node): The root node of the tree trained so far
+            frontier (list): The open nodes of the current level
+            chunks (Iterable): The DataFrame chunks
+
+        Returns:
+            Tuple: Class counts with the shape (n_open_nodes, n_classes) and
+                histograms with the shape (n_open_nodes, n_features, n_values, n_classes)
+        """
+        n_features = len(self.feature_names)
+        n_values = self.n_slots
+        n_classes = len(self.classes)
+        class_counts = np.zeros((len(frontier), n_classes), dtype=np.int64)
+        histograms = np.zeros((len(frontier), n_features, n_values, n_classes), dtype=np.int64)
+
+        flat_tree = FlatTree.compile(root, missing_code=self.missing_code)
+        positions = {id(node): i for i, node in enumerate(frontier)}
+        flat_positions = np.array([positions.get(id(node), -1) for node in FlatTree.breadth_first(root)])
+
+        for chunk in chunks:
+            self.profiler.count('chunks')
+            self.profiler.count('histogram_rows', len(chunk))
+            labels = pd.Index(self.classes).get_indexer(chunk[self.target_label].to_numpy())
+            node_positions = flat_positions[flat_tree.apply(flat_tree.encode(chunk))]
+            rows = (node_positions >= 0) & (labels >= 0)
+
+            class_counts += np.bincount(node_positions[rows] * n_classes + labels[rows],
+                                        minlength=len(frontier) * n_classes).reshape(len(frontier), n_classes)
+
+            codes = self.encoder.transform(chunk, self.feature_names)
+            with self.profiler.phase('histogram'):
+                for feature in range(n_features):
+                    feature_codes = np.where(codes[feature] == MISSING, n_values - 1, codes[feature])
+                    known = rows & (feature_codes >= 0)
+                    index = (node_positions[known] * n_values + feature_codes[known]) * n_classes + labels[known]
+                    histograms[:, feature] += np.bincount(index, minlength=len(frontier) * n_values * n_classes
+                                                          ).reshape(len(frontier), n_values, n_classes)
+
+        return class_counts, histograms
+
+    def expand_histogram(self, node: Node, class_counts: np.ndarray, histogram: np.ndarray) -> List:
+        """Either splits the node on its most informative feature or labels it as a leaf.
+
+        Args:
+            node (Node): The open node
+            class_counts (np.ndarray): The class counts of the node samples
+            histogram (np.ndarray): The histogram of the node samples
+
+        Returns:
+            list: The child nodes
+        """
+        if class_counts.sum() == 0:
+            return []
+
+        self.profiler.node(node.n_stage, int(class_counts.sum()))
+        node.class_counts = shared_counts(class_counts, self.class_counts)
+        node.label = self.classes[np.argmax(class_counts)]
+
+        if not self.splittable(node.n_stage, class_counts):
+            return []
+
+        with self.profiler.phase('scoring'):
+            feature, _, _ = self.best_split(histogram)
+        if feature is None:
+            return []
+
+        values = np.flatnonzero(histogram[feature, :-1].sum(axis=1))
+        if len(values) < 2:
+            return []
+
+        node.main_feature = self.feature_names[feature]
+        default = self.default_child(histogram, feature, 0)
+        if default is not None:
+            node.default_child = int(np.searchsorted(values, default))
+        for value in values:
+            node.child_nodes.append(Node(node.n_stage + 1, self.target_label, self.ig))
+            node.child_values.append(self.vocabularies[feature][value])
+        self.profiler.count('nodes_expanded')
+
+        return node.child_nodes
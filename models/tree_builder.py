@@ -0,0 +1,591 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Tuple
+from utils.encoder import MISSING
+from utils.information_gain import InformationGain
+from utils.node import Node, n_candidate_features, shared_counts
+from utils.profiler import NULL_PROFILER, Profiler
+from utils.shared_array import SharedArray
+from utils.stack import Stack
+import numpy as np
+import heapq
+import itertools
+import os
+
+# nodes with fewer samples are processed in the main process when training in parallel
+PARALLEL_MIN_SAMPLES = 20000
+
+# the builder of each worker process
+_worker_builder = None
+
+
+class TreeBuilder:
+    """TreeBuilder grows a tree of nodes over integer coded data without copying the data for each node.
+
+    The data is encoded once into a contiguous code matrix. Every node only holds a [start, end) range of
+    a shared permutation of the sample indices, and the range is partitioned in place when the node is split,
+    so the samples of each child are a contiguous sub-range of the parent range.
+
+    Splits are scored from the (feature value x class) histogram of the node. Categorical features make
+    one child per category and binned numeric features make a binary threshold split. The histogram of the
+    largest child is the parent histogram minus the histograms of its siblings, so only the smaller children
+    are counted from the data.
+
+    With n_jobs > 1 the code matrix and the permutation are moved to shared memory. Histograms of large nodes
+    are counted across a process pool, and once there are at least n_jobs open nodes, the remaining
+    subtrees are trained concurrently by the workers on disjoint ranges of the permutation.
+
+    The size of the tree is bounded by pre-pruning: nodes are only split with enough samples, every child keeps
+    at least min_samples_leaf samples, categorical splits have at most max_categories children, and with
+    max_leaf_nodes the nodes are grown best-first from a priority queue of their split gains until the
+    number of leaves is reached.
+
+    Missing values have the reserved code MISSING. When the data has missing values the histograms get an
+    extra slot counting them, the gains are computed from the known values and scaled by their portion as in
+    C4.5, and each split learns the default child of the missing values that gives the highest gain.
+    """
+
+    def __init__(self, max_length: int = None, epsilon: float = 0.01, target_label: str = 'label',
+                 n_jobs: int = None, max_features: Any = None, random_state: int = None,
+                 criterion: Any = None, min_samples_split: int = 2, min_samples_leaf: int = 1,
+                 min_information_gain: float = None, max_leaf_nodes: int = None, max_categories: int = None,
+                 profiler: Profiler = NULL_PROFILER) -> None:
+        """
+        Args:
+            max_length (int, optional): Maximum allowed length of tree. Defaults to None.
+            epsilon (float, optional): The minimum value of the entropy for data in the node. Defaults to 0.01.
+            target_label (str, optional): The label of the target data column. Defaults to 'label'.
+            n_jobs (int, optional): The number of worker processes, -1 uses all the cores. Defaults to None.
+            max_features (Any, optional): The number of randomly chosen candidate features of each split,
+                see n_candidate_features. Defaults to None which uses all the features.
+            random_state (int, optional): The seed of the feature sampling. Defaults to None.
+            criterion (Any, optional): The criterion scoring the splits, a Criterion or one of the names in
+                utils.criteria.CRITERIA. Defaults to None which is entropy.
+            min_samples_split (int, optional): The minimum number of samples of a node that is split. Defaults to 2.
+            min_samples_leaf (int, optional): The minimum number of samples of each child of a split. Defaults to 1.
+            min_information_gain (float, optional): The minimum gain of a split. Defaults to None.
+            max_leaf_nodes (int, optional): The maximum number of leaves, the tree is grown best-first
+                in a single process. Defaults to None.
+            max_categories (int, optional): The maximum number of children of a categorical split. Defaults to None.
+            profiler (Profiler, optional): Records the phase timers and counters, work done by
+                worker processes isn't recorded. Defaults to NULL_PROFILER.
+        """
+        self.max_length = max_length
+        self.epsilon = epsilon
+        self.target_label = target_label
+        self.n_jobs = os.cpu_count() if n_jobs == -1 else (n_jobs or 1)
+        self.max_features = max_features
+        self.random_state = random_state
+        self.rng = np.random.default_rng(random_state)
+        self.profiler = profiler
+        self.criterion = criterion
+        self.min_samples_split = min_samples_split
+        self.min_samples_leaf = min_samples_leaf
+        self.min_information_gain = min_information_gain
+        self.max_leaf_nodes = max_leaf_nodes
+        self.max_categories = max_categories
+        self.ig = InformationGain(target_label, criterion)
+        self.pool = None
+
+    def settings(self) -> dict:
+        """
+        Returns:
+            dict: The arguments of a builder with the same settings, without the processes and the profiler
+        """
+        return {'max_length': self.max_length, 'epsilon': self.epsilon, 'target_label': self.target_label,
+                'max_features': self.max_features, 'random_state': self.random_state, 'criterion': self.criterion,
+                'min_samples_split': self.min_samples_split, 'min_samples_leaf': self.min_samples_leaf,
+                'min_information_gain': self.min_information_gain, 'max_leaf_nodes': self.max_leaf_nodes,
+                'max_categories': self.max_categories}
+
+    def build(self, codes: np.ndarray, labels: np.ndarray, feature_names: List, vocabularies: List,
+              classes: np.ndarray, numeric: List = None) -> Node:
+        """Trains a tree on the encoded data.
+
+        Args:
+            codes (np.ndarray): Feature codes with the shape (n_features, n_samples)
+            labels (np.ndarray): Class codes of the samples
+            feature_names (list): The names of the features
+            vocabularies (list): The sorted categories of each categorical feature and
+                the bin edges of each numeric feature
+            classes (np.ndarray): The sorted target classes
+            numeric (list, optional): Whether each feature is a binned numeric feature. Defaults to None.
+
+        Returns:
+            Node: The root node of the trained tree
+        """
+        self.attach(np.ascontiguousarray(codes), labels.astype(np.intp, copy=False), np.arange(len(labels)),
+                    feature_names, vocabularies, classes, numeric)
+
+        root = Node(1, self.target_label, self.ig)
+
+        # best-first growth needs one priority queue of the whole tree
+        if self.n_jobs > 1 and self.max_leaf_nodes is None:
+            self.grow_parallel(root)
+        else:
+            self.grow(root, 0, len(self.index))
+
+        return root
+
+    def attach(self, codes: np.ndarray, labels: np.ndarray, index: np.ndarray, feature_names: List,
+               vocabularies: List, classes: np.ndarray, numeric: List = None, missing: bool = None) -> None:
+        """Sets the encoded data that the nodes are trained on.
+
+        Args:
+            codes (np.ndarray): Feature codes with the shape (n_features, n_samples)
+            labels (np.ndarray): Class codes of the samples
+            index (np.ndarray): The permutation of the sample indices
+            feature_names (list): The names of the features
+            vocabularies (list): The categories or bin edges of each feature
+            classes (np.ndarray): The sorted target classes
+            numeric (list, optional): Whether each feature is a binned numeric feature. Defaults to None.
+            missing (bool, optional): Whether the codes have missing values. Defaults to checking the codes.
+        """
+        self.codes = codes
+        self.labels = labels
+        self.index = index
+        self.feature_names = list(feature_names)
+        self.vocabularies = vocabularies
+        self.classes = classes
+        self.numeric = np.zeros(len(feature_names), dtype=bool) if numeric is None else np.asarray(numeric)
+        self.n_values = [len(vocabulary) + int(is_numeric)
+                         for vocabulary, is_numeric in zip(vocabularies, self.numeric)]
+        self.missing = bool(codes is not None and (codes == MISSING).any()) if missing is None else missing
+        # the last value slot of the histograms counts the missing values
+        self.n_slots = max(self.n_values, default=1) + int(self.missing)
+        # the read-only class count arrays shared by the nodes
+        self.class_counts = {}
+
+    def grow(self, node: Node, start: int, end: int, histogram: np.ndarray = None) -> None:
+        """Trains the subtree of the node over the given range of the permutation.
+
+        Args:
+            node (Node): The root of the subtree
+            start (int): Start of the node samples in the permutation
+            end (int): End of the node samples in the permutation
+            histogram (np.ndarray, optional): The histogram of the node if it is already known. Defaults to None.
+        """
+        if self.max_leaf_nodes is not None:
+            self.grow_best_first(node, start, end, histogram)
+            return
+
+        train_stack = Stack()
+        train_stack.push((node, start, end, histogram))
+
+        while(train_stack.size() > 0):
+            for node_range in self.expand(*train_stack.pop()):
+                train_stack.push(node_range)
+
+    def grow_best_first(self, node: Node, start: int, end: int, histogram: np.ndarray = None) -> None:
+        """Trains the subtree of the node by always splitting the open node with the highest gain,
+        until no node can be split or another split would exceed max_leaf_nodes.
+
+        Args:
+            node (Node): The root of the subtree
+            start (int): Start of the node samples in the permutation
+            end (int): End of the node samples in the permutation
+            histogram (np.ndarray, optional): The histogram of the node if it is already known. Defaults to None.
+        """
+        # the heap holds the negated gain, an insertion counter that breaks ties and the open node with its split
+        split_heap = []
+        order = itertools.count()
+        open_nodes = [(node, start, end, histogram)]
+        n_leaves = 1
+
+        while True:
+            for open_node in open_nodes:
+                split = self.find_split(*open_node)
+                if split is not None:
+                    heapq.heappush(split_heap, (-split[2], next(order), open_node[:3], split))
+            if not split_heap:
+                break
+
+            _, _, (node, start, end), split = heapq.heappop(split_heap)
+            n_children = np.count_nonzero(np.bincount(split[3]))
+            if n_leaves + n_children - 1 > self.max_leaf_nodes:
+                open_nodes = []
+                continue
+
+            n_leaves += n_children - 1
+            open_nodes = self.split_node(node, start, end, *split)
+
+    def grow_parallel(self, root: Node) -> None:
+        """Trains the tree with a pool of worker processes sharing the encoded data.
+
+        Args:
+            root (Node): The root node
+        """
+        shared = [SharedArray.create(array) for array in (self.codes, self.labels, self.index)]
+        self.codes, self.labels, self.index = [array.array for array in shared]
+
+        try:
+            with ProcessPoolExecutor(self.n_jobs, initializer=_init_worker,
+                                     initargs=(self.settings(), [array.spec for array in shared], self.feature_names,
+                                               self.vocabularies, self.classes, self.numeric)) as self.pool:
+                train_stack = Stack()
+                train_stack.push((root, 0, len(self.index), None))
+
+                # the top of the tree is grown with parallel histograms
+                while(0 < train_stack.size() < self.n_jobs):
+                    for node_range in self.expand(*train_stack.pop()):
+                        train_stack.push(node_range)
+
+                # the open subtrees are grown concurrently, each with its own seed so the tree
+                # doesn't depend on which worker grows which subtree
+                seeds = np.random.SeedSequence(self.random_state).spawn(train_stack.size())
+                subtrees = [(node, self.pool.submit(_grow_worker, start, end, node.n_stage, seed))
+                            for (node, start, end, _), seed in zip(train_stack.stack, seeds)]
+                for node, subtree in subtrees:
+                    self.graft(node, subtree.result())
+        finally:
+            self.pool = None
+            self.codes = self.labels = self.index = None
+            for array in shared:
+                array.close()
+
+    def graft(self, node: Node, subtree: Node) -> None:
+        """Copies the subtree trained by a worker into the node of the tree.
+
+        Args:
+            node (Node): The node in the tree
+            subtree (Node): The trained root of the subtree
+        """
+        node.main_feature = subtree.main_feature
+        node.threshold = subtree.threshold
+        node.label = subtree.label
+        node.child_nodes = subtree.child_nodes
+        node.child_values = subtree.child_values
+        node.class_counts = subtree.class_counts
+        node.default_child = subtree.default_child
+
+    def splittable(self, n_stage: int, class_counts: np.ndarray) -> bool:
+        """
+        Args:
+            n_stage (int): The stage of the node
+            class_counts (np.ndarray): The class counts of the node samples
+
+        Returns:
+            bool: Whether the node should be split
+        """
+        # the entropy is only computed when the cheap limits allow a split
+        if self.max_length is not None and n_stage >= self.max_length:
+            return False
+        if class_counts.sum() < max(self.min_samples_split, 2 * self.min_samples_leaf):
+            return False
+
+        with self.profiler.phase('entropy'):
+            return bool(self.ig.entropy_from_counts(class_counts) >= self.epsilon)
+
+    def expand(self, node: Node, start: int, end: int, histogram: np.ndarray = None) -> List:
+        """Either splits the node on its most informative feature or labels it as a leaf.
+
+        Args:
+            node (Node): The node being trained
+            start (int): Start of the node samples in the permutation
+            end (int): End of the node samples in the permutation
+            histogram (np.ndarray, optional): The histogram of the node if it is already known. Defaults to None.
+
+        Returns:
+            list: Tuples of child nodes, their sample ranges and histograms
+        """
+        split = self.find_split(node, start, end, histogram)
+        if split is None:
+            return []
+
+        return self.split_node(node, start, end, *split)
+
+    def find_split(self, node: Node, start: int, end: int, histogram: np.ndarray = None) -> Tuple:
+        """Labels the node and finds its best split without splitting it.
+
+        Args:
+            node (Node): The node being trained
+            start (int): Start of the node samples in the permutation
+            end (int): End of the node samples in the permutation
+            histogram (np.ndarray, optional): The histogram of the node if it is already known. Defaults to None.
+
+        Returns:
+            Tuple: The split feature, the threshold bin, the gain, the child code of each sample, the histogram
+                of the node and the child code of missing values, or None if the node is a leaf
+        """
+        rows = self.index[start:end]
+        profiler = self.profiler
+        profiler.node(node.n_stage, end - start)
+
+        with profiler.phase('label'):
+            class_counts = np.bincount(self.labels[rows], minlength=len(self.classes))
+            node.class_counts = shared_counts(class_counts, self.class_counts)
+            # internal nodes keep the majority label for samples with unseen categories
+            node.label = self.classes[np.argmax(class_counts)]
+
+        if not self.splittable(node.n_stage, class_counts):
+            return None
+
+        if histogram is None:
+            histogram = self.histogram(start, end)
+
+        with profiler.phase('scoring'):
+            feature, threshold, gain = self.best_split(histogram)
+        if feature is None:
+            return None
+
+        feature_codes = self.codes[feature][rows]
+        child_codes = (feature_codes > threshold).astype(np.intp) if self.numeric[feature] else feature_codes
+        default = self.default_child(histogram, feature, threshold) if self.missing else None
+        if default is not None:
+            child_codes = np.where(feature_codes == MISSING, default, child_codes)
+        # a split with a single child doesn't separate the samples, the node is a leaf
+        if np.count_nonzero(np.bincount(child_codes)) < 2:
+            return None
+
+        return feature, threshold, gain, child_codes, histogram, default
+
+    def split_node(self, node: Node, start: int, end: int, feature: int, threshold: int, gain: float,
+                   child_codes: np.ndarray, histogram: np.ndarray, default: int = None) -> List:
+        """Splits the node with a split found by find_split.
+
+        Args:
+            node (Node): The node being split
+            start (int): Start of the node samples in the permutation
+            end (int): End of the node samples in the permutation
+            feature (int): Index of the split feature
+            threshold (int): The threshold bin of numeric features
+            gain (float): The gain of the split
+            child_codes (np.ndarray): The child code of each sample of the node
+            histogram (np.ndarray): The histogram of the node
+            default (int, optional): The child code of the missing values. Defaults to None.
+
+        Returns:
+            list: Tuples of child nodes, their sample ranges and histograms
+        """
+        profiler = self.profiler
+        node.main_feature = self.feature_names[feature]
+        if self.numeric[feature]:
+            node.threshold = self.vocabularies[feature][threshold]
+
+        with profiler.phase('split'):
+            child_ranges = self.partition(node, feature, child_codes, start, end, default)
+        profiler.count('nodes_expanded')
+
+        return self.child_histograms(histogram, child_ranges)
+
+    def histogram(self, start: int, end: int) -> np.ndarray:
+        """Counts the (feature value x class) histogram of the samples of the range.
+
+        Args:
+            start (int): Start of the node samples in the permutation
+            end (int): End of the node samples in the permutation
+
+        Returns:
+            np.ndarray: The histogram with the shape (n_features, n_values, n_classes)
+        """
+        features = np.arange(len(self.feature_names))
+        self.profiler.count('histograms')
+        self.profiler.count('histogram_rows', end - start)
+
+        if self.pool is not None and end - start >= PARALLEL_MIN_SAMPLES:
+            chunks = np.array_split(features, self.n_jobs)
+            return np.concatenate(list(self.pool.map(_histogram_worker, len(chunks) * [start],
+                                                     len(chunks) * [end], chunks)))
+
+        return self.feature_histogram(start, end, features)
+
+    def feature_histogram(self, start: int, end: int, features: np.ndarray) -> np.ndarray:
+        """Counts the histogram of the given features for the samples of the range.
+
+        Args:
+            start (int): Start of the node samples in the permutation
+            end (int): End of the node samples in the permutation
+            features (np.ndarray): Indices of the counted features
+
+        Returns:
+            np.ndarray: The histogram with the shape (len(features), n_values, n_classes)
+        """
+        return self.rows_histogram(self.index[start:end], features)
+
+    def rows_histogram(self, rows: np.ndarray, features: np.ndarray) -> np.ndarray:
+        """Counts the histogram of the given features for the given samples.
+
+        Args:
+            rows (np.ndarray): Indices of the samples
+            features (np.ndarray): Indices of the counted features
+
+        Returns:
+            np.ndarray: The histogram with the shape (len(features), n_values, n_classes)
+        """
+        codes = [self.codes[feature][rows] for feature in features]
+
+        with self.profiler.phase('histogram'):
+            if self.missing:
+                codes = [np.where(feature_codes == MISSING, self.n_slots - 1, feature_codes) for feature_codes in codes]
+            return self.ig.count_tables(codes, self.labels[rows], len(self.classes), self.n_slots)
+
+    def best_split(self, histogram: np.ndarray) -> Tuple:
+        """Finds the split with the highest information gain among the splits allowed by the pre-pruning limits.
+
+        Args:
+            histogram (np.ndarray): The histogram of the node
+
+        Returns:
+            Tuple: Index of the chosen feature, the threshold bin for numeric features and the gain,
+                the feature is None if there isn't any valid split
+        """
+        if self.missing:
+            histogram, missing = histogram[:, :-1], histogram[:, -1]
+
+        gains = np.full(len(self.feature_names), -np.inf)
+        thresholds = np.zeros(len(self.feature_names), dtype=np.intp)
+
+        # only the randomly chosen candidate features are scored
+        categorical = ~self.numeric
+        numeric = self.numeric.copy()
+        n_candidates = n_candidate_features(self.max_features, len(self.feature_names))
+        self.profiler.count('splits_scored', n_candidates)
+        if n_candidates < len(self.feature_names):
+            candidates = np.zeros(len(self.feature_names), dtype=bool)
+            candidates[self.rng.choice(len(self.feature_names), n_candidates, replace=False)] = True
+            categorical &= candidates
+            numeric &= candidates
+
+        if categorical.any():
+            tables = histogram[categorical]
+            categorical_gains = self.ig.information_gains_from_counts(tables)
+            if self.min_samples_leaf > 1 or self.max_categories is not None:
+                value_counts = tables.sum(axis=2)
+                invalid = ((value_counts > 0) & (value_counts < self.min_samples_leaf)).any(axis=1)
+                if self.max_categories is not None:
+                    invalid |= np.count_nonzero(value_counts, axis=1) > self.max_categories
+                categorical_gains[invalid] = -np.inf
+            gains[categorical] = categorical_gains
+        if numeric.any():
+            gains[numeric], thresholds[numeric] = self.ig.threshold_gains_from_counts(histogram[numeric],
+                                                                                      self.min_samples_leaf)
+        if self.missing:
+            # the gain of the known values is scaled by their portion of the samples
+            n_known = histogram.sum(axis=(1, 2))
+            known = n_known / np.maximum(n_known + missing.sum(axis=1), 1)
+            gains[known > 0] *= known[known > 0]
+            gains[known == 0] = -np.inf
+
+        feature = int(np.argmax(gains))
+        if gains[feature] == -np.inf:
+            return None, None, None
+        if self.min_information_gain is not None and gains[feature] < self.min_information_gain:
+            return None, None, gains[feature]
+
+        return feature, thresholds[feature], gains[feature]
+
+    def default_child(self, histogram: np.ndarray, feature: int, threshold: int) -> int:
+        """Finds the child of the split that the missing values go to, by adding the missing samples
+        to each child in turn and keeping the child with the highest gain.
+
+        Args:
+            histogram (np.ndarray): The histogram of the node with the missing slot
+            feature (int): Index of the split feature
+            threshold (int): The threshold bin of numeric features
+
+        Returns:
+            int: The child code of the missing values, or None if the node doesn't have missing values
+        """
+        table, missing = histogram[feature, :-1], histogram[feature, -1]
+        if missing.sum() == 0:
+            return None
+
+        if self.numeric[feature]:
+            table = np.stack((table[:threshold + 1].sum(axis=0), table[threshold + 1:].sum(axis=0)))
+        children = np.flatnonzero(table.sum(axis=1))
+
+        candidates = np.repeat(table[children][np.newaxis], len(children), axis=0)
+        candidates[np.arange(len(children)), np.arange(len(children))] += missing
+
+        return int(children[np.argmax(self.ig.information_gains_from_counts(candidates))])
+
+    def partition(self, node: Node, feature: int, child_codes: np.ndarray, start: int, end: int,
+                  default: int = None) -> List:
+        """Reorders the node range so the samples of each child are contiguous and creates the child nodes.
+
+        Args:
+            node (Node): The node being split
+            feature (int): Index of the split feature
+            child_codes (np.ndarray): The child code of each sample of the node
+            start (int): Start of the node samples in the permutation
+            end (int): End of the node samples in the permutation
+            default (int, optional): The child code of the missing values. Defaults to None.
+
+        Returns:
+            list: Tuples of child nodes and their sample ranges
+        """
+        rows = self.index[start:end]
+
+        self.index[start:end] = rows[np.argsort(child_codes, kind='stable')]
+
+        child_counts = np.bincount(child_codes)
+        values = np.flatnonzero(child_counts)
+        bounds = start + np.concatenate(([0], np.cumsum(child_counts[values])))
+        if default is not None:
+            node.default_child = int(np.searchsorted(values, default))
+
+        child_ranges = []
+        for i, value in enumerate(values):
+            child = Node(node.n_stage + 1, self.target_label, self.ig)
+            node.child_nodes.append(child)
+            if not self.numeric[feature]:
+                node.child_values.append(self.vocabularies[feature][value])
+            child_ranges.append((child, bounds[i], bounds[i + 1]))
+
+        return child_ranges
+
+    def child_histograms(self, histogram: np.ndarray, child_ranges: List) -> List:
+        """Adds the histograms of the children that will be split. The histogram of the largest
+        child is found by subtracting the histograms of its siblings from the parent histogram.
+
+        Args:
+            histogram (np.ndarray): The histogram of the parent node
+            child_ranges (list): Tuples of child nodes and their sample ranges
+
+        Returns:
+            list: Tuples of child nodes, their sample ranges and histograms
+        """
+        splittable = [self.splittable(child.n_stage,
+                                      np.bincount(self.labels[self.index[start:end]], minlength=len(self.classes)))
+                      for child, start, end in child_ranges]
+        largest = int(np.argmax([end - start for _, start, end in child_ranges]))
+
+        histograms = len(child_ranges) * [None]
+        if splittable[largest]:
+            siblings = histogram.copy()
+            for i, (_, start, end) in enumerate(child_ranges):
+                if i != largest:
+                    histograms[i] = self.histogram(start, end)
+                    siblings -= histograms[i]
+            histograms[largest] = siblings
+        else:
+            for i, (_, start, end) in enumerate(child_ranges):
+                if splittable[i]:
+                    histograms[i] = self.histogram(start, end)
+
+        return [(child, start, end, child_histogram)
+                for (child, start, end), child_histogram in zip(child_ranges, histograms)]
+
+
+def _init_worker(settings: dict, specs: List, feature_names: List, vocabularies: List, classes: np.ndarray,
+                 numeric: np.ndarray) -> None:
+    """Attaches a worker process to the shared encoded data."""
+    global _worker_builder
+
+    shared = [SharedArray.attach(spec) for spec in specs]
+    _worker_builder = TreeBuilder(**settings)
+    _worker_builder.shared = shared
+    _worker_builder.attach(*[array.array for array in shared], feature_names, vocabularies, classes, numeric)
+
+
+def _histogram_worker(start: int, end: int, features: np.ndarray) -> np.ndarray:
+    """Counts the histogram of a chunk of features in a worker process."""
+    return _worker_builder.feature_histogram(start, end, features)
+
+
+def _grow_worker(start: int, end: int, n_stage: int, seed: np.random.SeedSequence) -> Node:
+    """Trains a subtree in a worker process, the features are sampled with the seed of the subtree."""
+    _worker_builder.rng = np.random.default_rng(seed)
+    node = Node(n_stage, _worker_builder.target_label, _worker_builder.ig)
+    _worker_builder.grow(node, start, end)
+
+    return node
@@ -0,0 +1,162 @@
+from typing import Any, Callable, Dict, List
+from serving.metrics import ServingMetrics
+import pandas as pd
+import asyncio
+import time
+
+
+class MicroBatcher:
+    """MicroBatcher collects concurrent scoring requests into micro-batches, so a whole batch is scored
+    with one vectorized prediction instead of one prediction per request.
+
+    A batch starts with the first waiting request and is closed when it has max_batch_size requests or
+    max_wait seconds after it started. The batch is predicted in a worker thread so the event loop keeps
+    accepting requests, which wait for the next batch, and the results are handed back to the waiting requests.
+    While a batch is predicted the next one fills up, so the batches grow with the load. When the prediction
+    of a batch fails, its requests are predicted one at a time so only the requests that fail get the error.
+    """
+
+    def __init__(self, predict: Callable[[pd.DataFrame], List], max_batch_size: int = 256, max_wait: float = 0.002,
+                 metrics: ServingMetrics = None) -> None:
+        """
+        Args:
+            predict (Callable): Maps a DataFrame of samples to the list of their results
+            max_batch_size (int, optional): The maximum number of requests of a batch. Defaults to 256.
+            max_wait (float, optional): The maximum seconds a batch waits for more requests. Defaults to 0.002.
+            metrics (ServingMetrics, optional): Records the requests and batches. Defaults to None.
+        """
+        if max_batch_size < 1:
+            raise(ValueError("max_batch_size has to be at least 1"))
+
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.metrics = ServingMetrics() if metrics is None else metrics
+        self.queue = None
+        self.task = None
+
+    async def start(self) -> None:
+        """Starts collecting the batches in the running event loop."""
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stops collecting batches, the requests that are still waiting are cancelled."""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+        while self.queue is not None and not self.queue.empty():
+            _, future, _ = self.queue.get_nowait()
+            future.cancel()
+
+    async def submit(self, sample: Dict) -> Any:
+        """Waits for the result of one sample.
+
+        Args:
+            sample (dict): The feature values of the sample
+
+        Returns:
+            Any: The result of the sample
+        """
+        if self.task is None:
+            raise(TypeError("The batcher hasn't been started"))
+
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((sample, future, time.perf_counter()))
+
+        return await future
+
+    async def collect(self) -> List:
+        """
+        Returns:
+            list: The requests of the next batch, each a sample, its future and its arrival time
+        """
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # the requests that are already waiting join without a timer
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    def predict_records(self, samples: List) -> List:
+        """
+        Args:
+            samples (list): The feature values of the samples of a batch
+
+        Returns:
+            list: The result of each sample
+        """
+        return self.predict(pd.DataFrame.from_records(samples))
+
+    def predict_each(self, samples: List) -> List:
+        """Predicts the samples of a failed batch one at a time.
+
+        Args:
+            samples (list): The feature values of the samples of a batch
+
+        Returns:
+            list: The result and the exception of each sample, one of them is None
+        """
+        outcomes = []
+        for sample in samples:
+            try:
+                outcomes.append((self.predict_records([sample])[0], None))
+            except Exception as exception:
+                outcomes.append((None, exception))
+
+        return outcomes
+
+    async def run(self) -> None:
+        """Collects and predicts the batches until the batcher is stopped."""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = await self.collect()
+            # requests cancelled by their clients aren't predicted
+            batch = [request for request in batch if not request[1].done()]
+            if not batch:
+                continue
+
+            samples = [sample for sample, _, _ in batch]
+            start = time.perf_counter()
+            try:
+                try:
+                    results = await loop.run_in_executor(None, self.predict_records, samples)
+                    outcomes = [(result, None) for result in results]
+                except Exception as exception:
+                    # one bad sample fails the whole batch, so the samples are predicted on their own
+                    outcomes = [(None, exception)] if len(batch) == 1 else \
+                        await loop.run_in_executor(None, self.predict_each, samples)
+            except asyncio.CancelledError:
+                for _, future, _ in batch:
+                    future.cancel()
+                raise
+            self.metrics.record_batch(len(batch), time.perf_counter() - start)
+
+            end = time.perf_counter()
+            for (_, future, arrival), (result, error) in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+                self.metrics.record_request(end - arrival, error is not None)
@@ -0,0 +1,182 @@
+"""Load generator for the local scoring service.
+
+Opens concurrent connections to a running serving.server, each with a number of requests in flight, and
+reports the latencies seen by the clients, the throughput and the metrics of the server. Run from the
+repository root while the server is running:
+
+    $ python -m serving.load_generator model.dtree --port 8765 --connections 16 --in-flight 8 --requests 20000
+
+The samples are rows of --csv, or random samples drawn from the categories and thresholds of the model.
+"""
+from typing import Dict, List
+from models.flat_tree import FlatTree
+from serving.server import json_default
+import pandas as pd
+import numpy as np
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+
+def random_samples(model_path: str, n_samples: int, seed: int = None) -> List:
+    """Draws samples from the vocabularies of the features of a saved tree, numeric features get uniform
+    values around their thresholds.
+
+    Args:
+        model_path (str): The path to a model saved by DecisionTree.save
+        n_samples (int): The number of samples
+        seed (int, optional): The seed of the random values. Defaults to None.
+
+    Returns:
+        list: The samples as dicts of feature values
+    """
+    flat_tree, _ = FlatTree.load(model_path, mmap=False)
+    rng = np.random.default_rng(seed)
+
+    columns = {}
+    for name, vocabulary, is_numeric in zip(flat_tree.feature_names, flat_tree.vocabularies, flat_tree.numeric):
+        if is_numeric:
+            low, high = float(vocabulary.min()), float(vocabulary.max())
+            margin = max(high - low, 1.0) / 10
+            columns[name] = rng.uniform(low - margin, high + margin, n_samples)
+        else:
+            columns[name] = vocabulary[rng.integers(0, len(vocabulary), n_samples)]
+
+    return pd.DataFrame(columns).to_dict('records')
+
+
+def csv_samples(path: str, target_label: str = 'label') -> List:
+    """
+    Args:
+        path (str): The path to a CSV file of samples
+        target_label (str, optional): The label of the target data column, which is dropped. Defaults to 'label'.
+
+    Returns:
+        list: The samples as dicts of feature values, missing values are left out
+    """
+    samples = pd.read_csv(path)
+    samples = samples.drop(columns=[target_label], errors='ignore')
+
+    return [{name: value for name, value in sample.items() if not pd.isna(value)}
+            for sample in samples.to_dict('records')]
+
+
+async def client(host: str, port: int, samples: List, n_requests: int, in_flight: int, latencies: List,
+                 errors: List) -> None:
+    """Sends n_requests requests over one connection, keeping up to in_flight of them waiting.
+
+    Args:
+        host (str): The address of the server
+        port (int): The port of the server
+        samples (list): The samples that are sent in turn
+        n_requests (int): The number of requests
+        in_flight (int): The maximum number of requests waiting for their responses
+        latencies (list): The latency of each answered request is appended
+        errors (list): The error of each failed request is appended
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    sent = {}
+    slots = asyncio.Semaphore(in_flight)
+
+    async def receive() -> None:
+        for _ in range(n_requests):
+            response = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - sent.pop(response['id']))
+            if 'error' in response:
+                errors.append(response['error'])
+            slots.release()
+
+    receiver = asyncio.create_task(receive())
+    for i in range(n_requests):
+        await slots.acquire()
+        sent[i] = time.perf_counter()
+        request = {'id': i, 'sample': samples[i % len(samples)]}
+        writer.write(json.dumps(request, default=json_default).encode() + b'\n')
+        await writer.drain()
+
+    await receiver
+    writer.close()
+
+
+async def server_metrics(host: str, port: int) -> Dict:
+    """
+    Args:
+        host (str): The address of the server
+        port (int): The port of the server
+
+    Returns:
+        dict: The metrics reported by the server
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(json.dumps({'id': 'metrics', 'metrics': True}).encode() + b'\n')
+    await writer.drain()
+    response = json.loads(await reader.readline())
+    writer.close()
+
+    return response['metrics']
+
+
+async def generate_load(host: str, port: int, samples: List, n_requests: int, n_connections: int,
+                        in_flight: int) -> Dict:
+    """Runs the clients and measures the load.
+
+    Args:
+        host (str): The address of the server
+        port (int): The port of the server
+        samples (list): The samples that are sent
+        n_requests (int): The total number of requests
+        n_connections (int): The number of concurrent connections
+        in_flight (int): The maximum number of waiting requests of each connection
+
+    Returns:
+        dict: The number of requests and errors, the throughput, the client latency percentiles
+            in milliseconds and the metrics of the server
+    """
+    latencies, errors = [], []
+    counts = [n_requests // n_connections + int(i < n_requests % n_connections) for i in range(n_connections)]
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client(host, port, samples, count, in_flight, latencies, errors)
+                           for count in counts if count > 0])
+    elapsed = time.perf_counter() - start
+
+    latencies = 1000 * np.array(latencies)
+    return {'requests': len(latencies), 'errors': len(errors), 'seconds': elapsed,
+            'throughput': len(latencies) / elapsed,
+            'latency_p50_ms': float(np.percentile(latencies, 50)),
+            'latency_p90_ms': float(np.percentile(latencies, 90)),
+            'latency_p99_ms': float(np.percentile(latencies, 99)),
+            'latency_max_ms': float(latencies.max()),
+            'first_error': errors[0] if errors else None,
+            'server': await server_metrics(host, port)}
+
+
+def main(argv: List = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('model', help='the model served by the server, used for random samples')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--csv', help='send the rows of this file instead of random samples')
+    parser.add_argument('--target-label', default='label')
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--connections', type=int, default=16)
+    parser.add_argument('--in-flight', type=int, default=8, help='waiting requests of each connection')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.csv:
+        samples = csv_samples(args.csv, args.target_label)
+    else:
+        samples = random_samples(args.model, min(args.requests, 10000), args.seed)
+
+    report = asyncio.run(generate_load(args.host, args.port, samples, args.requests, args.connections,
+                                       args.in_flight))
+    print(json.dumps(report, indent=1))
+
+    return 1 if report['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+from collections import deque
+from typing import Dict
+import numpy as np
+import time
+
+# the number of recent requests whose latencies are kept for the percentiles
+LATENCY_WINDOW = 100000
+
+
+class ServingMetrics:
+    """ServingMetrics records the latency of the requests and the sizes and predict times of the batches
+    of a scoring service. The latency of a request is the time from its arrival in the batcher until its
+    result is ready, so it includes the wait for the batch and the prediction of the whole batch.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW) -> None:
+        """
+        Args:
+            window (int, optional): The number of recent latencies kept for the percentiles.
+                Defaults to LATENCY_WINDOW.
+        """
+        self.window = window
+        self.reset()
+
+    def reset(self) -> None:
+        """Clears the recorded requests and batches."""
+        self.start = time.perf_counter()
+        self.n_requests = 0
+        self.n_errors = 0
+        self.n_batches = 0
+        self.batch_rows = 0
+        self.max_batch_size = 0
+        self.predict_time = 0.0
+        self.latencies = deque(maxlen=self.window)
+
+    def record_request(self, latency: float, error: bool = False) -> None:
+        """
+        Args:
+            latency (float): The seconds from the arrival of the request until its result
+            error (bool, optional): Whether the request failed. Defaults to False.
+        """
+        self.n_requests += 1
+        self.n_errors += int(error)
+        self.latencies.append(latency)
+
+    def record_batch(self, batch_size: int, predict_time: float) -> None:
+        """
+        Args:
+            batch_size (int): The number of requests of the batch
+            predict_time (float): The seconds spent predicting the batch
+        """
+        self.n_batches += 1
+        self.batch_rows += batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.predict_time += predict_time
+
+    def report(self) -> Dict:
+        """
+        Returns:
+            dict: The numbers of requests, errors and batches, the throughput in requests per second since the
+                start, the mean and largest batch, the mean predict time of a batch and the latency percentiles
+                of the recent requests in milliseconds
+        """
+        elapsed = time.perf_counter() - self.start
+        latencies = 1000 * np.array(self.latencies)
+
+        report = {'requests': self.n_requests, 'errors': self.n_errors, 'batches': self.n_batches,
+                  'uptime': elapsed, 'throughput': self.n_requests / elapsed if elapsed > 0 else 0.0,
+                  'mean_batch_size': self.batch_rows / self.n_batches if self.n_batches else 0.0,
+                  'max_batch_size': self.max_batch_size,
+                  'mean_predict_ms': 1000 * self.predict_time / self.n_batches if self.n_batches else 0.0}
+        if len(latencies) > 0:
+            report.update({'latency_mean_ms': float(latencies.mean()),
+                           'latency_p50_ms': float(np.percentile(latencies, 50)),
+                           'latency_p90_ms': float(np.percentile(latencies, 90)),
+                           'latency_p99_ms': float(np.percentile(latencies, 99)),
+                           'latency_max_ms': float(latencies.max())})
+
+        return report
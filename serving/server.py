@@ -0,0 +1,195 @@
+"""Local scoring service for trained trees.
+
+Loads a model saved by DecisionTree.save once and scores the samples of concurrent clients in micro-batches.
+Run from the repository root:
+
+    $ python -m serving.server model.dtree --port 8765 --max-batch-size 256 --max-wait 0.002
+
+The protocol is JSON lines over TCP, one request and one response per line. A request with a sample is answered
+with its label and class probabilities, a request for the metrics with the metrics of the service:
+
+    {"id": 1, "sample": {"feature": "value", ...}}  ->  {"id": 1, "label": ..., "probabilities": [...]}
+    {"id": 2, "metrics": true}                       ->  {"id": 2, "metrics": {...}}
+
+Requests of one connection may be sent without waiting for the responses, the responses carry the id of their
+request and can arrive in a different order. Features that are missing from a sample are missing values.
+"""
+from typing import Dict, List
+from models.batch_predictor import BatchPredictor
+from models.decision_tree import DecisionTree
+from serving.batcher import MicroBatcher
+from serving.metrics import ServingMetrics
+import pandas as pd
+import numpy as np
+import argparse
+import asyncio
+import json
+import sys
+
+
+class ScoringServer:
+    """ScoringServer answers the scoring requests of TCP clients with a saved tree, see the module docstring."""
+
+    def __init__(self, model_path: str, host: str = '127.0.0.1', port: int = 8765, max_batch_size: int = 256,
+                 max_wait: float = 0.002, n_threads: int = None) -> None:
+        """
+        Args:
+            model_path (str): The path to a model saved by DecisionTree.save
+            host (str, optional): The address the server listens on. Defaults to '127.0.0.1'.
+            port (int, optional): The port the server listens on, 0 picks a free port. Defaults to 8765.
+            max_batch_size (int, optional): The maximum number of samples of a batch. Defaults to 256.
+            max_wait (float, optional): The maximum seconds a batch waits for more samples. Defaults to 0.002.
+            n_threads (int, optional): The number of threads that predict shards of a batch. Defaults to None.
+        """
+        self.tree = DecisionTree.load(model_path)
+        self.flat_tree = self.tree.compile()
+        self.predictor = BatchPredictor(self.flat_tree, n_threads=n_threads)
+        self.host = host
+        self.port = port
+        self.metrics = ServingMetrics()
+        self.batcher = MicroBatcher(self.predict, max_batch_size, max_wait, self.metrics)
+        self.server = None
+
+    def predict(self, samples: pd.DataFrame) -> List:
+        """Scores a batch with one pass through the tree.
+
+        Args:
+            samples (pd.DataFrame): The samples of the batch
+
+        Returns:
+            list: The label and the class probabilities of each sample, as JSON values
+        """
+        final_nodes = self.predictor.apply(samples.reindex(columns=self.flat_tree.feature_names))
+        labels = self.flat_tree.decode(self.flat_tree.label[final_nodes]).tolist()
+
+        if self.flat_tree.counts is None:
+            return [{'label': label} for label in labels]
+
+        probabilities = self.flat_tree.probabilities()[final_nodes].tolist()
+        return [{'label': label, 'probabilities': sample_probabilities}
+                for label, sample_probabilities in zip(labels, probabilities)]
+
+    async def respond(self, request: Dict) -> Dict:
+        """
+        Args:
+            request (dict): A decoded request
+
+        Returns:
+            dict: The response of the request
+        """
+        response = {'id': request.get('id')}
+
+        try:
+            if request.get('metrics'):
+                response['metrics'] = self.metrics.report()
+            elif isinstance(request.get('sample'), dict):
+                nested = [name for name, value in request['sample'].items() if isinstance(value, (dict, list))]
+                if nested:
+                    response['error'] = f"The feature values have to be scalars: {', '.join(map(str, nested))}"
+                else:
+                    response.update(await self.batcher.submit(request['sample']))
+            else:
+                response['error'] = "The request needs a 'sample' object or 'metrics'"
+        except Exception as exception:
+            response['error'] = f"{type(exception).__name__}: {exception}"
+
+        return response
+
+    async def answer(self, line: bytes, writer: asyncio.StreamWriter) -> None:
+        """Writes the response of a request line to its connection."""
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as exception:
+            request = f"The request isn't valid JSON: {exception}"
+
+        if isinstance(request, dict):
+            response = await self.respond(request)
+        else:
+            response = {'id': None, 'error': request if isinstance(request, str) else "The request isn't an object"}
+
+        writer.write(json.dumps(response, default=json_default).encode() + b'\n')
+        await writer.drain()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serves one connection, every request is answered by its own task so the requests of a
+        connection are batched together."""
+        tasks = set()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+
+                task = asyncio.create_task(self.answer(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def start(self) -> None:
+        """Starts the batcher and listens for connections, the chosen port is set in port."""
+        await self.batcher.start()
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Stops listening and cancels the waiting requests."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        await self.batcher.stop()
+        self.predictor.close()
+
+    async def serve(self) -> None:
+        """Serves until the task is cancelled."""
+        await self.start()
+        print(f"Serving {len(self.flat_tree.feature)} nodes on {self.host}:{self.port}", flush=True)
+
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+
+def json_default(value):
+    """Converts the NumPy values of the responses to JSON values."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+
+    raise(TypeError(f"{type(value).__name__} isn't JSON serializable"))
+
+
+def main(argv: List = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('model', help='a model saved by DecisionTree.save')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-batch-size', type=int, default=256)
+    parser.add_argument('--max-wait', type=float, default=0.002, help='seconds a batch waits for more samples')
+    parser.add_argument('--threads', type=int, default=None, help='threads that predict shards of a batch')
+    args = parser.parse_args(argv)
+
+    server = ScoringServer(args.model, args.host, args.port, args.max_batch_size, args.max_wait, args.threads)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
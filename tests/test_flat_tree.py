@@ -0,0 +1,48 @@
+from models.decision_tree import DecisionTree
+import pandas as pd
+import numpy as np
+import pytest
+
+
+def make_samples(n_samples: int, seed: int = 0) -> pd.DataFrame:
+    """Categorical, integer and numeric features with missing values in the categorical and numeric ones."""
+    rng = np.random.default_rng(seed)
+    samples = pd.DataFrame({'color': rng.choice(['red', 'green', 'blue'], n_samples).astype(object),
+                            'size': rng.integers(0, 4, n_samples),
+                            'weight': rng.normal(size=n_samples)})
+    samples['label'] = ((samples['weight'] > 0) ^ (samples['color'] == 'red')).astype(int)
+    samples.loc[rng.random(n_samples) < 0.1, 'color'] = None
+    samples.loc[rng.random(n_samples) < 0.1, 'weight'] = np.nan
+    return samples
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_save_and_load_predict_the_same(tmp_path, mmap):
+    tree = DecisionTree(max_length=5)
+    tree.train(make_samples(1000))
+    path = str(tmp_path / 'tree.model')
+    tree.save(path)
+
+    loaded = DecisionTree.load(path, mmap=mmap)
+    test_samples = make_samples(300, seed=1)
+
+    assert loaded.feature_names == tree.feature_names
+    assert np.array_equal(loaded.predict(test_samples)[0], tree.predict(test_samples)[0])
+    assert np.allclose(loaded.predict_proba(test_samples), tree.predict_proba(test_samples))
+
+
+def test_predict_one_matches_predict():
+    tree = DecisionTree(max_length=5)
+    tree.train(make_samples(1000))
+    test_samples = make_samples(200, seed=2)
+
+    labels = tree.predict(test_samples)[0]
+    records = test_samples.drop(columns='label').to_dict('records')
+    assert [tree.predict_one(record) for record in records] == list(labels)
+
+
+def test_predict_one_treats_absent_features_as_missing():
+    tree = DecisionTree(max_length=5)
+    tree.train(make_samples(1000))
+
+    assert tree.predict_one({}) == tree.predict_one({'color': None, 'size': None, 'weight': np.nan})
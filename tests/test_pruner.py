@@ -0,0 +1,76 @@
+from models.decision_tree import DecisionTree
+from models.pruner import Pruner
+from utils.node import Node
+import pandas as pd
+import numpy as np
+import pytest
+
+
+def make_node(n_stage: int, class_counts: list, children: list = (), feature: str = None) -> Node:
+    node = Node(n_stage, 'label')
+    node.class_counts = np.array(class_counts, dtype=np.int64)
+    node.label = int(np.argmax(class_counts))
+    node.main_feature = feature if children else None
+    node.child_nodes = list(children)
+    node.child_values = list(range(len(children)))
+    return node
+
+
+def single_child_tree() -> Node:
+    """A root split into a single child above a real split, and a chain of single children ending in a leaf."""
+    split = make_node(3, [6, 4], [make_node(4, [6, 0]), make_node(4, [0, 4])], 'b')
+    chain = make_node(2, [6, 4], [split], 'c')
+    leaf_chain = make_node(2, [2, 4], [make_node(3, [2, 4], [make_node(4, [2, 4])], 'c')], 'c')
+    return make_node(1, [8, 8], [chain, leaf_chain], 'a')
+
+
+def test_cost_complexity_path_collapses_single_child_chains():
+    alphas = Pruner(single_child_tree()).cost_complexity_path()
+
+    assert np.isfinite(alphas).all()
+    assert alphas[0] == 0.0
+    assert (np.diff(alphas) > 0).all()
+
+
+def test_cost_complexity_path_prunes_to_the_root():
+    root = single_child_tree()
+    alphas = Pruner(root).cost_complexity_path()
+
+    Pruner(root).cost_complexity(alphas[-1])
+    assert root.child_nodes == []
+
+
+def test_cost_complexity_rejects_non_finite_alpha():
+    with pytest.raises(ValueError):
+        Pruner(single_child_tree()).cost_complexity(np.nan)
+
+
+@pytest.mark.parametrize('array_backed', [True, False])
+def test_cost_complexity_path_with_constant_column(array_backed):
+    rng = np.random.default_rng(0)
+    samples = pd.DataFrame({'label': rng.integers(0, 2, 300), 'constant': np.zeros(300, dtype=int),
+                            'a': rng.integers(0, 3, 300), 'b': rng.integers(0, 4, 300)})
+    tree = DecisionTree(max_length=5, array_backed=array_backed)
+    tree.train(samples)
+
+    alphas = tree.cost_complexity_path()
+    assert np.isfinite(alphas).all()
+
+    n_nodes = [len(Pruner(tree.root()).nodes)]
+    for alpha in alphas[1:]:
+        tree.prune_cost_complexity(alpha)
+        n_nodes.append(len(Pruner(tree.root()).nodes))
+    assert n_nodes == sorted(n_nodes, reverse=True)
+    assert n_nodes[-1] == 1
+
+
+def test_reduced_error_keeps_useful_splits():
+    rng = np.random.default_rng(1)
+    a = rng.integers(0, 3, 600)
+    samples = pd.DataFrame({'label': (a == 0).astype(int), 'a': a, 'noise': rng.integers(0, 5, 600)})
+    tree = DecisionTree(max_length=4)
+    tree.train(samples.iloc[:400])
+
+    tree.prune_reduced_error(samples.iloc[400:])
+    assert tree.root().main_feature == 'a'
+    assert (tree.predict(samples.iloc[400:])[0] == samples.label.iloc[400:]).all()
@@ -0,0 +1,95 @@
+from models.decision_tree import DecisionTree
+from models.fold_builder import FoldTreeBuilder
+from models.tree_builder import TreeBuilder
+from utils.encoder import MISSING
+from utils.node import Node
+import models.tree_builder
+import pandas as pd
+import numpy as np
+import pytest
+
+
+def make_samples(n_samples: int, n_features: int = 6, cardinality: int = 4, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    features = rng.integers(0, cardinality, (n_samples, n_features))
+    labels = (features[:, 0] + features[:, 1] * (features[:, 2] > 1) + rng.integers(0, 2, n_samples)) % 3
+    samples = pd.DataFrame(features, columns=[f"f{i}" for i in range(n_features)])
+    samples.insert(0, 'label', labels)
+    return samples
+
+
+def signature(node: Node) -> tuple:
+    """The structure of the subtree, the labels are compared as strings since the trainers keep different types."""
+    return (node.main_feature, node.threshold, str(node.label), tuple(str(value) for value in node.child_values),
+            node.default_child, tuple(signature(child) for child in node.child_nodes))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_array_backed_and_legacy_trainers_grow_the_same_tree(seed):
+    samples = make_samples(int(np.random.default_rng(seed).integers(50, 500)), seed=seed)
+
+    array_tree = DecisionTree(max_length=6)
+    array_tree.train(samples)
+    legacy_tree = DecisionTree(max_length=6, array_backed=False)
+    legacy_tree.train(samples)
+
+    assert signature(array_tree.root()) == signature(legacy_tree.root())
+    assert np.array_equal(array_tree.predict(samples)[0], legacy_tree.predict(samples)[0])
+
+
+def test_legacy_trainer_rejects_missing_values():
+    samples = make_samples(100)
+    samples['f0'] = samples['f0'].astype(object)
+    samples.loc[::10, 'f0'] = None
+
+    with pytest.raises(ValueError, match='array_backed=True'):
+        DecisionTree(array_backed=False).train(samples)
+
+
+def test_parallel_training_matches_serial(monkeypatch):
+    # the histograms of every node are counted by the pool, not only those of large nodes
+    monkeypatch.setattr(models.tree_builder, 'PARALLEL_MIN_SAMPLES', 0)
+    samples = make_samples(3000, n_features=8, seed=1)
+
+    serial = DecisionTree(max_length=6)
+    serial.train(samples)
+    parallel = DecisionTree(max_length=6, n_jobs=2)
+    parallel.train(samples)
+
+    assert signature(parallel.root()) == signature(serial.root())
+
+
+def test_parallel_training_with_random_features_is_deterministic():
+    samples = make_samples(3000, n_features=8, seed=2)
+
+    signatures = []
+    for _ in range(2):
+        tree = DecisionTree(max_length=6, n_jobs=2, max_features='sqrt', random_state=7)
+        tree.train(samples)
+        signatures.append(signature(tree.root()))
+
+    assert signatures[0] == signatures[1]
+
+
+@pytest.mark.parametrize('params', [{}, {'min_samples_leaf': 5}, {'criterion': 'gini', 'max_categories': 3}])
+def test_fold_builder_matches_separate_fold_trees(params):
+    rng = np.random.default_rng(3)
+    samples = make_samples(2000, seed=3)
+    samples['num'] = rng.normal(size=len(samples)) + samples['label']
+    samples.loc[rng.random(len(samples)) < 0.1, 'num'] = np.nan
+    n_folds = 4
+
+    codes, labels, feature_names, vocabularies, classes, numeric = DecisionTree(max_length=6).encode_arrays(samples)
+    fold_ids = rng.integers(0, n_folds, len(labels))
+    roots = FoldTreeBuilder(6, **params).build_folds(codes, labels, fold_ids, n_folds, feature_names, vocabularies,
+                                                     classes, numeric)
+
+    for fold in range(n_folds):
+        train_rows = np.flatnonzero(fold_ids != fold)
+        builder = TreeBuilder(6, **params)
+        builder.attach(np.ascontiguousarray(codes), labels.astype(np.intp), train_rows, feature_names, vocabularies,
+                       classes, numeric, bool((codes == MISSING).any()))
+        root = Node(1, 'label', builder.ig)
+        builder.grow(root, 0, len(train_rows))
+
+        assert signature(roots[fold]) == signature(root)
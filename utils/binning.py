@@ -0,0 +1,63 @@
+from typing import List
+import pandas as pd
+import numpy as np
+
+
+class Binner:
+    """Binner quantizes numeric columns into at most max_bins quantile bins.
+
+    Bin b of a column holds the values in (edges[b - 1], edges[b]], so a binary split on the bins
+    "bin <= b" is the same as the threshold split "value <= edges[b]".
+    """
+
+    def __init__(self, max_bins: int = 255) -> None:
+        """
+        Args:
+            max_bins (int, optional): The maximum number of bins of each column. Defaults to 255.
+        """
+        self.max_bins = max_bins
+        self.edges = {}
+
+    def fit(self, samples: pd.DataFrame, columns: List) -> "Binner":
+        """Finds the bin edges of each column at the quantiles of its samples. Columns with at most
+        max_bins distinct values get one bin per value.
+
+        Args:
+            samples (pd.DataFrame): Data samples
+            columns (list): The names of the numeric columns
+
+        Returns:
+            Binner: The fitted binner
+        """
+        for column in columns:
+            values = samples[column].to_numpy(dtype=np.float64)
+            values = values[~np.isnan(values)]
+            distinct = np.unique(values)
+
+            if len(distinct) <= self.max_bins:
+                self.edges[column] = distinct[:-1]
+            else:
+                # the quantiles of the samples, so frequent values get narrow bins, repeated edges are merged
+                quantiles = np.linspace(0, 1, self.max_bins + 1)[1:-1]
+                self.edges[column] = np.unique(np.quantile(values, quantiles))
+
+        return self
+
+    def transform_column(self, column: str, values: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            column (str): The name of the column
+            values (np.ndarray): The values of the column
+
+        Returns:
+            np.ndarray: The bin of each value, uint8 when there are at most 256 bins
+        """
+        dtype = np.uint8 if self.max_bins <= 256 else np.uint16
+        return np.searchsorted(self.edges[column], values, side='left').astype(dtype)
+
+    def n_bins(self, column: str) -> int:
+        """
+        Returns:
+            int: The number of bins of the column
+        """
+        return len(self.edges[column]) + 1
@@ -0,0 +1,224 @@
+from typing import Any, Tuple
+from scipy.stats import chi2
+import numpy as np
+
+
+class Criterion:
+    """Criterion scores the candidate splits of a node from its (feature value x class) count tables.
+    Higher scores are better splits. The kernels work on whole count arrays, so all the features
+    and all the thresholds of a node are scored in a few vectorized steps.
+
+    Impurity criteria only define impurity(), the score of a split is the decrease of the impurity.
+    """
+
+    name = None
+
+    def impurity(self, counts: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            counts (np.ndarray): Class counts, the last axis is the class axis
+
+        Returns:
+            np.ndarray: The impurity of every count vector, empty vectors have an impurity of zero
+        """
+        raise(NotImplementedError(f"{type(self).__name__} doesn't define an impurity"))
+
+    def probabilities(self, counts: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            counts (np.ndarray): Class counts, the last axis is the class axis
+
+        Returns:
+            np.ndarray: The class probabilities of every count vector
+        """
+        totals = counts.sum(axis=-1, keepdims=True)
+        return np.divide(counts, totals, out=np.zeros(counts.shape), where=totals > 0)
+
+    def split_scores(self, tables: np.ndarray) -> np.ndarray:
+        """Scores the multiway split of every feature, with one child for each value.
+
+        Args:
+            tables (np.ndarray): Count tables with the shape (n_features, n_values, n_classes)
+
+        Returns:
+            np.ndarray: The score of each feature
+        """
+        value_counts = tables.sum(axis=2)
+        n_samples = value_counts.sum(axis=1, keepdims=True)
+        p_value = np.divide(value_counts, n_samples, out=np.zeros(value_counts.shape), where=n_samples > 0)
+
+        total_impurity = self.impurity(tables.sum(axis=1))
+        class_impurity = np.sum(p_value * self.impurity(tables), axis=1)
+
+        return total_impurity - class_impurity
+
+    def binary_scores(self, total: np.ndarray, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        """Scores binary splits from the class counts of both sides.
+
+        Args:
+            total (np.ndarray): Class counts of the node with the shape (n_features, 1, n_classes)
+            left (np.ndarray): Class counts of the left side of each split with the shape (n_features, n_splits, n_classes)
+            right (np.ndarray): Class counts of the right side of each split
+
+        Returns:
+            np.ndarray: The score of each split with the shape (n_features, n_splits)
+        """
+        n_left = left.sum(axis=2)
+        n_right = right.sum(axis=2)
+        n_samples = np.maximum(n_left + n_right, 1)
+
+        class_impurity = (n_left * self.impurity(left) + n_right * self.impurity(right)) / n_samples
+
+        return self.impurity(total) - class_impurity
+
+    def threshold_scores(self, tables: np.ndarray, min_samples_leaf: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Scores the binary splits "code <= t" of ordered features for every threshold t
+        from cumulative class histograms.
+
+        Args:
+            tables (np.ndarray): Count tables with the shape (n_features, n_values, n_classes)
+            min_samples_leaf (int, optional): The minimum number of samples on each side of a valid split. Defaults to 1.
+
+        Returns:
+            Tuple: The best score of each feature and the threshold code that gives it,
+                features without a valid split have a score of -inf
+        """
+        n_features, n_values, _ = tables.shape
+        if n_values < 2:
+            return np.full(n_features, -np.inf), np.zeros(n_features, dtype=np.intp)
+
+        total = tables.sum(axis=1, keepdims=True)
+        left = np.cumsum(tables, axis=1)[:, :-1]
+        right = total - left
+
+        scores = self.binary_scores(total, left, right)
+        scores[(left.sum(axis=2) < min_samples_leaf) | (right.sum(axis=2) < min_samples_leaf)] = -np.inf
+
+        thresholds = np.argmax(scores, axis=1)
+        return scores[np.arange(n_features), thresholds], thresholds
+
+
+class Entropy(Criterion):
+    """Shannon entropy, the score is the information gain of ID3."""
+
+    name = 'entropy'
+
+    def impurity(self, counts: np.ndarray) -> np.ndarray:
+        p_class = self.probabilities(counts)
+        log_p = np.log2(p_class, out=np.zeros(counts.shape), where=p_class > 0)
+
+        return -np.sum(p_class * log_p, axis=-1)
+
+
+class Gini(Criterion):
+    """Gini impurity 1 - sum(p^2) of CART, it doesn't need a logarithm.
+
+    The weighted impurity of the children is 1 - sum_i(sum_c(n_ic^2) / n_i) / n, so the scores are computed
+    from the sums of the squared counts without building the probabilities of every child.
+    """
+
+    name = 'gini'
+
+    def impurity(self, counts: np.ndarray) -> np.ndarray:
+        p_class = self.probabilities(counts)
+
+        return 1.0 - np.sum(p_class * p_class, axis=-1)
+
+    def purity(self, counts: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            counts (np.ndarray): Class counts, the last axis is the class axis
+
+        Returns:
+            np.ndarray: sum(n_c^2) / n of every count vector, zero for empty vectors
+        """
+        n_samples = counts.sum(axis=-1)
+        squares = np.einsum('...c,...c->...', counts, counts)
+
+        return np.divide(squares, n_samples, out=np.zeros(n_samples.shape), where=n_samples > 0)
+
+    def split_scores(self, tables: np.ndarray) -> np.ndarray:
+        total = tables.sum(axis=1)
+        n_samples = np.maximum(total.sum(axis=1), 1)
+
+        return (self.purity(tables).sum(axis=1) - self.purity(total)) / n_samples
+
+    def binary_scores(self, total: np.ndarray, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        n_samples = np.maximum(total.sum(axis=2), 1)
+
+        return (self.purity(left) + self.purity(right) - self.purity(total)) / n_samples
+
+
+class GainRatio(Entropy):
+    """Information gain divided by the entropy of the split itself, the split information of C4.5.
+    It penalises the many small children of high-cardinality features."""
+
+    name = 'gain_ratio'
+
+    def split_scores(self, tables: np.ndarray) -> np.ndarray:
+        gains = super().split_scores(tables)
+        split_information = self.impurity(tables.sum(axis=2))
+
+        return np.divide(gains, split_information, out=np.zeros(gains.shape), where=split_information > 0)
+
+    def binary_scores(self, total: np.ndarray, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        gains = super().binary_scores(total, left, right)
+        split_information = self.impurity(np.stack((left.sum(axis=2), right.sum(axis=2)), axis=-1))
+
+        return np.divide(gains, split_information, out=np.zeros(gains.shape), where=split_information > 0)
+
+
+class ChiSquare(Criterion):
+    """Pearson's chi-square test of independence between the children and the classes, as in CHAID.
+    The score is -log of the p-value, so splits with different degrees of freedom are comparable."""
+
+    name = 'chi_square'
+
+    def chi_square(self, tables: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            tables (np.ndarray): Contingency tables, the last two axes are the child and the class axes
+
+        Returns:
+            np.ndarray: -log of the p-value of the chi-square statistic of each table
+        """
+        child_counts = tables.sum(axis=-1, keepdims=True)
+        class_counts = tables.sum(axis=-2, keepdims=True)
+        n_samples = child_counts.sum(axis=-2, keepdims=True)
+
+        expected = np.divide(child_counts * class_counts, n_samples, out=np.zeros(tables.shape), where=n_samples > 0)
+        statistic = np.sum(np.divide((tables - expected) ** 2, expected, out=np.zeros(tables.shape),
+                                     where=expected > 0), axis=(-2, -1))
+
+        # empty children and classes don't add degrees of freedom
+        dof = ((np.count_nonzero(child_counts, axis=(-2, -1)) - 1) *
+               (np.count_nonzero(class_counts, axis=(-2, -1)) - 1))
+
+        return np.where(dof > 0, -chi2.logsf(statistic, np.maximum(dof, 1)), 0.0)
+
+    def split_scores(self, tables: np.ndarray) -> np.ndarray:
+        return self.chi_square(tables)
+
+    def binary_scores(self, total: np.ndarray, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        return self.chi_square(np.stack((left, right), axis=-2))
+
+
+CRITERIA = {criterion.name: criterion for criterion in (Entropy, Gini, GainRatio, ChiSquare)}
+
+
+def get_criterion(criterion: Any = None) -> Criterion:
+    """
+    Args:
+        criterion (Any, optional): A Criterion, or the name of one of CRITERIA. Defaults to None which is entropy.
+
+    Returns:
+        Criterion: The criterion
+    """
+    if criterion is None:
+        return Entropy()
+    if isinstance(criterion, Criterion):
+        return criterion
+    if criterion not in CRITERIA:
+        raise(ValueError(f"Unknown criterion {criterion!r}, expected one of {sorted(CRITERIA)}"))
+
+    return CRITERIA[criterion]()
@@ -0,0 +1,117 @@
+from typing import Any, Dict, List
+import pandas as pd
+import numpy as np
+
+# reserved codes of missing values and of categories that aren't in the vocabulary
+MISSING = -1
+UNSEEN = -2
+
+
+def missing_mask(values: np.ndarray, missing_code: int = None) -> np.ndarray:
+    """Finds the missing values of a column, NaN and None. Raw integers are values like any other,
+    only integer columns that are already encoded, e.g. by the DataLoader, mark missing values with missing_code.
+
+    Args:
+        values (np.ndarray): The values of a column
+        missing_code (int, optional): The code of missing values in encoded integer columns, MISSING for the
+            DataLoader. Defaults to None.
+
+    Returns:
+        np.ndarray: Whether each value is missing
+    """
+    if np.issubdtype(values.dtype, np.integer):
+        if missing_code is None:
+            return np.zeros(values.shape, dtype=bool)
+        return values == missing_code
+
+    return pd.isna(values)
+
+
+def is_missing(value: Any, missing_code: int = None) -> bool:
+    """
+    Args:
+        value (Any): A single value
+        missing_code (int, optional): The code of missing values in encoded integer columns. Defaults to None.
+
+    Returns:
+        bool: Whether the value is missing, see missing_mask
+    """
+    if isinstance(value, (int, np.integer)):
+        return missing_code is not None and value == missing_code
+
+    return value is None or value != value
+
+
+class Encoder:
+    """Encoder maps the categories of data columns to contiguous integer codes.
+
+    The codes of each column are the positions of its values in the sorted vocabulary of the column,
+    so the order of the codes is the same as the order of sorted categories used by the nodes.
+    Missing values are encoded as MISSING and values that aren't in the vocabulary as UNSEEN.
+    """
+
+    def __init__(self, vocabularies: Dict = None, missing_code: int = None) -> None:
+        """
+        Args:
+            vocabularies (dict, optional): Already known vocabularies of the columns. Defaults to None.
+            missing_code (int, optional): The code of missing values in integer columns that are already encoded,
+                see missing_mask. Defaults to None.
+        """
+        self.vocabularies = dict(vocabularies) if vocabularies else {}
+        self.missing_code = missing_code
+
+    def fit(self, samples: pd.DataFrame, columns: List) -> "Encoder":
+        """Learns the sorted vocabulary of each column.
+
+        Args:
+            samples (pd.DataFrame): Data samples
+            columns (list): The names of the encoded columns
+
+        Returns:
+            Encoder: The fitted encoder
+        """
+        for column in columns:
+            values = samples[column].to_numpy()
+            self.vocabularies[column] = np.unique(values[~missing_mask(values, self.missing_code)])
+
+        return self
+
+    def encode_column(self, column: str, values: np.ndarray) -> np.ndarray:
+        """Encodes the values of one column.
+
+        Args:
+            column (str): The name of the column
+            values (np.ndarray): The values of the column
+
+        Returns:
+            np.ndarray: The integer codes of the values
+        """
+        codes = pd.Index(self.vocabularies[column]).get_indexer(values).astype(np.int32)
+        codes[codes < 0] = UNSEEN
+        codes[missing_mask(values, self.missing_code)] = MISSING
+
+        return codes
+
+    def transform(self, samples: pd.DataFrame, columns: List) -> np.ndarray:
+        """Encodes the given columns into one contiguous integer matrix.
+
+        Args:
+            samples (pd.DataFrame): Data samples
+            columns (list): The names of the encoded columns
+
+        Returns:
+            np.ndarray: The codes with the shape (n_columns, n_samples), each column is contiguous
+        """
+        codes = np.empty((len(columns), len(samples)), dtype=np.int32)
+
+        for i, column in enumerate(columns):
+            codes[i] = self.encode_column(column, samples[column].to_numpy())
+
+        return codes
+
+    def n_values(self, column: str) -> int:
+        """
+        Returns:
+            int: The number of categories of the column
+        """
+        return len(self.vocabularies[column])
@@ -1,4 +1,5 @@
-from typing import List
+from typing import Any, List, Tuple
+from utils.criteria import Entropy, get_criterion
 import pandas as pd
 import numpy as np
 
@@ -8,13 +9,17 @@ class InformationGain:
 
     """
 
-    def __init__(self, target_label: str = 'label') -> None:
+    def __init__(self, target_label: str = 'label', criterion: Any = None) -> None:
         """For initializing this class you can pass the label of the target data column.
 
         Args:
             target_label (str, optional): target data column label. Defaults to 'label'.
+            criterion (Any, optional): The Criterion or the name of the criterion that scores the splits
+                of the count tables, see utils.criteria. Defaults to None which is entropy.
         """
         self.target_label = target_label
+        self.criterion = get_criterion(criterion)
+        self.entropy_criterion = Entropy()
 
     def split(self, samples: pd.DataFrame, condition: str) -> List:
         """This method splits the given data samples with respect to the categories of the condition making feature.
@@ -37,17 +42,19 @@ class InformationGain:
 
         return split_df
 
-    def calculate_prob(self, samples: pd.DataFrame, feature_name: str) -> np.array:
+    def calculate_prob(self, samples: pd.DataFrame, feature_name: str, split_samples: List = None) -> np.array:
         """Calculates the probabilty of each category in the chosen feature samples.
 
         Args:
             samples (pd.DataFrame): Data samples
             feature_name (str): The name of the feature and the labels of the column representing the feature in samples.
+            split_samples (list, optional): The samples already split by the feature. Defaults to None.
 
         Returns:
             np.array: List of the probabilities of each category in the feature
         """
-        split_samples = self.split(samples, feature_name)
+        if split_samples is None:
+            split_samples = self.split(samples, feature_name)
 
         n_samples = len(samples)
         n_class = len(split_samples)
@@ -86,27 +93,148 @@ class InformationGain:
             np.float64: Conditional entropy of the samples with the feature as prior
         """
         split_samples = self.split(samples, feature_name)
-        p_class = self.calculate_prob(samples, feature_name)
+        p_class = self.calculate_prob(samples, feature_name, split_samples)
         entropies = np.array([self.entropy(x) for x in split_samples])
 
         conditional_entropy = np.sum(p_class * entropies)
 
         return conditional_entropy
 
-    def information_gain(self, samples: pd.DataFrame, feature_name: str,) -> np.float64:
+    def information_gain(self, samples: pd.DataFrame, feature_name: str, total_entropy: np.float64 = None) -> np.float64:
         """This method calculate the information gain of a feature with respect too the parent node.
 
         Args:
             samples (pd.DataFrame): Data samples
             feature_name (str): The name of the feature and the label of the column
+            total_entropy (np.float64, optional): The entropy of the samples if it is already known,
+                so it isn't recomputed for every feature. Defaults to None.
 
         Returns:
             np.float64: The information gain of the feature
         """
-        total_entropy = self.entropy(samples)
+        if total_entropy is None:
+            total_entropy = self.entropy(samples)
 
         class_entropy = self.conditional_entropy(samples, feature_name)
 
         information_gain = total_entropy - class_entropy
 
         return information_gain
+
+    def _encode(self, values: np.ndarray) -> Tuple[np.ndarray, int]:
+        """Maps the values of a column to contiguous integer codes.
+
+        Non-negative integer columns whose largest value is smaller than the number of rows (the output of the
+        DataLoader) are used as they are, any other column is coded by the position of its values in the sorted
+        unique values, so a few large integers don't make a table with a row for every integer up to them.
+
+        Args:
+            values (np.ndarray): The values of a data column
+
+        Returns:
+            Tuple: The integer codes and the number of possible codes
+        """
+        if (np.issubdtype(values.dtype, np.integer) and len(values) > 0 and values.min() >= 0 and
+                values.max() < len(values)):
+            return values.astype(np.intp, copy=False), int(values.max()) + 1
+
+        uniques, codes = np.unique(values, return_inverse=True)
+        return codes.astype(np.intp, copy=False), len(uniques)
+
+    def count_tables(self, codes: List, labels: np.ndarray, n_classes: int, n_values: int = None) -> np.ndarray:
+        """Builds the (feature value x class) count matrix of every feature.
+
+        Args:
+            codes (list of np.ndarray): Integer coded feature columns
+            labels (np.ndarray): Integer coded target column
+            n_classes (int): The number of target classes
+            n_values (int, optional): The number of possible codes. Defaults to the largest code plus one.
+
+        Returns:
+            np.ndarray: Count tables with the shape (n_features, n_values, n_classes)
+        """
+        if n_values is None:
+            n_values = max([int(c.max()) + 1 if len(c) > 0 else 1 for c in codes])
+        tables = np.zeros((len(codes), n_values, n_classes), dtype=np.int64)
+
+        for i, feature_codes in enumerate(codes):
+            tables[i] = np.bincount(np.multiply(feature_codes, n_classes, dtype=np.intp) + labels,
+                                    minlength=n_values * n_classes).reshape(n_values, n_classes)
+
+        return tables
+
+    def information_gains_from_codes(self, encoded: List, labels: np.ndarray, n_classes: int) -> np.ndarray:
+        """Calculates the information gain of features with different numbers of codes. The features are
+        grouped by their number of codes, so the count table of each feature is sized by its own codes.
+
+        Args:
+            encoded (list): The integer coded column and the number of possible codes of each feature, see _encode
+            labels (np.ndarray): Integer coded target column
+            n_classes (int): The number of target classes
+
+        Returns:
+            np.ndarray: The information gain of each feature
+        """
+        n_codes = np.array([n_values for _, n_values in encoded], dtype=np.intp)
+        gains = np.empty(len(encoded))
+
+        for n_values in np.unique(n_codes):
+            group = np.flatnonzero(n_codes == n_values)
+            tables = self.count_tables([encoded[i][0] for i in group], labels, n_classes, int(n_values))
+            gains[group] = self.information_gains_from_counts(tables)
+
+        return gains
+
+    def entropy_from_counts(self, counts: np.ndarray) -> np.ndarray:
+        """Calculates the entropy of class count vectors along the last axis.
+
+        Args:
+            counts (np.ndarray): Class counts, the last axis is the class axis
+
+        Returns:
+            np.ndarray: The entropy of every count vector, empty vectors have an entropy of zero
+        """
+        return self.entropy_criterion.impurity(counts)
+
+    def information_gains_from_counts(self, tables: np.ndarray) -> np.ndarray:
+        """Calculates the information gain, or the score of the criterion, of every feature
+        from its count table in one vectorized step.
+
+        Args:
+            tables (np.ndarray): Count tables with the shape (n_features, n_values, n_classes)
+
+        Returns:
+            np.ndarray: The information gain of each feature
+        """
+        return self.criterion.split_scores(tables)
+
+    def threshold_gains_from_counts(self, tables: np.ndarray, min_samples_leaf: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Calculates the information gain, or the score of the criterion, of the binary splits "code <= t"
+        of ordered features for every threshold t from cumulative class histograms.
+
+        Args:
+            tables (np.ndarray): Count tables with the shape (n_features, n_values, n_classes)
+            min_samples_leaf (int, optional): The minimum number of samples on each side. Defaults to 1.
+
+        Returns:
+            Tuple: The best information gain of each feature and the threshold code that gives it,
+                features without a valid split have a gain of -inf
+        """
+        return self.criterion.threshold_scores(tables, min_samples_leaf)
+
+    def information_gains(self, samples: pd.DataFrame, feature_names: List) -> np.ndarray:
+        """Calculates the information gain of all the given features with a single pass over each column.
+
+        The parent entropy is computed once and the result is equal to calling information_gain for each feature.
+
+        Args:
+            samples (pd.DataFrame): Data samples
+            feature_names (list): The names of the features
+
+        Returns:
+            np.ndarray: The information gain of each feature
+        """
+        labels, n_classes = self._encode(samples[self.target_label].to_numpy())
+        encoded = [self._encode(samples[feature].to_numpy()) for feature in feature_names]
+
+        return self.information_gains_from_codes(encoded, labels, n_classes)
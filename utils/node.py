@@ -1,8 +1,53 @@
-from typing import Any, List, Tuple
+from typing import Any, List
+from utils.encoder import is_missing
 from utils.information_gain import InformationGain
+from utils.node_stats import NodeStats
+from utils.profiler import NULL_PROFILER, Profiler
 import pandas as pd
 import numpy as np
-from scipy.stats import mode
+
+
+def n_candidate_features(max_features: Any, n_features: int) -> int:
+    """Resolves the number of features considered for the split of a node.
+
+    Args:
+        max_features (Any): None for all the features, an int, a float portion of the features, 'sqrt' or 'log2'
+        n_features (int): The number of features
+
+    Returns:
+        int: The number of candidate features
+    """
+    if max_features is None:
+        return n_features
+    if max_features == 'sqrt':
+        return max(1, int(np.sqrt(n_features)))
+    if max_features == 'log2':
+        return max(1, int(np.log2(n_features)))
+    if isinstance(max_features, float):
+        return max(1, int(max_features * n_features))
+
+    return min(n_features, int(max_features))
+
+
+def shared_counts(class_counts: np.ndarray, shared: dict) -> np.ndarray:
+    """Nodes with equal class counts share one read-only array, most of the nodes are small leaves
+    with the same few counts, so the tree doesn't keep an array for every node.
+
+    Args:
+        class_counts (np.ndarray): The class counts of a node
+        shared (dict): The shared arrays of the tree by the bytes of the counts
+
+    Returns:
+        np.ndarray: A read-only array equal to the class counts
+    """
+    key = class_counts.tobytes()
+    counts = shared.get(key)
+    if counts is None:
+        counts = np.array(class_counts, dtype=np.int64)
+        counts.flags.writeable = False
+        shared[key] = counts
+
+    return counts
 
 
 class Node():
@@ -10,67 +55,112 @@ class Node():
     It stores the value for the main feature, which is the the decision making 
     condition of the node. Also, it stores the stage of the node so we can check 
     the node position in the tree and to enable us to limit the length of the tree.
+
+    Nodes use __slots__ instead of a __dict__ and share one InformationGain, so deep trees stay compact.
+    Trained nodes keep the class counts of their training samples, which the post-pruning uses.
+    Samples with a missing value of the main feature go to the default child, if the node has learned one.
     """
 
-    def __init__(self, n_stage: int, target_label: str = 'label'):
+    __slots__ = ('ig', 'target_label', 'main_feature', 'threshold', 'child_nodes', 'child_values',
+                 'child_map', 'label', 'n_stage', 'class_counts', 'default_child')
+
+    # InformationGain instances shared by the nodes of each target label
+    shared_ig = {}
+
+    def __init__(self, n_stage: int, target_label: str = 'label', ig: InformationGain = None):
         """This class needs the stage of the node and the label of the target data in the
         data samples' pandas DataFrame.
 
         Args:
             n_stage (int): The stage number 
             target_label (str, optional): The label of the target column of data
+            ig (InformationGain, optional): The InformationGain used by the node. Defaults to
+                the instance shared by all the nodes with the same target label.
         """
-        self.ig = InformationGain(target_label)
+        if ig is None:
+            if target_label not in Node.shared_ig:
+                Node.shared_ig[target_label] = InformationGain(target_label)
+            ig = Node.shared_ig[target_label]
+
+        self.ig = ig
         self.target_label = target_label
         self.main_feature = None
+        self.threshold = None
         self.child_nodes = []
+        self.child_values = []
+        self.child_map = None
         self.label = None
         self.n_stage = n_stage
+        self.class_counts = None
+        self.default_child = None
 
     # Train methods
 
-    def set_condition(self, samples: pd.DataFrame) -> None:
+    def set_condition(self, samples: pd.DataFrame, max_features: Any = None,
+                      rng: np.random.Generator = None, stats: NodeStats = None) -> None:
         """This method is used for training process to determine the most informative feature.
+        The node isn't split when the feature has a single value in the samples.
 
         Args:
             samples (pd.DataFrame): Data samples
+            max_features (Any, optional): The number of randomly chosen candidate features,
+                see n_candidate_features. Defaults to None which uses all the features.
+            rng (np.random.Generator, optional): The generator used for choosing the features. Defaults to None.
+            stats (NodeStats, optional): The cached statistics of the samples. Defaults to None.
         """
         target_idx = samples.columns.get_loc(self.target_label)
         feature_cols = samples.columns.delete(target_idx)
 
-        feature_igs = []
+        n_candidates = n_candidate_features(max_features, len(feature_cols))
+        if n_candidates < len(feature_cols):
+            rng = rng if rng is not None else np.random.default_rng()
+            feature_cols = feature_cols[np.sort(rng.choice(len(feature_cols), n_candidates, replace=False))]
 
-        for feature in feature_cols:
-            feature_igs.append(self.ig.information_gain(samples, feature))
+        if stats is not None:
+            feature_igs = stats.information_gains(feature_cols)
+        else:
+            feature_igs = self.ig.information_gains(samples, feature_cols)
 
-        feature_igs = np.array(feature_igs)
+        feature = feature_cols[np.argmax(feature_igs)]
 
-        self.main_feature = feature_cols[np.argmax(feature_igs)]
+        # a feature with a single value in the node would only make a single child, so the node stays a leaf
+        values = stats.feature_codes(feature)[0] if stats is not None else samples[feature].to_numpy()
+        if len(pd.unique(values)) > 1:
+            self.main_feature = feature
 
-    def calculate_loss(self, samples: pd.DataFrame) -> np.float64:
+    def calculate_loss(self, samples: pd.DataFrame, stats: NodeStats = None) -> np.float64:
         """Calculates the entropy of the input samples
 
         Args:
             samples (pd.DataFrame): Input data samples
+            stats (NodeStats, optional): The cached statistics of the samples. Defaults to None.
 
         Returns:
             np.float64: batch entropy
         """
+        if stats is not None:
+            return stats.entropy()
+
         return self.ig.entropy(samples)
 
-    def create_nodes(self, samples: pd.DataFrame) -> zip:
+    def create_nodes(self, samples: pd.DataFrame, stats: NodeStats = None) -> zip:
         """This method creates the child resulted by training the parent node.
 
         Args:
             samples (pd.DataFrame): Input data samples
+            stats (NodeStats, optional): The cached statistics of the samples. Defaults to None.
 
         Returns:
             A zip of data and corresponding child node
         """
-        split_data = self.ig.split(samples, self.main_feature)
+        if stats is not None:
+            split_data = stats.partition(self.main_feature)
+        else:
+            split_data = self.ig.split(samples, self.main_feature)
 
-        for _ in range(len(split_data)):
-            self.child_nodes.append(Node(self.n_stage+1, self.target_label))
+        for split in split_data:
+            self.child_nodes.append(Node(self.n_stage+1, self.target_label, self.ig))
+            self.child_values.append(split[self.main_feature].iloc[0])
 
         if len(split_data) == len(self.child_nodes):
             return zip(self.child_nodes, split_data)
@@ -78,18 +168,22 @@ class Node():
             raise(IndexError(
                 "The number of the nodes and the data partitions aren't equal"))
 
-    def set_label(self, samples) -> None:
-        """Sets the value of the label of the node. Should be called if training of the node is done
+    def set_label(self, samples, stats: NodeStats = None) -> None:
+        """Sets the value of the label of the node to the most frequent class of the samples, from their class counts.
+        Should be called if training of the node is done
 
         Args:
-            label (Any): The label that is applied to the node data samples
+            samples (pd.DataFrame): Data samples
+            stats (NodeStats, optional): The cached statistics of the samples. Defaults to None.
         """
-        data_labels = samples[self.target_label]
+        if stats is None:
+            stats = NodeStats(samples, self.ig)
 
-        self.label = mode(data_labels, axis=None)[0].item()
+        self.label = stats.majority_label()
 
     def split(self, samples: pd.DataFrame, condition: str) -> List:
         """This method splits the given data samples with respect to the categories of the condition making feature.
+        Nodes with a threshold split the samples into the values below or equal to the threshold and the values above it.
 
         Args:
             samples (pd.DataFrame): Data samples that are passed to the node.
@@ -98,6 +192,10 @@ class Node():
         Returns:
             list of pd.DataFrame: The list of split samples based on the condition feature.
         """
+        if self.threshold is not None:
+            mask = samples[condition] <= self.threshold
+            return [samples[mask], samples[~mask]]
+
         split_df = []
 
         unique_vlues = list(set(samples[condition]))
@@ -109,20 +207,26 @@ class Node():
 
         return split_df
 
-    def train_node(self, samples: pd.DataFrame) -> Any:
+    def train_node(self, samples: pd.DataFrame, profiler: Profiler = NULL_PROFILER, stats: NodeStats = None) -> Any:
         """This method handles training each node by either creating child nodes or
-        labeling the node as a final node or Leaf.
+        labeling the node as a final node or Leaf. Internal nodes are labeled too, their label
+        is used for samples with categories that weren't seen in training.
 
         Args:
             samples (pd.DataFrame): Data samples
+            profiler (Profiler, optional): Times the labeling and the split. Defaults to NULL_PROFILER.
+            stats (NodeStats, optional): The cached statistics of the samples. Defaults to None.
 
         Returns:
             Any: Either a zip of child nodes and data splits or None
         """
+        with profiler.phase('label'):
+            self.set_label(samples, stats)
+
         if self.main_feature:
-            return self.create_nodes(samples)
+            with profiler.phase('split'):
+                return self.create_nodes(samples, stats)
         else:
-            self.set_label(samples)
             return None
 
     def predict_node(self, samples: pd.DataFrame) -> Any:
@@ -139,6 +243,28 @@ class Node():
         elif self.label:
             return None
 
+    def route(self, value: Any, missing_code: int = None) -> Any:
+        """Finds the child node of a single sample value with a dict lookup.
+
+        Args:
+            value (Any): The value of the main feature of the sample
+            missing_code (int, optional): The code of missing values in encoded integer columns. Defaults to None.
+
+        Returns:
+            Any: The child node or None if the value wasn't seen in training
+        """
+        # numeric values are compared with the threshold, only NaN and None are missing like in FlatTree.encode
+        if is_missing(value, None if self.threshold is not None else missing_code):
+            return None if self.default_child is None else self.child_nodes[self.default_child]
+
+        if self.threshold is not None:
+            return self.child_nodes[int(value > self.threshold)]
+
+        if self.child_map is None:
+            self.child_map = dict(zip(self.child_values, self.child_nodes))
+
+        return self.child_map.get(value)
+
     def __repr__(self) -> str:
         """Deifining the representation of the data.
 
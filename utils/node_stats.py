@@ -0,0 +1,119 @@
+from typing import Any, List, Tuple
+from utils.information_gain import InformationGain
+import pandas as pd
+import numpy as np
+
+
+class NodeStats:
+    """NodeStats caches the statistics of the samples of one node while the node is trained, so the class counts,
+    the entropy, the encoded columns and the partition of the split feature are each computed once and shared by
+    Node.calculate_loss, Node.set_condition, Node.create_nodes and Node.set_label.
+
+    The statistics are computed lazily on first use. The trainer creates the stats when the node is taken
+    from the training stack and clears them once the node is trained, so only the samples of open nodes are kept.
+    """
+
+    def __init__(self, samples: pd.DataFrame, ig: InformationGain) -> None:
+        """
+        Args:
+            samples (pd.DataFrame): The samples of the node
+            ig (InformationGain): The InformationGain of the node
+        """
+        self.samples = samples
+        self.ig = ig
+        self.cache = {}
+
+    def class_counts(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            Tuple: The sorted classes of the samples and the number of samples of each class
+        """
+        if 'class_counts' not in self.cache:
+            self.cache['class_counts'] = np.unique(self.samples[self.ig.target_label].to_numpy(),
+                                                   return_counts=True)
+
+        return self.cache['class_counts']
+
+    def entropy(self) -> np.float64:
+        """
+        Returns:
+            np.float64: The entropy of the samples, equal to InformationGain.entropy
+        """
+        if 'entropy' not in self.cache:
+            counts = self.class_counts()[1]
+            p_class = counts / len(self.samples)
+            self.cache['entropy'] = -np.sum(p_class * np.log2(p_class))
+
+        return self.cache['entropy']
+
+    def majority_label(self) -> Any:
+        """
+        Returns:
+            Any: The most frequent class, the smallest one if there is a tie
+        """
+        classes, counts = self.class_counts()
+
+        return classes[[np.argmax(counts)]].item()
+
+    def labels(self) -> Tuple[np.ndarray, int]:
+        """
+        Returns:
+            Tuple: The integer coded target column and the number of codes
+        """
+        if 'labels' not in self.cache:
+            self.cache['labels'] = self.ig._encode(self.samples[self.ig.target_label].to_numpy())
+
+        return self.cache['labels']
+
+    def feature_codes(self, feature_name: str) -> Tuple[np.ndarray, int]:
+        """
+        Args:
+            feature_name (str): The name of the feature
+
+        Returns:
+            Tuple: The integer coded feature column, ordered like the sorted values, and the number of codes
+        """
+        key = ('codes', feature_name)
+        if key not in self.cache:
+            self.cache[key] = self.ig._encode(self.samples[feature_name].to_numpy())
+
+        return self.cache[key]
+
+    def information_gains(self, feature_names: List) -> np.ndarray:
+        """
+        Args:
+            feature_names (list): The names of the features
+
+        Returns:
+            np.ndarray: The information gain of each feature, equal to InformationGain.information_gains
+        """
+        labels, n_classes = self.labels()
+        encoded = [self.feature_codes(feature) for feature in feature_names]
+
+        return self.ig.information_gains_from_codes(encoded, labels, n_classes)
+
+    def partition(self, feature_name: str) -> List:
+        """Splits the samples by the values of the feature with one stable sort of the feature codes.
+        The parts are equal to InformationGain.split.
+
+        Args:
+            feature_name (str): The name of the feature
+
+        Returns:
+            list of pd.DataFrame: The samples of each value of the feature in the order of the sorted values
+        """
+        key = ('partition', feature_name)
+        if key not in self.cache:
+            codes, n_codes = self.feature_codes(feature_name)
+            order = np.argsort(codes, kind='stable')
+            bounds = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=n_codes))))
+
+            self.cache[key] = [self.samples.iloc[order[start:end]]
+                               for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+        return self.cache[key]
+
+    def clear(self) -> None:
+        """Drops the cached statistics and the samples once the node is trained."""
+        self.cache = {}
+        self.samples = None
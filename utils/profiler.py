@@ -0,0 +1,137 @@
+from typing import Any, Callable, Dict
+import time
+
+
+class PhaseTimer:
+    """Context manager adding the time spent in its block to one phase of the profiler."""
+
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler: "Profiler", name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self) -> "PhaseTimer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.profiler.timers[self.name] += time.perf_counter() - self.start
+        self.profiler.calls[self.name] += 1
+
+
+class Profiler:
+    """Profiler records where the training time goes. The trainers time their phases, e.g. entropy, scoring,
+    split and label, and count the expanded nodes, the scored splits and the rows of each level of the tree.
+
+    Profiling is opt-in: the trainers use NULL_PROFILER when no profiler is given, whose methods do nothing.
+    """
+
+    enabled = True
+
+    def __init__(self, callback: Callable[[str, Dict], Any] = None) -> None:
+        """
+        Args:
+            callback (Callable, optional): Called with the name and the data of each event, 'node' after
+                a node is trained and 'report' with the report at the end of training. Defaults to None.
+        """
+        self.callback = callback
+        self.reset()
+
+    def reset(self) -> None:
+        """Clears the recorded timers and counters."""
+        self.timers = {}
+        self.calls = {}
+        self.counters = {}
+        self.levels = {}
+        self.phase_timers = {}
+
+    def phase(self, name: str) -> PhaseTimer:
+        """
+        Args:
+            name (str): The name of the phase
+
+        Returns:
+            PhaseTimer: A context manager timing its block as the phase
+        """
+        if name not in self.phase_timers:
+            self.timers[name] = 0.0
+            self.calls[name] = 0
+            self.phase_timers[name] = PhaseTimer(self, name)
+
+        return self.phase_timers[name]
+
+    def count(self, name: str, n: int = 1) -> None:
+        """
+        Args:
+            name (str): The name of the counter
+            n (int, optional): The increment. Defaults to 1.
+        """
+        self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def node(self, n_stage: int, n_rows: int, **data) -> None:
+        """Records a trained node and the rows that reached it.
+
+        Args:
+            n_stage (int): The stage of the node
+            n_rows (int): The number of samples of the node
+            data: Other details of the node passed to the callback
+        """
+        level = self.levels.setdefault(n_stage, {'nodes': 0, 'rows': 0})
+        level['nodes'] += 1
+        level['rows'] += int(n_rows)
+
+        if self.callback is not None:
+            self.callback('node', dict(n_stage=n_stage, n_rows=int(n_rows), **data))
+
+    def report(self) -> Dict:
+        """
+        Returns:
+            dict: The seconds and the calls of each phase, the counters and the nodes and rows of each level
+        """
+        return {'timers': dict(self.timers), 'calls': dict(self.calls), 'counters': dict(self.counters),
+                'levels': {n_stage: dict(level) for n_stage, level in sorted(self.levels.items())}}
+
+    def finish(self) -> None:
+        """Passes the report to the callback at the end of training."""
+        if self.callback is not None:
+            self.callback('report', self.report())
+
+
+class NullPhaseTimer:
+    """Context manager that does nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "NullPhaseTimer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+class NullProfiler(Profiler):
+    """Profiler used when profiling is off, nothing is recorded."""
+
+    enabled = False
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.null_timer = NullPhaseTimer()
+
+    def phase(self, name: str) -> NullPhaseTimer:
+        return self.null_timer
+
+    def count(self, name: str, n: int = 1) -> None:
+        pass
+
+    def node(self, n_stage: int, n_rows: int, **data) -> None:
+        pass
+
+    def finish(self) -> None:
+        pass
+
+
+# the shared profiler of the trainers that aren't profiled
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,67 @@
+from multiprocessing import shared_memory
+from typing import Tuple
+import numpy as np
+
+
+class SharedArray:
+    """SharedArray keeps a NumPy array in shared memory, so worker processes can attach to it
+    by name instead of receiving a pickled copy of the data.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, shape: Tuple, dtype: np.dtype, owner: bool) -> None:
+        """Use SharedArray.create or SharedArray.attach instead of calling the constructor directly.
+
+        Args:
+            shm (shared_memory.SharedMemory): The shared memory block
+            shape (tuple): The shape of the array
+            dtype (np.dtype): The data type of the array
+            owner (bool): Whether this process created the block and is responsible for unlinking it
+        """
+        self.shm = shm
+        self.owner = owner
+        self.array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+    @classmethod
+    def create(cls, array: np.ndarray) -> "SharedArray":
+        """Copies the array into a new shared memory block.
+
+        Args:
+            array (np.ndarray): The source array
+
+        Returns:
+            SharedArray: The shared copy of the array
+        """
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        shared = cls(shm, array.shape, array.dtype, True)
+        shared.array[...] = array
+
+        return shared
+
+    @classmethod
+    def attach(cls, spec: Tuple) -> "SharedArray":
+        """Attaches to an array created by another process.
+
+        Args:
+            spec (tuple): The spec of the shared array
+
+        Returns:
+            SharedArray: The attached array
+        """
+        name, shape, dtype = spec
+        return cls(shared_memory.SharedMemory(name=name), shape, np.dtype(dtype), False)
+
+    @property
+    def spec(self) -> Tuple:
+        """
+        Returns:
+            tuple: The name, shape and data type needed to attach to the array
+        """
+        return self.shm.name, self.array.shape, self.array.dtype.str
+
+    def close(self) -> None:
+        """Releases the array and the shared memory block, the owner also removes the block.
+        """
+        self.array = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
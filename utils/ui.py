@@ -15,6 +15,7 @@ class UI:
         self.train_repeat = None
         self.kfold = None
         self.n_folds = None
+        self.n_jobs = None
         # print("================================================")
         self.data_info()
         self.tree_info()
@@ -23,7 +24,7 @@ class UI:
         os.system("clear")
 
     def data_info(self):
-        self.load_option = int(input("How do you want to load data? :\n1) Load csv file\n2) Load from original file\n3) create csv file then read from csv file\nchoose the option number [1,2,3]: "))
+        self.load_option = int(input("How do you want to load data? :\n1) Load csv file\n2) Load from original file\n3) create csv file then read from csv file\n4) Load from binary cache of original file\nchoose the option number [1,2,3,4]: "))
 
         print("Please enter the path to the data files")
         self.train_path = input("Train file path: ")
@@ -58,3 +59,4 @@ class UI:
             self.train_split_prc = float(
                 input("What percent of the train dataset do you want to keep? [0 - 1]: "))
         self.train_repeat = int(input("How many times do you want to repeat training? "))
+        self.n_jobs = int(input("How many processes do you want to use for training? "))